@@ -0,0 +1,82 @@
+import threading
+
+
+def parse_stored_result(text):
+    """History stores results as text; turn them back into int/float"""
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def results_agree(stored, computed, tolerance=1e-4):
+    return stored is not None and computed is not None and abs(stored - computed) <= tolerance
+
+
+class AnswerIndex:
+    """Known answers keyed by normalized problem text, loaded from history.
+
+    Problems are normalized by dropping whitespace, so '48 + 34' and
+    '48+34' share an entry. Keeps hit/miss/mismatch counters.
+    """
+
+    def __init__(self):
+        self.answers = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+
+    @staticmethod
+    def normalize(problem):
+        return "".join(str(problem).split())
+
+    def load(self, entries):
+        """Add (problem, result) pairs, e.g. from HistoryManager.load_history(); later rows win"""
+        with self.lock:
+            for problem, result in entries:
+                value = parse_stored_result(result)
+                if value is not None:
+                    self.answers[self.normalize(problem)] = value
+        return len(self.answers)
+
+    def get(self, problem):
+        """Stored answer for `problem`, or None, without counting a lookup"""
+        with self.lock:
+            return self.answers.get(self.normalize(problem))
+
+    def count(self, answer):
+        """Count a lookup that found `answer` (a miss when None)"""
+        with self.lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def lookup(self, problem):
+        """Stored answer for `problem`, or None"""
+        answer = self.get(problem)
+        self.count(answer)
+        return answer
+
+    def record(self, problem, result):
+        with self.lock:
+            self.answers[self.normalize(problem)] = result
+
+    def flag_mismatch(self):
+        with self.lock:
+            self.mismatches += 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.mismatches = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self.answers), 'hits': self.hits, 'misses': self.misses,
+                    'mismatches': self.mismatches, 'hit_rate': self.hits / lookups if lookups else 0.0}
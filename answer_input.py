@@ -0,0 +1,112 @@
+import shlex
+import threading
+import time
+
+from metrics import NULL_METRICS
+from screen_capture import AdbShellSession
+
+# Echoed after the input commands; reading it back means the device has finished typing
+DONE_MARKER = b"__answer_typed__"
+
+
+def input_commands(answer, submit_key=None):
+    """Shell line that types `answer` on the device, e.g. 'input text 104'.
+
+    A leading minus is sent as a key event (`input text -5` would read it
+    as an option); `submit_key` (e.g. 'KEYCODE_ENTER') is pressed afterwards.
+    """
+    text = str(answer)
+    commands = []
+    if text.startswith('-'):
+        commands.append("input keyevent KEYCODE_MINUS")
+        text = text[1:]
+    if text:
+        commands.append(f"input text {shlex.quote(text)}")
+    if submit_key:
+        commands.append(f"input keyevent {submit_key}")
+    # One line, so the whole answer costs a single round trip to the shell
+    return "; ".join(commands)
+
+
+class AnswerInput:
+    """Types solved answers into the device over a persistent adb shell.
+
+    The shell is separate from the capture session, so typing never waits
+    behind a screenshot transfer. With `wait` (default) `send` returns once
+    the device has run the input commands; latency is measured from the
+    capture of the frame that showed the problem to that point
+    (`capture_to_input` stage). With `dry_run` nothing is sent; the command
+    is only reported, for testing without a device.
+    """
+
+    def __init__(self, serial=None, submit_key=None, dry_run=False, wait=True, metrics=None, on_sent=None):
+        self.serial = serial
+        self.submit_key = submit_key
+        self.dry_run = dry_run
+        self.wait = wait
+        self.metrics = metrics or NULL_METRICS
+        # on_sent(answer, command, latency_seconds) after each answer
+        self.on_sent = on_sent or (lambda answer, command, latency: None)
+        self.session = AdbShellSession(serial)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def send(self, answer, captured_at=None):
+        """Type `answer`; `captured_at` is the time.monotonic() of its frame. Returns True if sent."""
+        command = input_commands(answer, self.submit_key)
+        with self.lock:
+            if not self.dry_run:
+                with self.metrics.stage('input'):
+                    sent = self._write(command)
+                if not sent:
+                    self.failed += 1
+                    self.metrics.incr('input_failed')
+                    return False
+            latency = time.monotonic() - captured_at if captured_at is not None else None
+            self.sent += 1
+            if latency is not None:
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                if self.metrics.enabled:
+                    self.metrics.record('capture_to_input', latency)
+        self.on_sent(answer, command, latency)
+        return True
+
+    def _write(self, command):
+        if self.wait:
+            command = f"{command}; echo {DONE_MARKER.decode()}"
+        # A session that died (device unplugged, adb restarted) is reopened once
+        for _ in range(2):
+            with self.session.lock:
+                if not self.session.is_alive() and not self.session.start():
+                    return False
+                try:
+                    self.session.send(command)
+                except OSError as e:
+                    print(f"Error sending answer: {e}")
+                    self.session.close()
+                    continue
+                if not self.wait:
+                    return True
+                # Never resend once the line went out: the answer would be typed twice
+                try:
+                    if self.session.read_exact(len(DONE_MARKER) + 1).strip() == DONE_MARKER:
+                        return True
+                    print("Error sending answer: unexpected output from adb shell")
+                except EOFError as e:
+                    print(f"Error sending answer: {e}")
+                self.session.close()
+                return False
+        return False
+
+    def stats(self):
+        with self.lock:
+            return {'sent': self.sent, 'failed': self.failed, 'dry_run': self.dry_run,
+                    'mean_latency': self.total_latency / self.sent if self.sent else 0.0,
+                    'max_latency': self.max_latency}
+
+    def close(self):
+        self.session.close()
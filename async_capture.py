@@ -0,0 +1,457 @@
+import asyncio
+import concurrent.futures
+import io
+import threading
+import time
+
+from PIL import Image
+
+from metrics import NULL_METRICS
+from screen_capture import (EQUATION_BAND_FRACTION, PNG_SIGNATURE, adb_command, band_rows, decode_raw_pixels,
+                            detect_raw_header_size, parse_raw_header, raw_frame_size)
+
+# Shell stdout buffer: big enough that a full raw frame is read without flow-control stalls
+STREAM_BUFFER = 16 * 1024 * 1024
+
+
+async def run_adb(serial, *args, timeout=5.0):
+    """Run a one-shot adb command and return its stdout.
+
+    The process is killed if it outlives `timeout` (asyncio.TimeoutError)
+    or the calling task is cancelled. Raises RuntimeError on a non-zero exit.
+    """
+    process = await asyncio.create_subprocess_exec(*adb_command(serial, *args), stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0 or stderr:
+        raise RuntimeError(stderr.decode(errors='replace').strip() or f"adb exited with {process.returncode}")
+    return stdout
+
+
+def parse_device_list(payload):
+    """`serial<TAB>state` lines -> {serial: state}"""
+    devices = {}
+    for line in payload.decode(errors='replace').splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            devices[parts[0]] = parts[1]
+    return devices
+
+
+class Backoff:
+    """Exponential retry delay: `base`, doubling up to `limit`, reset on success"""
+
+    def __init__(self, base=0.5, limit=8.0):
+        self.base = base
+        self.limit = limit
+        self.failures = 0
+
+    def next_delay(self):
+        self.failures += 1
+        return min(self.limit, self.base * 2 ** (self.failures - 1))
+
+    def reset(self):
+        self.failures = 0
+
+
+class DeviceMonitor:
+    """Follows `adb track-devices` so device checks never spawn a process.
+
+    adb pushes the full device list (4 hex digits of length, then
+    `serial<TAB>state` lines) whenever it changes. If the stream ends, e.g.
+    because the adb server restarted, every device is reported gone and the
+    command is restarted after a backoff delay.
+    """
+
+    def __init__(self, on_change=None, backoff=None):
+        # on_change(serial, state) with state None once the device is gone
+        self.on_change = on_change or (lambda serial, state: None)
+        self.backoff = backoff or Backoff()
+        self.devices = {}
+        self.ready = asyncio.Event()
+        self.restarts = 0
+
+    def online(self):
+        return [serial for serial, state in self.devices.items() if state == 'device']
+
+    async def run(self):
+        while True:
+            try:
+                await self._track()
+            except asyncio.CancelledError:
+                raise
+            except FileNotFoundError:
+                if not self.backoff.failures:
+                    print("Error: ADB not found. Please ensure ADB is installed and in your system's PATH.")
+            except Exception as e:
+                if not self.backoff.failures:
+                    print(f"Device monitor error: {e}")
+            self._update({})
+            # Nothing more will arrive until adb is back; don't keep waiters hanging
+            self.ready.set()
+            self.restarts += 1
+            await asyncio.sleep(self.backoff.next_delay())
+
+    async def _track(self):
+        process = await asyncio.create_subprocess_exec("adb", "track-devices", stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        try:
+            while True:
+                length = int(await process.stdout.readexactly(4), 16)
+                self._update(parse_device_list(await process.stdout.readexactly(length)))
+                self.backoff.reset()
+                self.ready.set()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    def _update(self, devices):
+        previous, self.devices = self.devices, devices
+        for serial in previous.keys() - devices.keys():
+            self.on_change(serial, None)
+        for serial, state in devices.items():
+            if previous.get(serial) != state:
+                self.on_change(serial, state)
+
+
+class AsyncAdbShell:
+    """Long-lived `adb exec-out sh` driven with asyncio streams"""
+
+    def __init__(self, serial, timeout=5.0):
+        self.serial = serial
+        self.timeout = timeout
+        self.process = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        await self.close()
+        self.process = await asyncio.create_subprocess_exec(
+            *adb_command(self.serial, "exec-out", "sh"), stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL, limit=STREAM_BUFFER)
+
+    async def send(self, command):
+        self.process.stdin.write(command.encode() + b'\n')
+        await self.process.stdin.drain()
+
+    async def read_exact(self, size):
+        """Read exactly `size` bytes; a stalled device raises asyncio.TimeoutError"""
+        try:
+            return await asyncio.wait_for(self.process.stdout.readexactly(size), self.timeout)
+        except asyncio.IncompleteReadError:
+            raise EOFError("ADB session closed while reading frame") from None
+
+    async def read_raw(self, header_size):
+        """(header, pixels) of one raw frame, kept apart so the pixels are never copied to join them"""
+        header = await self.read_exact(header_size)
+        width, height, pixel_format = parse_raw_header(header)
+        return header, await self.read_exact(raw_frame_size(width, height, pixel_format))
+
+    async def read_png(self):
+        signature = await self.read_exact(8)
+        if signature != PNG_SIGNATURE:
+            raise ValueError("Unexpected data in ADB stream (not a PNG)")
+        buffer = bytearray(signature)
+        while True:
+            chunk_header = await self.read_exact(8)
+            length = int.from_bytes(chunk_header[:4], 'big')
+            buffer += chunk_header
+            buffer += await self.read_exact(length + 4)  # data + CRC
+            if chunk_header[4:] == b'IEND':
+                return bytes(buffer)
+
+    async def close(self):
+        process, self.process = self.process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        process.kill()
+        await process.wait()
+
+
+class DeviceChannel:
+    """Capture state for one device: its shell session, backoff and counters"""
+
+    def __init__(self, serial, timeout, backoff):
+        self.serial = serial
+        self.shell = AsyncAdbShell(serial, timeout)
+        self.lock = asyncio.Lock()
+        self.backoff = backoff
+        self.retry_at = 0.0
+        self.raw_header_size = None
+        self.inflight = set()
+        self.frames_captured = 0
+        self.last_frame_time = None
+        self.last_error = None
+
+
+class AsyncCaptureService:
+    """Captures from any number of adb devices on a single asyncio event loop.
+
+    Each device gets a persistent shell session. Every command has a
+    timeout, and a device that fails is left alone for an exponentially
+    growing backoff before the session is reopened. `DeviceMonitor` tracks
+    hot-plugging; unplugging a device cancels its in-flight captures. All
+    methods must run on the service's loop (see AsyncScreenCapture for use
+    from threads).
+    """
+
+    def __init__(self, capture_format='raw', timeout=5.0, min_backoff=0.5, max_backoff=8.0,
+                 metrics=None, on_device=None, band_fraction=EQUATION_BAND_FRACTION, clock=time.monotonic):
+        if capture_format not in ('png', 'raw'):
+            raise ValueError(f"Unknown capture format: {capture_format}")
+        self.capture_format = capture_format
+        # Raw frames are only decoded down to the equation band (None: whole screen)
+        self.band_fraction = band_fraction
+        # Time source for backoff and frame ages
+        self.clock = clock
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or NULL_METRICS
+        # on_device(serial, state): state is adb's ('device', 'offline', ...) or None when unplugged
+        self.on_device = on_device or (lambda serial, state: None)
+        self.channels = {}
+        self.streams = {}
+        self.stream_settings = None
+        self.monitor = DeviceMonitor(self._device_changed, Backoff(min_backoff, max_backoff))
+        self.monitor_task = None
+
+    async def start(self, wait=True):
+        """Start device tracking; with `wait`, return once the first device list arrived"""
+        self.monitor_task = asyncio.ensure_future(self.monitor.run())
+        if wait:
+            try:
+                await asyncio.wait_for(self.monitor.ready.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def connected(self, serial=None):
+        online = self.monitor.online()
+        return serial in online if serial else bool(online)
+
+    def default_serial(self):
+        online = self.monitor.online()
+        return online[0] if online else None
+
+    async def capture(self, serial):
+        """One frame from `serial` as a PIL Image, or None (unplugged, backing off or failed)"""
+        channel = self._channel(serial)
+        if self.clock() < channel.retry_at:
+            return None
+        # Unplugging the device cancels every task waiting on it
+        task = asyncio.current_task()
+        channel.inflight.add(task)
+        try:
+            return await self._capture(channel)
+        finally:
+            channel.inflight.discard(task)
+
+    async def _capture(self, channel):
+        async with channel.lock:
+            try:
+                data = await self._read_frame(channel)
+                image = await self._decode(channel, data)
+            except asyncio.CancelledError:
+                await channel.shell.close()
+                raise
+            except Exception as e:
+                await channel.shell.close()
+                channel.last_error = str(e)
+                delay = channel.backoff.next_delay()
+                channel.retry_at = self.clock() + delay
+                self.metrics.incr('capture_failed')
+                print(f"[{channel.serial}] capture failed ({e}), retrying in {delay:.1f}s")
+                return None
+            channel.backoff.reset()
+            channel.frames_captured += 1
+            channel.last_frame_time = self.clock()
+            return image
+
+    async def _read_frame(self, channel):
+        if self.capture_format == 'raw' and channel.raw_header_size is None:
+            # The header layout is learned from the first one-shot frame
+            data = await run_adb(channel.serial, "exec-out", "screencap", timeout=self.timeout)
+            channel.raw_header_size = detect_raw_header_size(data)
+            return data[:channel.raw_header_size], memoryview(data)[channel.raw_header_size:]
+        if not channel.shell.is_alive():
+            await channel.shell.start()
+        if self.capture_format == 'raw':
+            await channel.shell.send("screencap")
+            return await channel.shell.read_raw(channel.raw_header_size)
+        await channel.shell.send("screencap -p")
+        return await channel.shell.read_png()
+
+    async def _decode(self, channel, data):
+        with self.metrics.stage('decode'):
+            if self.capture_format == 'raw':
+                header, pixels = data
+                rows = None
+                if self.band_fraction is not None:
+                    rows = band_rows(parse_raw_header(header)[1], self.band_fraction)
+                return decode_raw_pixels(header, pixels, rows)
+            # PNG decoding is real work: keep it off the event loop
+            return await asyncio.get_running_loop().run_in_executor(None, _decode_png, data)
+
+    def stream(self, target_fps, on_frame):
+        """Capture every online device at `target_fps`, now and as devices are plugged in.
+
+        `on_frame(serial, image)` is called on the loop; keep it short (hand off to a queue).
+        """
+        self.stream_settings = (target_fps, on_frame)
+        for serial in self.monitor.online():
+            self._start_stream(serial)
+
+    async def _stream_loop(self, serial, target_fps, on_frame):
+        interval = 1.0 / target_fps if target_fps else 0.0
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            image = await self.capture(serial)
+            if image is not None:
+                on_frame(serial, image)
+            next_tick = max(next_tick + interval, loop.time())
+            channel = self.channels.get(serial)
+            retry_in = channel.retry_at - self.clock() if channel is not None else 0.0
+            await asyncio.sleep(max(next_tick - loop.time(), retry_in))
+
+    def _start_stream(self, serial):
+        if self.stream_settings is not None and serial not in self.streams:
+            self.streams[serial] = asyncio.ensure_future(self._stream_loop(serial, *self.stream_settings))
+
+    def _channel(self, serial):
+        channel = self.channels.get(serial)
+        if channel is None:
+            channel = self.channels[serial] = DeviceChannel(serial, self.timeout,
+                                                            Backoff(self.min_backoff, self.max_backoff))
+        return channel
+
+    def _device_changed(self, serial, state):
+        if state == 'device':
+            self._start_stream(serial)
+        else:
+            stream = self.streams.pop(serial, None)
+            if stream is not None:
+                stream.cancel()
+            channel = self.channels.get(serial)
+            if channel is not None:
+                for task in channel.inflight:
+                    task.cancel()
+                asyncio.ensure_future(channel.shell.close())
+                # Start over (fresh header, no backoff) when it comes back
+                del self.channels[serial]
+        self.on_device(serial, state)
+
+    def health(self, serial):
+        channel = self.channels.get(serial)
+        if channel is None:
+            return {'connected': self.connected(serial), 'frames_captured': 0}
+        return {
+            'connected': self.connected(serial),
+            'session_alive': channel.shell.is_alive(),
+            'frames_captured': channel.frames_captured,
+            'consecutive_failures': channel.backoff.failures,
+            'last_frame_age': (self.clock() - channel.last_frame_time
+                               if channel.last_frame_time is not None else None),
+            'last_error': channel.last_error,
+            'monitor_restarts': self.monitor.restarts,
+        }
+
+    async def close(self):
+        tasks = list(self.streams.values())
+        if self.monitor_task is not None:
+            tasks.append(self.monitor_task)
+        for channel in self.channels.values():
+            tasks.extend(channel.inflight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for channel in self.channels.values():
+            await channel.shell.close()
+        self.streams.clear()
+        self.channels.clear()
+
+
+def _decode_png(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+class AsyncScreenCapture:
+    """ScreenCapture drop-in backed by an AsyncCaptureService on a loop thread.
+
+    Device checks read the tracked device list instead of running
+    `adb devices`, and captures from any number of threads are multiplexed
+    onto the one event loop. With no `serial`, the first online device is used.
+    """
+
+    def __init__(self, capture_format='raw', serial=None, timeout=5.0, metrics=None, on_device=None,
+                 band_fraction=EQUATION_BAND_FRACTION):
+        self.serial = serial
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="adb-loop", daemon=True)
+        self.thread.start()
+        self.service = self._call(self._start_service(capture_format, metrics, on_device, band_fraction))
+
+    async def _start_service(self, capture_format, metrics, on_device, band_fraction):
+        # Built on the loop thread so its asyncio primitives belong to that loop
+        service = AsyncCaptureService(capture_format, timeout=self.timeout, metrics=metrics, on_device=on_device,
+                                      band_fraction=band_fraction)
+        await service.start()
+        return service
+
+    def _call(self, coroutine, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def _target(self):
+        return self.serial or self.service.default_serial()
+
+    def is_device_connected(self):
+        return self.service.connected(self.serial)
+
+    def capture_android_screen(self):
+        serial = self._target()
+        if serial is None:
+            return None
+        try:
+            # The service enforces its own timeouts; this only guards against a wedged loop
+            return self._call(self.service.capture(serial), self.timeout * 2 + 1)
+        except concurrent.futures.CancelledError:
+            return None  # The device was unplugged mid-capture
+        except Exception as e:
+            print(f"Error capturing screen: {e}")
+            return None
+
+    def health(self):
+        serial = self._target()
+        return self.service.health(serial) if serial else {'connected': False}
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        try:
+            self._call(self.service.close(), self.timeout)
+        except Exception as e:
+            print(f"Error closing capture service: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(self.timeout)
+        self.loop.close()
@@ -0,0 +1,211 @@
+import csv
+import io
+import os
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+from screen_capture import decode_raw_screencap, parse_raw_header, raw_frame_size
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+RAW_EXTENSIONS = ('.raw', '.bin')
+
+
+def _is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_directory(path):
+    """(name, image) for every image file in a directory, sorted by name"""
+    for name in sorted(os.listdir(path)):
+        if _is_image_name(name):
+            with Image.open(os.path.join(path, name)) as image:
+                image.load()
+                yield name, image
+
+
+def iter_image_file(path):
+    """A single screenshot as a one-frame source"""
+    with Image.open(path) as image:
+        image.load()
+        yield os.path.basename(path), image
+
+
+def iter_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            if _is_image_name(name):
+                with Image.open(io.BytesIO(archive.read(name))) as image:
+                    image.load()
+                    yield name, image
+
+
+def iter_tar(path):
+    with tarfile.open(path) as archive:
+        for member in archive:
+            if member.isfile() and _is_image_name(member.name):
+                with Image.open(io.BytesIO(archive.extractfile(member).read())) as image:
+                    image.load()
+                    yield member.name, image
+
+
+def iter_raw_dump(path, header_size=16):
+    """Frames from a file of back-to-back raw `screencap` outputs"""
+    with open(path, 'rb') as f:
+        index = 0
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                return
+            width, height, pixel_format = parse_raw_header(header)
+            pixels = f.read(raw_frame_size(width, height, pixel_format))
+            yield f"frame_{index:05d}", decode_raw_screencap(header + pixels, header_size)
+            index += 1
+
+
+def iter_frames(source, raw_header_size=16):
+    """Pick a frame reader from the source path: directory, zip, tar or raw dump"""
+    if os.path.isdir(source):
+        return iter_directory(source)
+    if zipfile.is_zipfile(source):
+        return iter_zip(source)
+    if tarfile.is_tarfile(source):
+        return iter_tar(source)
+    if source.lower().endswith(RAW_EXTENSIONS):
+        return iter_raw_dump(source, raw_header_size)
+    if _is_image_name(source):
+        return iter_image_file(source)
+    raise ValueError(f"Unsupported batch source: {source}")
+
+
+def bounded_map(executor, func, items, max_pending):
+    """Like executor.map, but pulls from `items` lazily so huge sources stream"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, *item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def solve_image(solver, name, image, threshold=100, division_mode=False):
+    """OCR and solve one frame; returns a plain dict describing the outcome"""
+    operation, numbers, raw_text, _ = solver.extract_problem_from_soroban(image, threshold, division_mode=division_mode)
+    result = None
+    valid = bool(operation and numbers) and solver.is_valid_equation_window(raw_text)
+    if valid:
+        result = solver.calculate_result(operation, numbers)
+    return {'name': name, 'problem': raw_text, 'operation': operation,
+            'valid': valid, 'result': result}
+
+
+# Per-process solver for ProcessPoolExecutor workers
+_process_solver = None
+_process_settings = None
+
+
+def _init_process_worker(ocr_backend, threshold, division_mode, arithmetic, detect_roi, ensemble_thresholds):
+    global _process_solver, _process_settings
+    from ensemble_ocr import EnsembleOCR
+    from ocr_backends import create_ocr_backend
+    from soroban_solver import SorobanSolver
+    backend = create_ocr_backend(ocr_backend)
+    # The process pool already uses every core: vote over the variants sequentially
+    ensemble = EnsembleOCR(ensemble_thresholds, workers=1) if ensemble_thresholds else None
+    _process_solver = SorobanSolver(ocr_backend=backend, arithmetic=arithmetic, detect_roi=detect_roi,
+                                    ensemble=ensemble)
+    _process_settings = (threshold, division_mode)
+
+
+def _solve_in_process(name, image):
+    return solve_image(_process_solver, name, image, *_process_settings)
+
+
+def run_batch(frames, solver=None, threshold=100, division_mode=False, workers=4,
+              use_processes=False, ocr_backend='auto', arithmetic='float', detect_roi=True,
+              ensemble_thresholds=None):
+    """Stream (name, image) frames through OCR + solve on a worker pool, in order"""
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker,
+                                       initargs=(ocr_backend, threshold, division_mode, arithmetic, detect_roi,
+                                                 ensemble_thresholds))
+        func = _solve_in_process
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+        def func(name, image):
+            return solve_image(solver, name, image, threshold, division_mode)
+
+    with executor:
+        yield from bounded_map(executor, func, frames, max_pending=workers * 2)
+
+
+def normalize_problem(text):
+    return "".join(str(text).split())
+
+
+def results_match(expected, actual):
+    if actual is None:
+        return False
+    try:
+        return abs(float(expected) - float(actual)) < 1e-4
+    except (TypeError, ValueError):
+        return str(expected).strip() == str(actual).strip()
+
+
+class GroundTruth:
+    """Expected answers in the solved_history.csv format.
+
+    With an extra `Image` column rows are matched to frames by name;
+    otherwise the i-th row is the expected answer for the i-th frame.
+    """
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.rows = list(csv.DictReader(f))
+        self.by_name = {os.path.basename(row['Image']): row for row in self.rows if row.get('Image')}
+
+    def expected(self, index, name):
+        if self.by_name:
+            return self.by_name.get(os.path.basename(name))
+        return self.rows[index] if index < len(self.rows) else None
+
+
+class BatchReport:
+    """Running totals and accuracy for a batch run"""
+
+    def __init__(self, truth=None):
+        self.truth = truth
+        self.frames = 0
+        self.recognized = 0
+        self.solved = 0
+        self.labelled = 0
+        self.problem_correct = 0
+        self.result_correct = 0
+
+    def add(self, outcome):
+        """Record one outcome; returns it annotated with correctness when labelled"""
+        index = self.frames
+        self.frames += 1
+        self.recognized += outcome['valid']
+        self.solved += outcome['result'] is not None
+        expected = self.truth.expected(index, outcome['name']) if self.truth else None
+        if expected is not None:
+            self.labelled += 1
+            outcome['problem_correct'] = normalize_problem(expected['Problem']) == normalize_problem(outcome['problem'])
+            outcome['result_correct'] = results_match(expected['Result'], outcome['result'])
+            self.problem_correct += outcome['problem_correct']
+            self.result_correct += outcome['result_correct']
+        return outcome
+
+    def summary(self):
+        summary = {'frames': self.frames, 'recognized': self.recognized, 'solved': self.solved}
+        if self.labelled:
+            summary.update(labelled=self.labelled,
+                           problem_accuracy=round(self.problem_correct / self.labelled, 4),
+                           result_accuracy=round(self.result_correct / self.labelled, 4))
+        return summary
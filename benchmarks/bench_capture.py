@@ -0,0 +1,126 @@
+"""Compare PNG and raw framebuffer capture paths.
+
+    python -m benchmarks.bench_capture            # decode only, from screen.png
+    python -m benchmarks.bench_capture --device   # end-to-end through adb
+    python -m benchmarks.bench_capture --devices 4   # threads vs. one asyncio loop
+
+The decode benchmark reproduces what the solver does with each frame: wrap or
+decode the screencap bytes, crop the equation band and convert it to grayscale.
+
+`--devices N` captures `--rounds` frames from each of N devices (all online
+adb devices, or FAKE_ADB_SERIALS with tools/fake_adb on PATH). The threaded
+case checks the device and spawns a thread per capture per tick, as the
+capture loop used to. The asyncio case runs AsyncCaptureService on one loop.
+"""
+import argparse
+import asyncio
+import io
+import threading
+import time
+
+from benchmarks.common import SCREEN_PNG, measure, print_table
+from PIL import Image
+from async_capture import AsyncCaptureService
+from screen_capture import ScreenCapture, decode_raw_screencap, list_devices
+
+
+def load_payloads(path):
+    """Return (png_bytes, raw_bytes) for the same frame"""
+    with open(path, 'rb') as f:
+        png_bytes = f.read()
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        rgba = image.convert('RGBA')
+    header = b''.join(v.to_bytes(4, 'little') for v in (rgba.width, rgba.height, 1, 0))
+    return png_bytes, header + rgba.tobytes()
+
+
+def band(image):
+    width, height = image.size
+    return image.crop((0, 0, width, height // 4)).convert('L')
+
+
+def run_decode(path, repeat):
+    png_bytes, raw_bytes = load_payloads(path)
+    height = int.from_bytes(raw_bytes[4:8], 'little')
+    return {
+        'png decode + band': measure(lambda: band(Image.open(io.BytesIO(png_bytes))), repeat),
+        'raw wrap + band': measure(lambda: band(decode_raw_screencap(raw_bytes, 16)), repeat),
+        'raw band rows only': measure(
+            lambda: decode_raw_screencap(raw_bytes, 16, rows=height // 4).convert('L'), repeat),
+    }
+
+
+def run_device(repeat):
+    results = {}
+    for capture_format in ('png', 'raw'):
+        capture = ScreenCapture(capture_format=capture_format)
+        try:
+            results[f'adb {capture_format} + band'] = measure(
+                lambda: band(capture.capture_android_screen()), repeat)
+        finally:
+            capture.close()
+    return results
+
+
+def run_threaded(serials, rounds):
+    captures = [ScreenCapture(capture_format='raw', serial=serial) for serial in serials]
+    peak_threads = 0
+    started = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            threads = [threading.Thread(target=lambda c=capture: c.is_device_connected()
+                                        and c.capture_android_screen()) for capture in captures]
+            for thread in threads:
+                thread.start()
+            peak_threads = max(peak_threads, threading.active_count())
+            for thread in threads:
+                thread.join()
+    finally:
+        for capture in captures:
+            capture.close()
+    return time.perf_counter() - started, peak_threads
+
+
+async def run_async(serials, rounds):
+    service = AsyncCaptureService('raw')
+    await service.start()
+    peak_threads = 0
+    started = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            await asyncio.gather(*(service.capture(serial) for serial in serials if service.connected(serial)))
+            peak_threads = max(peak_threads, threading.active_count())
+    finally:
+        await service.close()
+    return time.perf_counter() - started, peak_threads
+
+
+def run_devices(count, rounds):
+    serials = list_devices()[:count]
+    if not serials:
+        print("No adb devices found")
+        return
+    print(f"{len(serials)} device(s), {rounds} frames each")
+    print(f"{'case':<10}  {'seconds':>8}  {'frames/s':>8}  {'peak threads':>12}")
+    for name, (seconds, threads) in (('threads', run_threaded(serials, rounds)),
+                                     ('asyncio', asyncio.run(run_async(serials, rounds)))):
+        print(f"{name:<10}  {seconds:>8.2f}  {len(serials) * rounds / seconds:>8.1f}  {threads:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--image', default=SCREEN_PNG)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--device', action='store_true', help='capture through adb instead of decoding a file')
+    parser.add_argument('--devices', type=int, help='compare threaded and asyncio capture on up to N devices')
+    parser.add_argument('--rounds', type=int, default=20, help='frames per device for --devices')
+    args = parser.parse_args()
+
+    if args.devices:
+        run_devices(args.devices, args.rounds)
+        return
+    print_table(run_device(args.repeat) if args.device else run_decode(args.image, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Single-threshold OCR vs. the multi-threshold ensemble: latency and accuracy.
+
+    python -m benchmarks.bench_ensemble --ocr-backend template
+    python -m benchmarks.bench_ensemble --ocr-backend tesserocr --workers 4
+
+Frames are the benchmark corpus with random brightness/contrast changes,
+so a fixed cutoff misses some of them. Accuracy is an exact match of the
+recognized text (spacing ignored) against the rendered label.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.common import measure_each, print_table
+from benchmarks.corpus import build_corpus
+from ensemble_ocr import DEFAULT_THRESHOLDS, EnsembleOCR
+from ocr_backends import create_ocr_backend
+from soroban_solver import SorobanSolver
+
+
+def degrade(image, rng):
+    """Shift brightness and squeeze contrast like a dimmed or washed-out screen"""
+    gain = rng.uniform(0.45, 1.0)
+    offset = rng.uniform(-20, 110)
+    return image.convert('RGB').point(lambda value: max(0, min(255, int(value * gain + offset))))
+
+
+def build_frames(count, seed):
+    rng = random.Random(seed)
+    corpus = build_corpus(count, seed)
+    return corpus, [(degrade(image, rng), label) for _, image, label in corpus]
+
+
+def make_backend(name, templates, corpus):
+    if name != 'template':
+        return lambda: create_ocr_backend(name)
+    if templates is None:
+        from glyph_recognizer import calibrate
+        templates = os.path.join(tempfile.mkdtemp(), 'templates.npz')
+        calibrate([(image, label) for _, image, label in corpus]).save(templates)
+    return lambda: create_ocr_backend('template', templates_path=templates)
+
+
+def accuracy(solver, frames, threshold):
+    correct = 0
+    for image, label in frames:
+        text = solver.extract_problem_from_soroban(image, threshold)[2]
+        correct += "".join(text.split()) == "".join(label.split())
+    return correct / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ocr-backend', default='auto')
+    parser.add_argument('--templates')
+    parser.add_argument('--threshold', type=int, default=100, help="single-pass cutoff")
+    parser.add_argument('--frames', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--min-confidence', type=float, default=80.0)
+    args = parser.parse_args()
+
+    corpus, frames = build_frames(args.frames, args.seed)
+    backend_factory = make_backend(args.ocr_backend, args.templates, corpus)
+    single = SorobanSolver(ocr_backend=backend_factory())
+    ensemble = EnsembleOCR(DEFAULT_THRESHOLDS, workers=args.workers, min_confidence=args.min_confidence,
+                           backend_factory=backend_factory)
+    voting = SorobanSolver(ocr_backend=backend_factory(), ensemble=ensemble)
+
+    results = {}
+    summary = []
+    for name, solver in (('single pass', single), ('ensemble', voting)):
+        # Accuracy first: this also lets ROI detection settle before timing
+        score = accuracy(solver, frames, args.threshold)
+        results[name] = measure_each(lambda frame: solver.extract_problem_from_soroban(frame[0], args.threshold),
+                                     frames)
+        summary.append(f"{name}: accuracy {score:.0%}")
+    print(f"OCR engine: {single.ocr_backend.name}, {len(frames)} degraded frames")
+    print_table(results)
+    print("; ".join(summary))
+    stats = ensemble.stats()
+    print(f"ensemble: {stats['early_exits']}/{stats['runs']} early exits, "
+          f"{stats['variants_per_run']:.1f} readings per frame")
+    ensemble.close()
+
+
+if __name__ == '__main__':
+    main()
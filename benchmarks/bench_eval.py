@@ -0,0 +1,77 @@
+"""Expression evaluation throughput: legacy `eval` vs. the safe evaluator.
+
+    python -m benchmarks.bench_eval [--count 2000] [--repeat 20]
+
+Each case evaluates the same list of OCR-shaped expressions. "cold" clears
+the memo cache before every pass; "warm" shows the repeated-screen case.
+"""
+import argparse
+import random
+
+from benchmarks.common import measure
+from benchmarks.corpus import random_problem
+from expression_eval import ExpressionEvaluator
+
+
+def build_expressions(count, seed):
+    rng = random.Random(seed)
+    expressions = []
+    for _ in range(count):
+        text = random_problem(rng)
+        if rng.random() < 0.25:
+            text = f"({text}) * {rng.randint(2, 9)}"
+        expressions.append("".join(text.split()))
+    return expressions
+
+
+def legacy_eval(expression):
+    return eval(expression, {"__builtins__": None}, {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000, help="expressions per pass")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=20, help="passes per case")
+    args = parser.parse_args()
+
+    expressions = build_expressions(args.count, args.seed)
+    evaluators = {mode: ExpressionEvaluator(mode, cache_size=args.count * 2)
+                  for mode in ('float', 'fraction', 'decimal')}
+
+    # Every engine must agree with eval before its speed means anything
+    for mode, evaluator in evaluators.items():
+        for expression in expressions:
+            expected, actual = legacy_eval(expression), evaluator.evaluate(expression)
+            if abs(float(actual) - expected) > 1e-9 * max(1.0, abs(expected)):
+                raise SystemExit(f"{mode}: {expression} = {actual}, eval gives {expected}")
+
+    def run(func):
+        def one_pass():
+            for expression in expressions:
+                func(expression)
+        return one_pass
+
+    def cold(evaluator):
+        def one_pass():
+            evaluator.clear_cache()
+            for expression in expressions:
+                evaluator.evaluate(expression)
+        return one_pass
+
+    results = {'eval (legacy)': measure(run(legacy_eval), args.repeat)}
+    for mode, evaluator in evaluators.items():
+        results[f'{mode} cold'] = measure(cold(evaluator), args.repeat)
+    for mode, evaluator in evaluators.items():
+        results[f'{mode} warm'] = measure(run(evaluator.evaluate), args.repeat)
+
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'us/expr p50':>12}  {'us/expr p95':>12}  {'expr/s':>11}")
+    for name, stats in results.items():
+        per_expr = 1000 / args.count
+        print(f"{name:<{width}}  {stats['p50_ms'] * per_expr:>12.2f}  {stats['p95_ms'] * per_expr:>12.2f}  "
+              f"{args.count * 1000 / stats['mean_ms']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Per-frame OCR latency: template glyph recognizer vs. Tesseract.
+
+    python -m benchmarks.bench_ocr --templates glyph_templates.npz
+
+Both engines read the same binarized equation band. Without --templates the
+glyph templates are calibrated on the fly from the benchmark image.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import SCREEN_PNG, measure, print_table
+from glyph_recognizer import TemplateBackend, binarize_band, calibrate
+from ocr_backends import PytesseractBackend, TesserocrBackend
+from PIL import Image
+
+
+def build_backends(templates_path, image_path, label):
+    backends = {}
+    if templates_path is None:
+        templates_path = os.path.join(tempfile.mkdtemp(), 'templates.npz')
+        calibrate([(image_path, label)]).save(templates_path)
+    backends['template'] = TemplateBackend(templates_path)
+
+    try:
+        backends['tesserocr'] = TesserocrBackend()
+    except ImportError:
+        print("tesserocr not installed, skipping")
+    backends['pytesseract'] = PytesseractBackend()
+    return backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--image', default=SCREEN_PNG)
+    parser.add_argument('--label', default='48 + 34 + 22', help="equation shown in --image")
+    parser.add_argument('--templates')
+    parser.add_argument('--threshold', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    with Image.open(args.image) as image:
+        band = binarize_band(image, args.threshold)
+
+    results = {}
+    for name, backend in build_backends(args.templates, args.image, args.label).items():
+        try:
+            text = ' '.join(t for t in backend.image_to_data(band)['text'] if t.strip())
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        print(f"{name}: '{text}'")
+        results[name] = measure(lambda: backend.image_to_data(band), args.repeat)
+    print_table(results)
+
+
+if __name__ == '__main__':
+    main()
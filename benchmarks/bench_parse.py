@@ -0,0 +1,171 @@
+"""OCR text cleanup + parsing: legacy replace/regex chain vs. equation_parser.
+
+    python -m benchmarks.bench_parse [--count 20000] [--repeat 5]
+
+Runs both implementations over a corpus of OCR-style word lists (look-alike
+characters, menu text, division mode), checks they agree on every line and
+reports per-line latency. "repeated screens" replays 1000 distinct lines
+over and over, the steady state where the memo cache answers.
+"""
+import argparse
+import random
+import re
+
+from benchmarks.common import measure
+from benchmarks.corpus import random_problem
+from equation_parser import clean_ocr_text, is_equation_text, parse_equation
+
+LOOKALIKES = {'0': 'Oo', '1': 'lI|', '/': '÷:', '*': 'x×', '-': '−–'}
+NOISE = ["Level 3", "Score: 120", "Time 0:45", "Challenge", "Menu", "<", "“ok”", "Pause"]
+
+
+# --- Previous implementation, kept verbatim for comparison ---
+
+def legacy_clean(words):
+    cleaned_words = []
+    for w in words:
+        if w.strip():
+            w = (w.replace('O', '0')
+                   .replace('o', '0')
+                   .replace('l', '1')
+                   .replace('I', '1')
+                   .replace('÷', '/')
+                   .replace(':', '/')
+                   .replace('x', '*')
+                   .replace('×', '*')
+                   .replace('−', '-')
+                   .replace('–', '-')
+                   .replace('|', '1')
+                   .replace('“', '"')
+                   .replace('”', '"'))
+            cleaned_words.append(w)
+    return " ".join(cleaned_words)
+
+
+def legacy_parse(text, division_mode=False):
+    cleaned = text.replace('×', '*').replace('x', '*').replace('−', '-').replace('÷', '/')
+    if division_mode:
+        binary_ops = [
+            (r'(\d+\.?\d*)\s*[/÷:]\s*(\d+\.?\d*)', 'division'),
+            (r'(\d+\.?\d*)\s*[+\+]\s*(\d+\.?\d*)', 'division'),
+            (r'(\d+\.?\d*)\s*[*×x]\s*(\d+\.?\d*)', 'division'),
+            (r'(\d+\.?\d*)\s*[-−]\s*(\d+\.?\d*)', 'division'),
+        ]
+        for pattern, op_type in binary_ops:
+            match = re.search(pattern, cleaned)
+            if match:
+                return op_type, [float(match.group(1)), float(match.group(2))]
+    expr = "".join(re.findall(r'[\d\.\+\-\*/\(\)]', cleaned))
+    if expr and re.fullmatch(r'[\d\.\+\-\*/\(\) ]+', expr):
+        return 'expression', expr
+    binary_ops = [
+        (r'(\d+\.?\d*)\s*[/÷:]\s*(\d+\.?\d*)', 'division'),
+        (r'(\d+\.?\d*)\s*[\+\+]\s*(\d+\.?\d*)', 'addition'),
+        (r'(\d+\.?\d*)\s*[*×x]\s*(\d+\.?\d*)', 'multiplication'),
+        (r'(\d+\.?\d*)\s*[-−]\s*(\d+\.?\d*)', 'subtraction'),
+    ]
+    for pattern, op_type in binary_ops:
+        match = re.search(pattern, cleaned)
+        if match:
+            return op_type, [float(match.group(1)), float(match.group(2))]
+    return None, None
+
+
+def legacy_is_valid(raw_text):
+    math_chars = sum(1 for c in raw_text if c.isdigit() or c in '+-*/=().')
+    total_chars = len(raw_text.replace(' ', ''))
+    if total_chars > 0 and math_chars / total_chars < 0.6:
+        return False
+    text_lower = raw_text.lower()
+    for pattern in [r'challenge', r'level', r'score', r'time', r'menu',
+                    r'start', r'pause', r'resume', r'home', r'settings']:
+        if re.search(pattern, text_lower):
+            return False
+    return bool(re.search(r'[+\-×x*/÷]', raw_text))
+
+
+def legacy_read(words, division_mode):
+    text = legacy_clean(words)
+    operation, numbers = legacy_parse(text, division_mode)
+    return operation, numbers, legacy_is_valid(text.strip())
+
+
+# --- Current implementation ---
+
+def current_read(words, division_mode):
+    text = clean_ocr_text(words)
+    operation, numbers, _ = parse_equation(text, division_mode)
+    if operation == 'division':
+        numbers = list(numbers)
+    return operation, numbers, is_equation_text(text.strip())
+
+
+def uncached_read(words, division_mode):
+    text = clean_ocr_text(words)
+    operation, numbers, _ = parse_equation.__wrapped__(text, division_mode)
+    if operation == 'division':
+        numbers = list(numbers)
+    return operation, numbers, is_equation_text.__wrapped__(text.strip())
+
+
+def ocr_words(rng):
+    """One OCR result as a word list, with look-alike characters and noise"""
+    text = random_problem(rng)
+    if rng.random() < 0.2:
+        text = f"({text}) * {rng.randint(2, 9)}"
+    chars = []
+    for char in text:
+        if char in LOOKALIKES and rng.random() < 0.3:
+            char = rng.choice(LOOKALIKES[char])
+        chars.append(char)
+    words = "".join(chars).split(" ")
+    if rng.random() < 0.3:
+        words.insert(rng.randint(0, len(words)), rng.choice(NOISE))
+    if rng.random() < 0.1:
+        words.append("")
+    return words
+
+
+def build_corpus(count, seed):
+    rng = random.Random(seed)
+    return [(ocr_words(rng), rng.random() < 0.2) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000, help="OCR lines in the corpus")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=5, help="passes per case")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.seed)
+    for words, division_mode in corpus:
+        expected, actual = legacy_read(words, division_mode), uncached_read(words, division_mode)
+        if expected != actual:
+            raise SystemExit(f"mismatch for {words} (division={division_mode}): {expected} != {actual}")
+    print(f"{len(corpus)} lines, legacy and current parsers agree")
+
+    def run(func, lines=corpus):
+        def one_pass():
+            for words, division_mode in lines:
+                func(words, division_mode)
+        return one_pass
+
+    repeated = (corpus[:1000] * (len(corpus) // 1000 + 1))[:len(corpus)]
+    results = {
+        'legacy': measure(run(legacy_read), args.repeat, warmup=1),
+        'current': measure(run(uncached_read), args.repeat, warmup=1),
+        'legacy, repeated screens': measure(run(legacy_read, repeated), args.repeat, warmup=1),
+        'current, repeated screens': measure(run(current_read, repeated), args.repeat, warmup=1),
+    }
+    width = max(len(name) for name in results)
+    per_line = 1000 / len(corpus)
+    print(f"{'case':<{width}}  {'us/line p50':>12}  {'lines/s':>11}  {'speedup':>8}")
+    for name, stats in results.items():
+        print(f"{name:<{width}}  {stats['p50_ms'] * per_line:>12.2f}  "
+              f"{len(corpus) * 1000 / stats['mean_ms']:>11.0f}  "
+              f"{results['legacy']['mean_ms'] / stats['mean_ms']:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
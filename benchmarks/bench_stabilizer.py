@@ -0,0 +1,129 @@
+"""Multi-frame confirmation: wrong answers vs. added latency.
+
+    python -m benchmarks.bench_stabilizer --ocr-backend template
+    python -m benchmarks.bench_stabilizer --transition 3 --stable 2 --fps 4
+
+Replays a sequence of problems through SolveSession. Between two problems
+the screen shows `--transition` frames: cross-fades and half-drawn
+equations. Each problem then stays on screen for `--stable` frames.
+For every --confirm-frames setting it reports answers committed, wrong
+answers, missed problems and how long after the problem settled the
+answer came out, in frames and in ms at `--fps`.
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import tempfile
+
+from PIL import Image
+
+from benchmarks.bench_ensemble import make_backend
+from benchmarks.corpus import build_corpus, load_font, render_problem
+from history_manager import create_history_manager
+from soroban_solver import SorobanSolver
+from solve_session import SolveSession
+
+
+class ReplayCapture:
+    """ScreenCapture stand-in that plays back a list of frames"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = -1
+
+    def is_device_connected(self):
+        return True
+
+    def capture_android_screen(self):
+        self.index += 1
+        return self.frames[self.index][0]
+
+    def close(self):
+        pass
+
+
+def build_sequence(corpus, transition, stable):
+    """[(image, label or None)]; None marks a transition frame"""
+    font = load_font()
+    background = corpus[0][1]
+    frames = []
+    previous = None
+    for _, image, label in corpus:
+        for step in range(transition if previous is not None else 0):
+            fraction = (step + 1) / (transition + 1)
+            if step % 2 == 0:
+                frames.append((Image.blend(previous, image, fraction), None))
+            else:
+                frames.append((render_problem(background, label[:max(1, int(len(label) * fraction))], font), None))
+        frames.extend((image, label) for _ in range(stable))
+        previous = image
+    return frames
+
+
+def replay(frames, backend, confirm_frames, history_path):
+    capture = ReplayCapture(frames)
+    history = create_history_manager(history_path)
+    commits = []
+    session = SolveSession(capture, SorobanSolver(ocr_backend=backend), history,
+                           on_solved=lambda img, boxes, raw_text, result, count:
+                           commits.append((capture.index, raw_text)),
+                           on_log=lambda message: None, confirm_frames=confirm_frames)
+    # The solver prints every reading; keep the report readable
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in frames:
+            frame = session.capture_frame()
+            if frame is not None:
+                session.solve_frame(session.recognize_frame(frame))
+    history.close()
+    return commits
+
+
+def score(frames, commits):
+    """(wrong answers, missed problems, per-problem delay in frames)"""
+    settled = {}
+    for index, (_, label) in enumerate(frames):
+        if label is not None and (index == 0 or frames[index - 1][1] != label):
+            settled[index] = label
+    wrong = 0
+    delays = {}
+    for index, raw_text in commits:
+        # A late answer for the problem that just left the screen still counts as right
+        start = max((start for start in settled if start <= index), default=None)
+        if start is None or "".join(raw_text.split()) != "".join(settled[start].split()):
+            wrong += 1
+        elif start not in delays:
+            delays[start] = index - start
+    return wrong, len(settled) - len(delays), list(delays.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ocr-backend', default='auto')
+    parser.add_argument('--templates')
+    parser.add_argument('--problems', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=11)
+    parser.add_argument('--transition', type=int, default=2, help="frames between two problems")
+    parser.add_argument('--stable', type=int, default=4, help="frames each problem stays on screen")
+    parser.add_argument('--fps', type=float, default=4.0, help="capture rate used to convert frames to ms")
+    parser.add_argument('--confirm-frames', type=int, nargs='+', default=[1, 2, 3])
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.problems, args.seed)[1:]
+    frames = build_sequence(corpus, args.transition, args.stable)
+    backend_factory = make_backend(args.ocr_backend, args.templates, corpus)
+    history_dir = tempfile.mkdtemp()
+    print(f"{len(corpus)} problems, {len(frames)} frames "
+          f"({args.transition} transition + {args.stable} stable per problem)")
+    print(f"{'confirm':>7}  {'commits':>7}  {'wrong':>5}  {'missed':>6}  {'delay frames':>12}  {'delay ms':>8}")
+    for confirm_frames in args.confirm_frames:
+        commits = replay(frames, backend_factory(), confirm_frames,
+                         os.path.join(history_dir, f"history_{confirm_frames}.csv"))
+        wrong, missed, delays = score(frames, commits)
+        delay = statistics.fmean(delays) if delays else 0.0
+        print(f"{confirm_frames:>7}  {len(commits):>7}  {wrong:>5}  {missed:>6}  {delay:>12.2f}  "
+              f"{delay * 1000 / args.fps:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Per-stage latency, throughput and memory of the solving hot paths.
+
+    python -m benchmarks.bench_stages                          # print a report
+    python -m benchmarks.bench_stages --save-baseline base.json
+    python -m benchmarks.bench_stages --compare base.json      # exit 1 on regression
+
+Stages: capture (PNG decode vs. raw wrap of the same frame, or real adb with
+--device), extract_problem_from_soroban, _parse_mathematical_expression,
+calculate_result, and a full frame (raw wrap -> OCR -> validate -> solve).
+The corpus is screen.png plus deterministic synthetic equations.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.common import measure_each, print_table
+from benchmarks.corpus import build_corpus
+from ocr_backends import create_ocr_backend
+from screen_capture import ScreenCapture, decode_raw_screencap
+from soroban_solver import SorobanSolver
+
+REGRESSION_TOLERANCE = 0.20
+# Sub-microsecond stages jitter by more than 20%; ignore differences below this
+MIN_DELTA_MS = 0.05
+
+
+def encode_frames(corpus):
+    """PNG and raw screencap payloads for every corpus frame"""
+    payloads = []
+    for _, image, _ in corpus:
+        png = io.BytesIO()
+        image.save(png, format='PNG')
+        header = b''.join(v.to_bytes(4, 'little') for v in (image.width, image.height, 1, 0))
+        payloads.append((png.getvalue(), header + image.tobytes()))
+    return payloads
+
+
+def build_solver(backend_name, templates, corpus):
+    kwargs = {}
+    if backend_name == 'template':
+        if templates is None:
+            from glyph_recognizer import calibrate
+            templates = os.path.join(tempfile.mkdtemp(), 'templates.npz')
+            calibrate([(image, label) for _, image, label in corpus]).save(templates)
+        kwargs['templates_path'] = templates
+    return SorobanSolver(ocr_backend=create_ocr_backend(backend_name, **kwargs))
+
+
+def peak_memory_kb(func, items):
+    """Peak Python heap allocated while running func over items once"""
+    tracemalloc.start()
+    try:
+        for item in items:
+            func(item)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_stages(args):
+    from PIL import Image
+
+    corpus = build_corpus(args.synthetic, args.seed)
+    payloads = encode_frames(corpus)
+    frames = [image for _, image, _ in corpus]
+    solver = build_solver(args.ocr_backend, args.templates, corpus)
+
+    extracted = [solver.extract_problem_from_soroban(frame, args.threshold) for frame in frames]
+    texts = [text for _, _, text, _ in extracted]
+    parsed = [solver._parse_mathematical_expression(text) for text in texts]
+    parsed = [(op, nums) for op, nums in parsed if op]
+
+    def full_frame(raw):
+        frame = decode_raw_screencap(raw, 16)
+        operation, numbers, raw_text, _ = solver.extract_problem_from_soroban(frame, args.threshold)
+        if operation and numbers and solver.is_valid_equation_window(raw_text):
+            solver.calculate_result(operation, numbers)
+
+    stages = {
+        'capture.png_decode': (lambda p: Image.open(io.BytesIO(p[0])).load(), payloads),
+        'capture.raw_wrap': (lambda p: decode_raw_screencap(p[1], 16), payloads),
+        'extract_problem': (lambda f: solver.extract_problem_from_soroban(f, args.threshold), frames),
+        'parse_expression': (lambda t: solver._parse_mathematical_expression(t), texts),
+        'calculate_result': (lambda p: solver.calculate_result(*p), parsed),
+        'full_frame': (full_frame, [raw for _, raw in payloads]),
+    }
+    if args.device:
+        capture = ScreenCapture(capture_format='raw')
+        stages['capture.adb_raw'] = (lambda _: capture.capture_android_screen(), list(range(10)))
+
+    results = {}
+    for name, (func, items) in stages.items():
+        if not items:
+            continue
+        stats = measure_each(func, items, repeat=args.repeat)
+        stats['peak_kb'] = peak_memory_kb(func, items[:5])
+        results[name] = stats
+
+    correct = sum(" ".join(text.split()) == label for text, (_, _, label) in zip(texts, corpus))
+    meta = {'ocr_engine': solver.ocr_backend.name, 'frames': len(corpus),
+            'ocr_accuracy': round(correct / len(corpus), 4),
+            'python': platform.python_version(), 'machine': platform.machine()}
+    return meta, results
+
+
+def compare(results, baseline, tolerance, min_delta=MIN_DELTA_MS):
+    """Rows of (stage, baseline p50, current p50, ratio, regressed)"""
+    rows = []
+    for name, stats in results.items():
+        if name in baseline:
+            before = baseline[name]['p50_ms']
+            now = stats['p50_ms']
+            ratio = now / before if before else float('inf')
+            rows.append((name, before, now, ratio, ratio > 1 + tolerance and now - before > min_delta))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ocr-backend', default='auto')
+    parser.add_argument('--templates', help="glyph templates for --ocr-backend template (default: calibrate on the corpus)")
+    parser.add_argument('--threshold', default=100, type=lambda v: v if v in ('auto', 'adaptive') else int(v))
+    parser.add_argument('--synthetic', type=int, default=20, help="number of synthetic frames")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=3, help="passes over the corpus per stage")
+    parser.add_argument('--device', action='store_true', help="also time real adb capture")
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed p50 slowdown before a stage counts as regressed")
+    args = parser.parse_args()
+
+    # Keep the report readable: the solver prints diagnostics per frame
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        meta, results = run_stages(args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    print(", ".join(f"{key}: {value}" for key, value in meta.items()))
+    print_table(results)
+    print("peak memory (KB): " + ", ".join(f"{name} {stats['peak_kb']:.0f}" for name, stats in results.items()))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.tolerance)
+        print(f"\n{'stage':<20}  {'base p50':>9}  {'now p50':>9}  {'ratio':>6}")
+        for name, before, now, ratio, regressed in rows:
+            print(f"{name:<20}  {before:>9.3f}  {now:>9.3f}  {ratio:>6.2f}{'  REGRESSION' if regressed else ''}")
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Cold-start time of the app, each run in a fresh interpreter.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 20 --gui
+
+Cases:
+  interpreter   `python -c pass`, the floor every other case includes
+  import main   what runs before the window can be created
+  ocr ready     import main, then build the SorobanSolver (what the
+                background initialization thread loads)
+  headless      import the headless entry point
+  gui           `python main.py` with SOROBAN_PROFILE_STARTUP=exit, which
+                quits once history and the OCR engine are ready (`--gui`,
+                needs a display)
+
+Set SOROBAN_PROFILE_STARTUP=1 and run `python main.py` for the per-module
+import report.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import REPO_ROOT, print_table, summarize
+from startup_profile import PROFILE_ENV
+
+CASES = {
+    'interpreter': ['-c', 'pass'],
+    'import main': ['-c', 'import main'],
+    'ocr ready': ['-c', 'import main\nfrom soroban_solver import SorobanSolver\nSorobanSolver()'],
+    'headless': ['-c', 'import headless'],
+}
+
+
+def time_run(args, env, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--gui', action='store_true', help="also time `python main.py` until ready")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop(PROFILE_ENV, None)
+    cases = dict(CASES)
+    if args.gui:
+        if not env.get('DISPLAY') and sys.platform.startswith('linux'):
+            print("No display; skipping the gui case")
+        else:
+            cases['gui'] = ['main.py']
+
+    results = {}
+    for name, case_args in cases.items():
+        case_env = dict(env, **{PROFILE_ENV: 'exit'}) if name == 'gui' else env
+        results[name] = time_run(case_args, case_env, args.runs)
+    print_table(results)
+
+
+if __name__ == '__main__':
+    main()
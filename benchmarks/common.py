@@ -0,0 +1,62 @@
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+SCREEN_PNG = os.path.join(REPO_ROOT, "screen.png")
+
+
+def measure(func, repeat=50, warmup=3):
+    """Time `func()` and return latency statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def measure_each(func, items, repeat=1, warmup=1):
+    """Time `func(item)` for every item (`repeat` passes) and return statistics"""
+    for item in items[:warmup]:
+        func(item)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def percentile(sorted_samples, fraction):
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        'n': len(ordered),
+        'mean_ms': mean,
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'p99_ms': percentile(ordered, 0.99),
+        'fps': 1000 / mean if mean else float('inf'),
+    }
+
+
+def print_table(results):
+    """Print {name: stats} as an aligned table"""
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'fps':>9}")
+    for name, stats in results.items():
+        print(f"{name:<{width}}  {stats['p50_ms']:>9.3f}  {stats['p95_ms']:>9.3f}  "
+              f"{stats['p99_ms']:>9.3f}  {stats['fps']:>9.1f}")
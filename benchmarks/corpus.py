@@ -0,0 +1,58 @@
+"""Fixture corpus for the benchmarks: screen.png plus synthetic equations.
+
+Synthetic frames reuse screen.png's background and repaint the equation
+band with a rendered problem, so every frame has a known label.
+"""
+import random
+
+from benchmarks.common import SCREEN_PNG
+from PIL import Image, ImageDraw, ImageFont
+
+SCREEN_LABEL = "48 + 34 + 22"
+# Region of screen.png that holds the equation text (x1, y1, x2, y2)
+EQUATION_AREA = (700, 30, 1120, 95)
+
+
+def random_problem(rng):
+    kind = rng.choice(('chain', 'chain', 'minus', 'times', 'divide'))
+    if kind == 'chain':
+        return " + ".join(str(rng.randint(10, 999)) for _ in range(rng.randint(2, 4)))
+    if kind == 'minus':
+        a, b = sorted((rng.randint(10, 9999), rng.randint(10, 9999)), reverse=True)
+        return f"{a} - {b}"
+    if kind == 'times':
+        return f"{rng.randint(2, 99)} * {rng.randint(2, 99)}"
+    b = rng.randint(2, 50)
+    return f"{b * rng.randint(2, 99)} / {b}"
+
+
+def render_problem(background, text, font):
+    """Paint `text` over the equation area of a copy of `background`"""
+    image = background.copy()
+    draw = ImageDraw.Draw(image)
+    x1, y1, x2, y2 = EQUATION_AREA
+    draw.rectangle(EQUATION_AREA, fill=background.getpixel((x1 - 20, y1)))
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    position = ((x1 + x2 - (right - left)) // 2 - left, (y1 + y2 - (bottom - top)) // 2 - top)
+    draw.text(position, text, fill=(255, 255, 255, 255), font=font)
+    return image
+
+
+def load_font(size=44):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+
+def build_corpus(synthetic=20, seed=1234):
+    """List of (name, image, label); deterministic for a given seed"""
+    with Image.open(SCREEN_PNG) as screen:
+        background = screen.convert('RGBA')
+    corpus = [("screen.png", background, SCREEN_LABEL)]
+    rng = random.Random(seed)
+    font = load_font()
+    for i in range(synthetic):
+        label = random_problem(rng)
+        corpus.append((f"synthetic_{i:03d}", render_problem(background, label, font), label))
+    return corpus
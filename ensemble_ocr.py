@@ -0,0 +1,154 @@
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from equation_parser import clean_ocr_text
+from preprocessing import binarize
+
+# Thresholds tried besides the user's own, in order of preference
+DEFAULT_THRESHOLDS = ('auto', 'adaptive', 70, 130, 160)
+# Numbers and single symbols, so '48+34' and '48 + 34' vote alike
+TOKEN_PATTERN = re.compile(r'\d+\.?\d*|\S')
+
+# One OCR reading: tokens with per-token confidence, the cleaned text and word boxes
+Candidate = namedtuple('Candidate', 'threshold tokens confidences text boxes')
+
+
+def candidate_from_words(threshold, words, boxes, confidences):
+    """Tokenize cleaned OCR words; each token inherits its word's confidence"""
+    tokens = []
+    token_confidences = []
+    for word, confidence in zip(words, confidences):
+        for token in TOKEN_PATTERN.findall(clean_ocr_text([word])):
+            tokens.append(token)
+            token_confidences.append(confidence)
+    return Candidate(threshold, tuple(tokens), tuple(token_confidences), clean_ocr_text(words).strip(), boxes)
+
+
+def mean_confidence(candidate):
+    confidences = candidate.confidences
+    return sum(confidences) / len(confidences) if confidences else 0.0
+
+
+def vote(candidates):
+    """Confidence-weighted vote per token position.
+
+    Candidates are grouped by token count (the group with the most total
+    confidence wins, which drops readings that merged or split tokens).
+    Each position then takes the token with the highest summed confidence.
+    Returns (text, boxes of the best candidate in the group, mean confidence).
+    """
+    groups = defaultdict(list)
+    for candidate in candidates:
+        if candidate.tokens:
+            groups[len(candidate.tokens)].append(candidate)
+    if not groups:
+        return "", [], 0.0
+    group = max(groups.values(), key=lambda members: sum(mean_confidence(c) for c in members))
+
+    tokens = []
+    confidences = []
+    for position in range(len(group[0].tokens)):
+        scores = Counter()
+        for candidate in group:
+            scores[candidate.tokens[position]] += max(candidate.confidences[position], 0.0)
+        token, score = scores.most_common(1)[0]
+        tokens.append(token)
+        confidences.append(score / len(group))
+    best = max(group, key=mean_confidence)
+    return " ".join(tokens), best.boxes, sum(confidences) / len(confidences)
+
+
+class EnsembleOCR:
+    """Reads the equation crop at several thresholds in parallel and votes.
+
+    Variants run on a thread pool (Tesseract works outside the GIL). As
+    soon as `agreement` readings produce the same tokens, each with mean
+    confidence of at least `min_confidence`, that reading is returned and
+    variants that have not started are cancelled. Otherwise all readings
+    are combined with `vote`.
+
+    `backend_factory` builds one OCR backend per worker thread, for
+    engines that cannot run calls in parallel on a shared instance;
+    without it every variant uses the solver's backend.
+    """
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, workers=3, min_confidence=80.0, agreement=2,
+                 backend_factory=None):
+        self.thresholds = tuple(thresholds)
+        self.min_confidence = min_confidence
+        self.agreement = agreement
+        self.backend_factory = backend_factory
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ensemble")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.early_exits = 0
+        self.variants_run = 0
+
+    def _backend(self, default):
+        if self.backend_factory is None:
+            return default
+        backend = getattr(self.local, 'backend', None)
+        if backend is None:
+            backend = self.local.backend = self.backend_factory()
+        return backend
+
+    def recognize(self, read_words, cropped, primary_threshold, primary_gray, backend, restrict=True):
+        """Vote over the primary reading plus one per extra threshold.
+
+        `read_words(data)` turns image_to_data output into (words, boxes,
+        confidences); `restrict` is passed on to image_to_data. Returns
+        (text, boxes, confidence, early_exit).
+        """
+        def run(threshold, gray=None):
+            if gray is None:
+                gray, _ = binarize(cropped, threshold)
+            words, boxes, confidences = read_words(self._backend(backend).image_to_data(gray, restrict))
+            return candidate_from_words(threshold, words, boxes, confidences)
+
+        pending = {self.executor.submit(run, primary_threshold, primary_gray)}
+        pending.update(self.executor.submit(run, threshold) for threshold in self.thresholds
+                       if threshold != primary_threshold)
+        candidates = []
+        errors = []
+        agreeing = Counter()
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        candidate = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    candidates.append(candidate)
+                    if candidate.tokens and mean_confidence(candidate) >= self.min_confidence:
+                        agreeing[candidate.tokens] += 1
+                        if agreeing[candidate.tokens] >= self.agreement:
+                            winner = candidate
+                            break
+        finally:
+            for future in pending:
+                future.cancel()
+        if not candidates and errors:
+            raise errors[0]
+
+        with self.lock:
+            self.runs += 1
+            self.variants_run += len(candidates)
+            self.early_exits += winner is not None
+        if winner is not None:
+            return winner.text, winner.boxes, mean_confidence(winner), True
+        text, boxes, confidence = vote(candidates)
+        return text, boxes, confidence, False
+
+    def stats(self):
+        with self.lock:
+            return {'runs': self.runs, 'early_exits': self.early_exits,
+                    'variants_per_run': self.variants_run / self.runs if self.runs else 0.0}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
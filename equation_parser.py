@@ -0,0 +1,92 @@
+"""Single-pass OCR text cleanup and equation parsing.
+
+All tables and patterns are built once at import. `parse_equation` returns
+the operation, its operands and whether the text looks like an equation
+window, memoized per (text, division_mode).
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Common OCR confusions, applied to every recognized word
+OCR_CHAR_TABLE = str.maketrans({
+    'O': '0', 'o': '0', 'l': '1', 'I': '1', '|': '1',
+    '÷': '/', ':': '/',
+    'x': '*', '×': '*',
+    '−': '-', '–': '-',
+    '“': '"', '”': '"',
+})
+# Operator look-alikes that the parser itself folds
+OPERATOR_TABLE = str.maketrans({'×': '*', 'x': '*', '−': '-', '÷': '/'})
+
+# Everything that is not part of an arithmetic expression
+NON_EXPRESSION_PATTERN = re.compile(r'[^\d.+\-*/()]+')
+# `a <op> b`; b sits in a lookahead so an operand can end one match and start the next
+BINARY_PATTERN = re.compile(r'(\d+\.?\d*)\s*([/:+*\-])\s*(?=(\d+\.?\d*))')
+# Division mode picks the first `/` (or `:`) pair, else `+`, else `*`, else `-`
+DIVISION_PRIORITY = {'/': 0, ':': 0, '+': 1, '*': 2, '-': 3}
+
+NON_MATH_PATTERN = re.compile(r'[^\d+\-*/=(). ]')
+NON_EQUATION_PATTERN = re.compile(r'challenge|level|score|time|menu|start|pause|resume|home|settings')
+OPERATOR_PATTERN = re.compile(r'[+\-×x*/÷]')
+MIN_MATH_RATIO = 0.6
+# Numbers joined by single operators, e.g. '48 + 34 + 22' or '(3 + 4) * 2 ='; spaces
+# inside a number ('1 3 - 1') do not match
+_NUMBER = r'(?:\(\s*)*\d+\.?\d*(?:\s*\))*'
+WELL_FORMED_PATTERN = re.compile(rf'\s*{_NUMBER}(?:\s*[+\-*/:x×÷]\s*{_NUMBER})+\s*=?\s*')
+
+ParsedEquation = namedtuple('ParsedEquation', 'operation numbers valid')
+
+
+def clean_ocr_text(words):
+    """Join the non-blank OCR words and fix look-alike characters in one pass"""
+    return " ".join(word for word in words if word.strip()).translate(OCR_CHAR_TABLE)
+
+
+@lru_cache(maxsize=2048)
+def is_equation_text(text):
+    """Mostly math characters, no menu words, and at least one operator"""
+    total = len(text) - text.count(' ')
+    if total and (total - len(NON_MATH_PATTERN.findall(text))) / total < MIN_MATH_RATIO:
+        return False
+    if NON_EQUATION_PATTERN.search(text.lower()):
+        return False
+    return OPERATOR_PATTERN.search(text) is not None
+
+
+@lru_cache(maxsize=2048)
+def is_well_formed_expression(text):
+    """Numbers separated by single operators and nothing else.
+
+    Stricter than is_equation_text and independent of menu words: text read
+    with the digits/operators whitelist has no words left to reject.
+    """
+    return WELL_FORMED_PATTERN.fullmatch(text) is not None
+
+
+@lru_cache(maxsize=2048)
+def parse_equation(text, division_mode=False):
+    """(operation, numbers, valid) for one line of OCR text.
+
+    `operation` is 'expression' (numbers is the expression string),
+    'division' in division mode (numbers is [a, b]) or None.
+    """
+    valid = is_equation_text(text)
+    cleaned = text.translate(OPERATOR_TABLE)
+
+    if division_mode:
+        best = None
+        for match in BINARY_PATTERN.finditer(cleaned):
+            priority = DIVISION_PRIORITY[match.group(2)]
+            if best is None or priority < best[0]:
+                best = (priority, match)
+                if priority == 0:
+                    break
+        if best is not None:
+            match = best[1]
+            return ParsedEquation('division', (float(match.group(1)), float(match.group(3))), valid)
+
+    expression = NON_EXPRESSION_PATTERN.sub('', cleaned)
+    if expression:
+        return ParsedEquation('expression', expression, valid)
+    return ParsedEquation(None, None, valid)
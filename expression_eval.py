@@ -0,0 +1,180 @@
+import operator
+import re
+from decimal import Decimal, DivisionByZero, InvalidOperation
+from fractions import Fraction
+from functools import lru_cache
+
+# Numbers like 12, 1.5, 5. and .5 (what Python's eval accepted before)
+TOKEN_PATTERN = re.compile(r'\s*(?:(\d+\.?\d*|\.\d+)|(.))?')
+
+BINARY_OPERATORS = {
+    '+': (1, operator.add),
+    '-': (1, operator.sub),
+    '*': (2, operator.mul),
+    '/': (2, operator.truediv),
+}
+# Unary minus/plus bind tighter than * and /
+UNARY_PRECEDENCE = 3
+NEGATE = 'neg'
+
+NUMBER_TYPES = {
+    'float': lambda text: float(text) if '.' in text else int(text),
+    'fraction': Fraction,
+    'decimal': Decimal,
+}
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed or evaluated.
+
+    `position` is the character offset of the offending token (None when the
+    problem is not tied to one token, e.g. division by zero).
+    """
+
+    def __init__(self, message, expression, position=None):
+        self.message = message
+        self.expression = expression
+        self.position = position
+        where = f" at position {position}" if position is not None else ""
+        super().__init__(f"{message}{where} in '{expression}'")
+
+
+def tokenize(expression):
+    """Split an expression into (kind, value, position) tuples"""
+    tokens = []
+    position = 0
+    length = len(expression)
+    while position < length:
+        match = TOKEN_PATTERN.match(expression, position)
+        number, symbol = match.groups()
+        if number is not None:
+            tokens.append(('number', number, match.start(1)))
+        elif symbol is not None:
+            if symbol not in BINARY_OPERATORS and symbol not in '()':
+                raise ExpressionError(f"unexpected character '{symbol}'", expression, match.start(2))
+            tokens.append(('symbol', symbol, match.start(2)))
+        position = match.end()
+    return tokens
+
+
+def compile_expression(expression):
+    """Shunting-yard: turn an infix expression into a reverse Polish tuple.
+
+    Number operands are kept as text so one compiled form serves every
+    arithmetic mode.
+    """
+    output = []
+    stack = []  # (symbol, position)
+    expect_operand = True
+    for kind, value, position in tokenize(expression):
+        if kind == 'number':
+            if not expect_operand:
+                raise ExpressionError(f"unexpected number '{value}'", expression, position)
+            output.append(('number', value))
+            expect_operand = False
+        elif value == '(':
+            if not expect_operand:
+                raise ExpressionError("unexpected '('", expression, position)
+            stack.append(('(', position))
+        elif value == ')':
+            if expect_operand:
+                raise ExpressionError("unexpected ')'", expression, position)
+            while stack and stack[-1][0] != '(':
+                output.append(stack.pop()[0])
+            if not stack:
+                raise ExpressionError("unbalanced ')'", expression, position)
+            stack.pop()
+        elif expect_operand:
+            if value not in '+-':
+                raise ExpressionError(f"unexpected operator '{value}'", expression, position)
+            if value == '-':
+                stack.append((NEGATE, position))
+        else:
+            precedence = BINARY_OPERATORS[value][0]
+            while stack and stack[-1][0] != '(' and _precedence(stack[-1][0]) >= precedence:
+                output.append(stack.pop()[0])
+            stack.append((value, position))
+            expect_operand = True
+    if expect_operand:
+        raise ExpressionError("expression ends without an operand", expression,
+                              len(expression.rstrip()) if expression.strip() else None)
+    while stack:
+        symbol, position = stack.pop()
+        if symbol == '(':
+            raise ExpressionError("unbalanced '('", expression, position)
+        output.append(symbol)
+    return tuple(output)
+
+
+def _precedence(symbol):
+    return UNARY_PRECEDENCE if symbol == NEGATE else BINARY_OPERATORS[symbol][0]
+
+
+def evaluate_compiled(program, number_type, expression=""):
+    """Run a compiled program with numbers built by `number_type`"""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    try:
+        for step in program:
+            if step.__class__ is tuple:
+                push(number_type(step[1]))
+            elif step == NEGATE:
+                push(-pop())
+            else:
+                right = pop()
+                push(BINARY_OPERATORS[step][1](pop(), right))
+    except (ZeroDivisionError, DivisionByZero):
+        raise ExpressionError("division by zero", expression) from None
+    except InvalidOperation as e:
+        raise ExpressionError(f"invalid operation ({e})", expression) from None
+    return stack[0]
+
+
+class ExpressionEvaluator:
+    """Safe evaluator for `+ - * / ( )` expressions read by OCR.
+
+    `arithmetic` picks the number type: 'float' matches the old `eval`
+    behaviour (ints stay ints, `/` gives floats), 'fraction' and 'decimal'
+    are exact. Compiled programs and results are memoized per normalized
+    expression; bad input raises `ExpressionError`.
+    """
+
+    def __init__(self, arithmetic='float', cache_size=1024):
+        if arithmetic not in NUMBER_TYPES:
+            raise ValueError(f"Unknown arithmetic mode '{arithmetic}' "
+                             f"(choose from {', '.join(NUMBER_TYPES)})")
+        self.arithmetic = arithmetic
+        self.number_type = NUMBER_TYPES[arithmetic]
+        self._evaluate_normalized = lru_cache(maxsize=cache_size)(self._evaluate_uncached)
+
+    @staticmethod
+    def normalize(expression):
+        return "".join(expression.split())
+
+    def evaluate(self, expression):
+        """Exact (or float) value of `expression`; errors point into `expression` as given"""
+        try:
+            return self._evaluate_normalized(self.normalize(expression))
+        except ExpressionError as e:
+            raise self._locate(e, expression) from None
+
+    @staticmethod
+    def _locate(error, expression):
+        """`error` (raised for the normalized text) with its position mapped back onto `expression`"""
+        offsets = [index for index, char in enumerate(expression) if not char.isspace()]
+        position = error.position
+        if position is not None:
+            position = offsets[position] if position < len(offsets) else offsets[-1] + 1
+        return ExpressionError(error.message, expression, position)
+
+    def _evaluate_uncached(self, expression):
+        if not expression:
+            raise ExpressionError("empty expression", expression)
+        return evaluate_compiled(compile_expression(expression), self.number_type, expression)
+
+    def cache_info(self):
+        return self._evaluate_normalized.cache_info()
+
+    def clear_cache(self):
+        self._evaluate_normalized.cache_clear()
@@ -0,0 +1,46 @@
+from PIL import Image
+
+# Quantize the thumbnail to 16 grey levels so sensor/compression noise
+# does not register as a change
+_QUANTIZE_TABLE = [(value >> 4) << 4 for value in range(256)]
+
+
+class FrameChangeDetector:
+    """Cheap perceptual fingerprint of the equation band.
+
+    The band is sampled down to a tiny grayscale thumbnail straight from the
+    full frame (no crop copy), so comparing a frame costs a fraction of a
+    millisecond and lets unchanged screens skip OCR entirely.
+    """
+
+    def __init__(self, thumbnail_size=(64, 16)):
+        self.thumbnail_size = thumbnail_size
+        self.last_fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, image, box, *extra):
+        """Fingerprint the `box` region of `image` plus any OCR settings in `extra`"""
+        thumbnail = image.resize(self.thumbnail_size, Image.NEAREST, box=box)
+        return (thumbnail.convert('L').point(_QUANTIZE_TABLE).tobytes(),) + extra
+
+    def is_unchanged(self, image, box, *extra):
+        """Return True if the region matches the previous frame; records hit/miss"""
+        fingerprint = self.fingerprint(image, box, *extra)
+        if fingerprint == self.last_fingerprint:
+            self.hits += 1
+            return True
+        self.last_fingerprint = fingerprint
+        self.misses += 1
+        return False
+
+    def reset(self):
+        self.last_fingerprint = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
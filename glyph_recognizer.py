@@ -0,0 +1,218 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from ocr_backends import OCRBackend
+from preprocessing import binarize, find_text_line, profile_runs
+
+GLYPH_SIZE = 24           # glyphs are normalized onto a GLYPH_SIZE x GLYPH_SIZE canvas
+MIN_GLYPH_PIXELS = 4      # smaller column runs are treated as noise
+WORD_GAP_RATIO = 0.3      # column gap (relative to line height) that splits words
+DEFAULT_TEMPLATES = "glyph_templates.npz"
+
+
+def foreground_mask(binary_image):
+    """Boolean ink mask of a binarized image; ink is the minority colour"""
+    pixels = np.asarray(binary_image.convert('L')) > 127
+    return pixels if pixels.mean() < 0.5 else ~pixels
+
+
+def segment_glyphs(mask):
+    """Split the equation line into glyph boxes (x1, y1, x2, y2) by column projection"""
+    line = find_text_line(mask)
+    if line is None:
+        return []
+    top, bottom = line
+    band = mask[top:bottom]
+    glyphs = []
+    for left, right in profile_runs(band.sum(axis=0)):
+        if band[:, left:right].sum() >= MIN_GLYPH_PIXELS:
+            glyphs.append((left, top, right, bottom))
+    return glyphs
+
+
+def tight_box(mask, box):
+    """Shrink a line-height glyph box to the rows that contain ink"""
+    x1, y1, x2, y2 = box
+    rows = np.flatnonzero(mask[y1:y2, x1:x2].any(axis=1))
+    return (x1, y1 + int(rows[0]), x2, y1 + int(rows[-1]) + 1) if rows.size else box
+
+
+def glyph_vector(mask, box):
+    """Normalize one glyph to a zero-mean, unit-length feature vector.
+
+    The glyph keeps its full line height, so vertical position and size
+    (e.g. '-' vs '1') survive the scaling to GLYPH_SIZE.
+    """
+    x1, y1, x2, y2 = box
+    crop = Image.fromarray((mask[y1:y2, x1:x2] * 255).astype(np.uint8))
+    scale = GLYPH_SIZE / crop.height
+    width = max(1, min(GLYPH_SIZE, round(crop.width * scale)))
+    canvas = Image.new('L', (GLYPH_SIZE, GLYPH_SIZE))
+    canvas.paste(crop.resize((width, GLYPH_SIZE), Image.BILINEAR), ((GLYPH_SIZE - width) // 2, 0))
+    vector = np.asarray(canvas, dtype=np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class GlyphTemplates:
+    """Labelled glyph vectors, matched by normalized correlation"""
+
+    def __init__(self, vectors=None, labels=None):
+        self.vectors = vectors if vectors is not None else np.zeros((0, GLYPH_SIZE * GLYPH_SIZE), np.float32)
+        self.labels = list(labels or [])
+
+    def add(self, vector, label):
+        self.vectors = np.vstack([self.vectors, vector[np.newaxis, :]])
+        self.labels.append(label)
+
+    def classify(self, vectors):
+        """Best label and correlation score for each row of `vectors`"""
+        if not self.labels or len(vectors) == 0:
+            return [], np.zeros(0)
+        scores = np.asarray(vectors) @ self.vectors.T
+        best = scores.argmax(axis=1)
+        return [self.labels[i] for i in best], scores[np.arange(len(best)), best]
+
+    def save(self, path):
+        np.savez_compressed(path, vectors=self.vectors, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['vectors'].astype(np.float32), data['labels'].tolist())
+
+
+class TemplateBackend(OCRBackend):
+    """Fixed-font glyph recognizer; a fast alternative to Tesseract"""
+    name = "template"
+
+    def __init__(self, templates_path=DEFAULT_TEMPLATES, min_score=0.5):
+        self.templates = GlyphTemplates.load(templates_path)
+        self.min_score = min_score
+
+    def image_to_data(self, image, restrict=True) -> dict:
+        mask = foreground_mask(image)
+        glyphs = segment_glyphs(mask)
+        data = {'text': [], 'left': [], 'top': [], 'width': [], 'height': [], 'conf': []}
+        if not glyphs:
+            return data
+
+        labels, scores = self.templates.classify([glyph_vector(mask, box) for box in glyphs])
+        line_height = glyphs[0][3] - glyphs[0][1]
+
+        # Group neighbouring glyphs into words, like Tesseract's word level
+        word = None
+        for box, label, score in zip(glyphs, labels, scores):
+            if score < self.min_score:
+                continue
+            box = tight_box(mask, box)
+            if word is not None and box[0] - word['box'][2] <= line_height * WORD_GAP_RATIO:
+                word['text'] += label
+                word['box'] = (word['box'][0], min(word['box'][1], box[1]),
+                               box[2], max(word['box'][3], box[3]))
+                word['conf'] = min(word['conf'], score)
+            else:
+                if word is not None:
+                    self._append_word(data, word)
+                word = {'text': label, 'box': box, 'conf': score}
+        if word is not None:
+            self._append_word(data, word)
+        return data
+
+    @staticmethod
+    def _append_word(data, word):
+        x1, y1, x2, y2 = word['box']
+        data['text'].append(word['text'])
+        data['left'].append(x1)
+        data['top'].append(y1)
+        data['width'].append(x2 - x1)
+        data['height'].append(y2 - y1)
+        data['conf'].append(float(word['conf']) * 100)
+
+
+def binarize_band(image, threshold):
+    """Same equation band and threshold the solver feeds to OCR"""
+    width, height = image.size
+    return binarize(image.crop((0, 0, width, height // 4)), threshold)[0]
+
+
+def calibrate(samples, threshold=100, templates=None):
+    """Build templates from (image_path, label) pairs; PIL images work as paths too.
+
+    Labels are the equation text as shown on screen; spaces are ignored. If
+    the screenshot has one glyph more than the label, the leftmost one is
+    taken to be the back button and learned as '<'.
+    """
+    templates = templates or GlyphTemplates()
+    for path, label in samples:
+        label = "".join(label.split())
+        if isinstance(path, Image.Image):
+            mask = foreground_mask(binarize_band(path, threshold))
+        else:
+            with Image.open(path) as image:
+                mask = foreground_mask(binarize_band(image, threshold))
+        glyphs = segment_glyphs(mask)
+        if len(glyphs) == len(label) + 1:
+            label = "<" + label
+        if len(glyphs) != len(label):
+            print(f"Skipping {path}: found {len(glyphs)} glyphs for label '{label}'")
+            continue
+        for box, char in zip(glyphs, label):
+            templates.add(glyph_vector(mask, box), char)
+    return templates
+
+
+def read_labels(csv_path):
+    """(image, problem) pairs from a history-format CSV with an extra Image column"""
+    base = os.path.dirname(os.path.abspath(csv_path))
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return [(os.path.join(base, row['Image']), row['Problem'])
+                for row in csv.DictReader(f) if row.get('Image')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Template-matching glyph recognizer")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    calibrate_parser = subparsers.add_parser('calibrate', help="build glyph templates from labelled screenshots")
+    calibrate_parser.add_argument('samples', nargs='*', metavar='IMAGE=LABEL',
+                                  help="e.g. screen.png='48 + 34 + 22'")
+    calibrate_parser.add_argument('--labels', help="CSV with Image and Problem columns")
+    calibrate_parser.add_argument('--threshold', type=int, default=100)
+    calibrate_parser.add_argument('--output', default=DEFAULT_TEMPLATES)
+    calibrate_parser.add_argument('--append', action='store_true', help="extend an existing template file")
+
+    read_parser = subparsers.add_parser('read', help="recognize the equation in screenshots")
+    read_parser.add_argument('images', nargs='+')
+    read_parser.add_argument('--threshold', type=int, default=100)
+    read_parser.add_argument('--templates', default=DEFAULT_TEMPLATES)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'calibrate':
+        samples = [tuple(sample.split('=', 1)) for sample in args.samples]
+        if args.labels:
+            samples += read_labels(args.labels)
+        if not samples:
+            parser.error("no labelled samples given")
+        existing = GlyphTemplates.load(args.output) if args.append and os.path.isfile(args.output) else None
+        templates = calibrate(samples, args.threshold, existing)
+        templates.save(args.output)
+        print(f"Saved {len(templates.labels)} templates ({''.join(sorted(set(templates.labels)))}) to {args.output}")
+    else:
+        backend = TemplateBackend(args.templates)
+        for path in args.images:
+            with Image.open(path) as image:
+                data = backend.image_to_data(binarize_band(image, args.threshold))
+            print(f"{path}: {' '.join(data['text'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
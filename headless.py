@@ -0,0 +1,307 @@
+"""Command-line entry point; `run --headless` solves without any GUI modules.
+
+    python -m soroban_solver run --headless [--fps 4] [--threshold auto]
+    python -m soroban_solver run --headless --all-devices
+    python -m soroban_solver run            # starts the Tk app
+    python -m soroban_solver batch screenshots/ --truth solved_history.csv
+
+Results are streamed to stdout as JSON lines, one object per event.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from answer_input import AnswerInput
+from ensemble_ocr import DEFAULT_THRESHOLDS, EnsembleOCR
+from history_manager import create_history_manager
+from metrics import Metrics, MetricsExporter
+from ocr_backends import create_ocr_backend
+from ocr_cache import OCRCache
+from pipeline import SolvePipeline
+from screen_capture import ScreenCapture
+from soroban_solver import SorobanSolver
+from solve_session import SolveSession
+
+
+class JsonLineWriter:
+    """Thread-safe JSON-lines emitter"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def parse_threshold(value):
+    return value if value in ('auto', 'adaptive') else int(value)
+
+
+def parse_thresholds(value):
+    return tuple(parse_threshold(item.strip()) for item in value.split(',') if item.strip())
+
+
+def add_ocr_arguments(parser):
+    parser.add_argument('--threshold', type=parse_threshold, default=100,
+                        help="brightness cutoff, 'auto' or 'adaptive' (default: 100)")
+    parser.add_argument('--division', action='store_true', help="division mode")
+    parser.add_argument('--ocr-backend', default='auto', help="auto, tesserocr, pytesseract or template")
+    parser.add_argument('--arithmetic', choices=('float', 'fraction', 'decimal'), default='float',
+                        help="number type for evaluating expressions (fraction/decimal are exact)")
+    parser.add_argument('--no-roi', action='store_true',
+                        help="OCR the whole top quarter instead of the detected equation box")
+    parser.add_argument('--ensemble', action='store_true',
+                        help="also OCR at several other thresholds in parallel and vote on the result")
+    parser.add_argument('--ensemble-thresholds', type=parse_thresholds, default=DEFAULT_THRESHOLDS,
+                        help="comma-separated thresholds for --ensemble (default: auto,adaptive,70,130,160)")
+
+
+def build_solver(args, metrics=None):
+    ocr_cache = OCRCache(path=args.ocr_cache) if args.ocr_cache else None
+    if ocr_cache is not None:
+        ocr_cache.load()
+    ocr_backend = create_ocr_backend(args.ocr_backend)
+    return SorobanSolver(ocr_cache=ocr_cache, ocr_backend=ocr_backend, metrics=metrics,
+                         arithmetic=args.arithmetic, detect_roi=not args.no_roi,
+                         ensemble=EnsembleOCR(args.ensemble_thresholds)
+                         if args.ensemble else None)
+
+
+def run_headless(args):
+    out = JsonLineWriter(sys.stdout)
+    # Keep stdout pure JSON: stray diagnostic prints from the solver go to stderr
+    sys.stdout = sys.stderr
+    if args.all_devices:
+        return run_all_devices(args, out)
+
+    metrics = Metrics(enabled=args.metrics or bool(args.metrics_file) or args.metrics_port is not None)
+    exporter = MetricsExporter(metrics, path=args.metrics_file, port=args.metrics_port)
+    solver = build_solver(args, metrics)
+    if args.async_capture:
+        from async_capture import AsyncScreenCapture
+        capture = AsyncScreenCapture(capture_format=args.capture_format, serial=args.serial, metrics=metrics,
+                                     on_device=lambda serial, state: out.emit("device", device=serial, state=state))
+    else:
+        capture = ScreenCapture(capture_format=args.capture_format, serial=args.serial, metrics=metrics)
+    history = create_history_manager(args.history)
+    answer_input = None
+    if args.auto_input or args.input_dry_run:
+        answer_input = AnswerInput(
+            serial=args.serial, submit_key=args.input_submit_key, dry_run=args.input_dry_run, metrics=metrics,
+            on_sent=lambda answer, command, latency: out.emit(
+                "input", device=args.serial, answer=answer, command=command, dry_run=args.input_dry_run,
+                latency_ms=round(latency * 1000, 1) if latency is not None else None))
+
+    def on_solved(img, boxes, raw_text, result, solved_count):
+        out.emit("solved", device=args.serial, count=solved_count, problem=raw_text, result=result)
+
+    session = SolveSession(capture, solver, history, on_solved=on_solved,
+                           on_log=lambda message: out.emit("log", device=args.serial, message=message),
+                           metrics=metrics, verify_answers=args.verify_answers,
+                           confirm_frames=args.confirm_frames, commit_confidence=args.commit_confidence,
+                           answer_input=answer_input)
+    session.ocr_settings = (args.threshold, args.division)
+    known_answers = session.load_history_answers()
+    out.emit("started", device=args.serial, ocr_engine=solver.ocr_backend.name, fps=args.fps,
+             known_answers=known_answers)
+    exporter.start()
+
+    if args.once:
+        session.process_single_frame()
+        exporter.stop()
+        finish(session, capture, solver, out, metrics)
+        return 0
+
+    def on_error(stage, error):
+        metrics.incr(f"error_{stage}")
+        out.emit("error", stage=stage, message=str(error))
+
+    pipeline = SolvePipeline(session.capture_frame, session.recognize_frame, session.solve_frame,
+                             target_fps=args.fps, ocr_workers=args.workers, on_error=on_error)
+    pipeline.start()
+    try:
+        wait_for_duration(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        exporter.stop()
+        out.emit("pipeline", **pipeline.snapshot())
+        finish(session, capture, solver, out, metrics)
+    return 0
+
+
+def finish(session, capture, solver, out, metrics):
+    for line in session.stats_lines():
+        out.emit("stats", message=line)
+    if metrics.enabled:
+        out.emit("metrics", **metrics.snapshot())
+    capture.close()
+    if session.answer_input is not None:
+        session.answer_input.close()
+    session.history_manager.close()
+    if solver.ocr_cache is not None:
+        solver.ocr_cache.save()
+    solver.ocr_backend.close()
+    if solver.ensemble is not None:
+        out.emit("ensemble", **solver.ensemble.stats())
+        solver.ensemble.close()
+    out.emit("stopped", solved=session.solved_count)
+
+
+def wait_for_duration(duration):
+    deadline = time.monotonic() + duration if duration else None
+    while deadline is None or time.monotonic() < deadline:
+        time.sleep(0.2 if deadline is None else max(0.0, min(0.2, deadline - time.monotonic())))
+
+
+def run_all_devices(args, out):
+    from multi_device import MultiDeviceSolver
+
+    # Every device runs the same SolveSession + SolvePipeline as a single device
+    solver = MultiDeviceSolver(history_dir=args.history_dir, history_format=args.history_format,
+                               threshold=args.threshold, division_mode=args.division, target_fps=args.fps,
+                               ocr_workers=args.workers, ocr_backend=args.ocr_backend,
+                               capture_format=args.capture_format, arithmetic=args.arithmetic,
+                               detect_roi=not args.no_roi,
+                               ensemble_thresholds=args.ensemble_thresholds if args.ensemble else None,
+                               verify_answers=args.verify_answers, confirm_frames=args.confirm_frames,
+                               commit_confidence=args.commit_confidence, async_capture=args.async_capture,
+                               auto_input=args.auto_input, input_dry_run=args.input_dry_run,
+                               input_submit_key=args.input_submit_key, metrics=args.metrics,
+                               metrics_file=args.metrics_file, metrics_port=args.metrics_port)
+    if not solver.serials:
+        out.emit("error", stage="capture", message="No Android devices found. Please connect a device.")
+        return 1
+    out.emit("started", devices=solver.serials, fps=args.fps)
+    solver.start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            event = solver.poll()
+            if event is not None:
+                emit_device_event(out, event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for event in solver.stop():
+            emit_device_event(out, event)
+    out.emit("stopped", devices=solver.summary())
+    return 0
+
+
+def emit_device_event(out, event):
+    if event['type'] == 'solved':
+        # Same shape as single-device results
+        out.emit("solved", device=event['serial'], count=event['solved_count'],
+                 problem=event['raw_text'], result=event['result'])
+    else:
+        fields = {k: v for k, v in event.items() if k not in ('type', 'serial', 'time')}
+        out.emit(event['type'], device=event['serial'], **fields)
+
+
+def run_batch_command(args):
+    from batch import BatchReport, GroundTruth, iter_frames, run_batch
+
+    out = JsonLineWriter(sys.stdout)
+    sys.stdout = sys.stderr
+    report = BatchReport(GroundTruth(args.truth) if args.truth else None)
+    solver = None if args.processes else build_solver(args)
+    outcomes = run_batch(iter_frames(args.source, args.raw_header_size), solver,
+                         threshold=args.threshold, division_mode=args.division,
+                         workers=args.workers, use_processes=args.processes,
+                         ocr_backend=args.ocr_backend, arithmetic=args.arithmetic,
+                         detect_roi=not args.no_roi,
+                         ensemble_thresholds=args.ensemble_thresholds if args.ensemble else None)
+    started = time.perf_counter()
+    for outcome in outcomes:
+        outcome = report.add(outcome)
+        if not args.summary_only:
+            out.emit("frame", **outcome)
+    elapsed = time.perf_counter() - started
+    summary = report.summary()
+    out.emit("summary", seconds=round(elapsed, 3),
+             fps=round(summary['frames'] / elapsed, 2) if elapsed else None, **summary)
+    if solver is not None and solver.ocr_cache is not None:
+        solver.ocr_cache.save()
+    if solver is not None and solver.ensemble is not None:
+        solver.ensemble.close()
+    return 0
+
+
+def run_gui():
+    from main import SorobanSolverApp  # imports customtkinter
+    app = SorobanSolverApp()
+    app.mainloop()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m soroban_solver",
+                                     description="Fast Soroban Solver")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="solve live from the connected device(s)")
+    run_parser.add_argument('--headless', action='store_true', help="no GUI; stream JSON lines to stdout")
+    add_ocr_arguments(run_parser)
+    run_parser.add_argument('--fps', type=float, default=4.0, help="target capture rate")
+    run_parser.add_argument('--workers', type=int, default=2, help="OCR worker threads (per device)")
+    run_parser.add_argument('--capture-format', choices=('png', 'raw'), default='raw')
+    run_parser.add_argument('--serial', help="adb serial of the device to use")
+    run_parser.add_argument('--async-capture', action='store_true',
+                            help="capture on an asyncio loop and follow hot-plugging via `adb track-devices`")
+    run_parser.add_argument('--all-devices', action='store_true', help="one worker process per device")
+    run_parser.add_argument('--history', default="solved_history.db",
+                            help="history file; .db/.sqlite for SQLite, anything else for CSV")
+    run_parser.add_argument('--history-dir', default=".", help="per-device history location (--all-devices)")
+    run_parser.add_argument('--history-format', choices=('db', 'csv'), default='db',
+                            help="per-device history format (--all-devices)")
+    run_parser.add_argument('--ocr-cache', default="ocr_cache.json", help="OCR cache file ('' to disable)")
+    run_parser.add_argument('--verify-answers', action='store_true',
+                            help="recompute problems found in history and flag answers that disagree")
+    run_parser.add_argument('--confirm-frames', type=int, default=2,
+                            help="frames that must agree on a problem before it is solved (1 disables)")
+    run_parser.add_argument('--commit-confidence', type=float,
+                            help="solve a single reading at once when its OCR confidence reaches this (0-100)")
+    run_parser.add_argument('--auto-input', action='store_true',
+                            help="type each answer into the device with `adb shell input`")
+    run_parser.add_argument('--input-dry-run', action='store_true',
+                            help="report the input commands (and latency) without sending them")
+    run_parser.add_argument('--input-submit-key', help="key to press after the answer, e.g. KEYCODE_ENTER")
+    run_parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    run_parser.add_argument('--once', action='store_true', help="process a single frame and exit")
+    run_parser.add_argument('--metrics', action='store_true', help="time every stage (printed on exit)")
+    run_parser.add_argument('--metrics-file', help="periodically write metrics (.json or Prometheus text); "
+                                                   "--all-devices adds the serial to the name")
+    run_parser.add_argument('--metrics-port', type=int, help="serve metrics on http://127.0.0.1:PORT/metrics; "
+                                                             "--all-devices uses PORT + device index")
+
+    batch_parser = subparsers.add_parser('batch', help="solve a directory, archive or raw dump of screenshots")
+    batch_parser.add_argument('source', help="directory, .zip/.tar(.gz), image file or .raw frame dump")
+    add_ocr_arguments(batch_parser)
+    batch_parser.add_argument('--truth', help="expected answers, solved_history.csv format (optional Image column)")
+    batch_parser.add_argument('--workers', type=int, default=4)
+    batch_parser.add_argument('--processes', action='store_true', help="use a process pool instead of threads")
+    batch_parser.add_argument('--raw-header-size', type=int, choices=(12, 16), default=16)
+    batch_parser.add_argument('--ocr-cache', default='', help="OCR cache file (disabled by default)")
+    batch_parser.add_argument('--summary-only', action='store_true', help="only print the final summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'run':
+        return run_headless(args) if args.headless else run_gui()
+    if args.command == 'batch':
+        return run_batch_command(args)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,99 @@
 import csv
 import os
-from typing import List, Tuple
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+def create_history_manager(filename="solved_history.db", **kwargs):
+    """SQLite store for .db/.sqlite paths, the plain CSV file otherwise"""
+    if filename.lower().endswith(SQLITE_EXTENSIONS):
+        return SqliteHistoryManager(filename, **kwargs)
+    return HistoryManager(filename)
 
 
 class HistoryManager:
+    """Plain CSV history file, appended to on every solve"""
+
     def __init__(self, filename="solved_history.csv"):
         self.filename = filename
+        # Parsed (problem, result, mode) rows, read once and then kept in step with save_history
+        self._rows = None
+        # problem -> latest result, built on first lookup
+        self._index = None
 
-    def save_history(self, problem: str, result) -> bool:
-        """Save a solved problem to history file"""
+    def save_history(self, problem: str, result, mode: Optional[str] = None) -> bool:
+        """Save a solved problem to history file.
+
+        `mode` is how the problem was solved ('expression' or 'division');
+        only expression rows are handed to the answer index.
+        """
         try:
             file_exists = os.path.isfile(self.filename)
             with open(self.filename, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 if not file_exists:
-                    writer.writerow(['Problem', 'Result'])
-                writer.writerow([problem, result])
+                    writer.writerow(['Problem', 'Result', 'Mode'])
+                writer.writerow([problem, result, mode or ''])
+            if self._rows is not None:
+                self._rows.append((problem, str(result), mode))
+            if self._index is not None:
+                self._index[problem] = str(result)
             return True
         except Exception as e:
             print(f"Failed to save history: {e}")
             return False
 
+    def load_page(self, limit: int, before: Optional[int] = None) -> Tuple[List[Tuple[str, str]], Optional[int], bool]:
+        """Up to `limit` entries older than id `before` (the newest when None), oldest first.
+
+        Returns (entries, id of the oldest entry returned, whether older
+        entries remain). Ids are row positions in the file, so pages do not
+        shift when new solves are saved.
+        """
+        rows = self._cached_rows()
+        end = len(rows) if before is None else max(0, min(before, len(rows)))
+        start = max(0, end - limit)
+        entries = [(problem, result) for problem, result, _ in rows[start:end]]
+        return entries, start if end > start else before, start > 0
+
+    def count(self) -> int:
+        return len(self._cached_rows())
+
+    def known_answers(self) -> List[Tuple[str, str]]:
+        """(problem, result) pairs of expression-mode rows for AnswerIndex; later rows win"""
+        return [(problem, result) for problem, result, mode in self._cached_rows() if mode == 'expression']
+
+    def lookup(self, problem: str) -> Optional[str]:
+        """Result previously saved for `problem`, or None"""
+        if self._index is None:
+            self._index = {problem: result for problem, result, _ in self._cached_rows()}
+        return self._index.get(problem)
+
+    def _cached_rows(self) -> List[Tuple[str, str, Optional[str]]]:
+        if self._rows is None:
+            self._rows = self._read_rows()
+        return self._rows
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
     def load_history(self) -> List[Tuple[str, str]]:
         """Load history from file"""
+        return [(problem, result) for problem, result, _ in self._cached_rows()]
+
+    def load_entries(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(problem, result, mode) rows, oldest first; mode is None for rows saved without one"""
+        return list(self._cached_rows())
+
+    def _read_rows(self) -> List[Tuple[str, str, Optional[str]]]:
         history_entries = []
         
         if not os.path.isfile(self.filename):
@@ -35,8 +106,8 @@ class HistoryManager:
                 
                 for row in reader:
                     if len(row) >= 2:
-                        problem, result = row[0], row[1]
-                        history_entries.append((problem, result))
+                        mode = row[2] if len(row) >= 3 and row[2] else None
+                        history_entries.append((row[0], row[1], mode))
                         
         except Exception as e:
             print(f"Failed to load history: {e}")
@@ -48,6 +119,8 @@ class HistoryManager:
         try:
             if os.path.isfile(self.filename):
                 os.remove(self.filename)
+            self._rows = None
+            self._index = None
             return True
         except Exception as e:
             print(f"Failed to clear history: {e}")
@@ -77,3 +150,243 @@ class HistoryManager:
             'unique_problems': len(problem_counts),
             'most_common': most_common
         }
+
+
+class SqliteHistoryManager:
+    """History in SQLite (WAL mode) with batched background writes.
+
+    `save_history` only updates the in-memory problem index and stats and
+    queues the row; a writer thread commits queued rows in batches. The
+    first time the database is created, rows from the CSV file with the
+    same name (or `migrate_from`) are imported.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            problem TEXT NOT NULL,
+            result TEXT NOT NULL,
+            solved_at REAL NOT NULL,
+            mode TEXT
+        );
+        CREATE TABLE IF NOT EXISTS problems (
+            problem TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            solve_count INTEGER NOT NULL,
+            mode TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    UPSERT_PROBLEM = """
+        INSERT INTO problems (problem, result, solve_count, mode) VALUES (?, ?, ?, ?)
+        ON CONFLICT(problem) DO UPDATE SET
+            result = excluded.result,
+            solve_count = solve_count + excluded.solve_count,
+            mode = excluded.mode
+    """
+    # Columns added after the first release; older databases get them on open
+    ADDED_COLUMNS = (('history', 'mode'), ('problems', 'mode'))
+
+    def __init__(self, filename="solved_history.db", migrate_from=None, batch_size=64,
+                 flush_interval=0.5):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        # problem -> latest result, problem -> times solved
+        self._results = {}
+        self._counts = {}
+        self._total = 0
+        self._most_common = None
+
+        if migrate_from is None:
+            migrate_from = os.path.splitext(filename)[0] + '.csv'
+        conn = self._connect()
+        try:
+            conn.executescript(self.SCHEMA)
+            self._add_columns(conn)
+            self._migrate_csv(conn, migrate_from)
+            self._load_index(conn)
+        finally:
+            conn.close()
+
+        self.writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self.writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.filename)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _add_columns(self, conn):
+        for table, column in self.ADDED_COLUMNS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                with conn:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+    def _migrate_csv(self, conn, csv_path):
+        """Import an existing CSV history into a freshly created database"""
+        if not os.path.isfile(csv_path):
+            return
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+            return
+        if conn.execute("SELECT 1 FROM history LIMIT 1").fetchone():
+            return
+        entries = HistoryManager(csv_path).load_entries()
+        solved_at = os.path.getmtime(csv_path)
+        with conn:
+            self._insert(conn, [(problem, result, solved_at, mode) for problem, result, mode in entries])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (csv_path,))
+        print(f"Imported {len(entries)} history entries from {csv_path}")
+
+    def _load_index(self, conn):
+        for problem, result, count in conn.execute("SELECT problem, result, solve_count FROM problems"):
+            self._results[problem] = result
+            self._counts[problem] = count
+            self._total += count
+            if self._most_common is None or count > self._most_common[1]:
+                self._most_common = (problem, count)
+
+    @classmethod
+    def _insert(cls, conn, rows):
+        conn.executemany("INSERT INTO history (problem, result, solved_at, mode) VALUES (?, ?, ?, ?)", rows)
+        # One upsert per problem, with the latest result and mode and how many rows it gained
+        latest = {}
+        for problem, result, _, mode in rows:
+            count = latest[problem][1] + 1 if problem in latest else 1
+            latest[problem] = (result, count, mode)
+        conn.executemany(cls.UPSERT_PROBLEM, [(problem, result, count, mode)
+                                              for problem, (result, count, mode) in latest.items()])
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            running = True
+            while running:
+                batch = [self.pending.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                rows = [row for row in batch if row is not None]
+                running = len(rows) == len(batch)
+                try:
+                    if rows:
+                        with conn:
+                            self._insert(conn, rows)
+                except Exception as e:
+                    print(f"Failed to save history: {e}")
+                finally:
+                    for _ in batch:
+                        self.pending.task_done()
+        finally:
+            conn.close()
+
+    def save_history(self, problem: str, result, mode: Optional[str] = None) -> bool:
+        """Record a solved problem in `mode`; the row reaches disk within `flush_interval`"""
+        if not self.writer.is_alive():
+            print("Failed to save history: history store is closed")
+            return False
+        result = str(result)
+        with self.lock:
+            self._results[problem] = result
+            count = self._counts[problem] = self._counts.get(problem, 0) + 1
+            self._total += 1
+            if self._most_common is None or count > self._most_common[1]:
+                self._most_common = (problem, count)
+        self.pending.put((problem, result, time.time(), mode))
+        return True
+
+    def lookup(self, problem: str) -> Optional[str]:
+        """Result previously saved for `problem`, or None"""
+        return self._results.get(problem)
+
+    def flush(self):
+        """Block until every queued row is committed"""
+        self.pending.join()
+
+    def load_history(self) -> List[Tuple[str, str]]:
+        """Load history from the database, oldest first"""
+        return self._query("SELECT problem, result FROM history ORDER BY id")
+
+    def _query(self, sql, params=()):
+        self.flush()
+        try:
+            conn = sqlite3.connect(self.filename)
+            try:
+                return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Failed to load history: {e}")
+            return []
+
+    def load_page(self, limit: int, before: Optional[int] = None) -> Tuple[List[Tuple[str, str]], Optional[int], bool]:
+        """Up to `limit` entries older than id `before` (the newest when None), oldest first.
+
+        Returns (entries, id of the oldest entry returned, whether older
+        entries remain). Paging by id keeps pages stable while new solves
+        are saved.
+        """
+        if before is None:
+            rows = self._query("SELECT id, problem, result FROM history ORDER BY id DESC LIMIT ?", (limit + 1,))
+        else:
+            rows = self._query("SELECT id, problem, result FROM history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                               (before, limit + 1))
+        more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+        oldest = rows[0][0] if rows else before
+        return [(problem, result) for _, problem, result in rows], oldest, more
+
+    def count(self) -> int:
+        with self.lock:
+            return self._total
+
+    def known_answers(self) -> List[Tuple[str, str]]:
+        """Latest result per problem solved as an expression, straight from the problems table"""
+        return self._query("SELECT problem, result FROM problems WHERE mode = 'expression'")
+
+    def clear_history(self) -> bool:
+        """Clear all history"""
+        self.flush()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM history")
+                    conn.execute("DELETE FROM problems")
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Failed to clear history: {e}")
+            return False
+        with self.lock:
+            self._results.clear()
+            self._counts.clear()
+            self._total = 0
+            self._most_common = None
+        return True
+
+    def get_stats(self) -> dict:
+        """Get statistics about solving history (kept up to date in memory)"""
+        with self.lock:
+            return {
+                'total_problems': self._total,
+                'unique_problems': len(self._counts),
+                'most_common': self._most_common
+            }
+
+    def close(self):
+        """Commit queued rows and stop the writer thread"""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
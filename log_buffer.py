@@ -0,0 +1,40 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class LogBuffer:
+    """Capped, thread-safe log model.
+
+    `append` timestamps a line and queues it; the view calls `drain` on a
+    timer and renders everything queued since the last call at once. Only
+    the newest `max_lines` lines are kept, both in the model and pending.
+    """
+
+    def __init__(self, max_lines=500):
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)
+        self.pending = deque(maxlen=max_lines)
+        self.lock = threading.Lock()
+
+    def append(self, text):
+        line = f"[{datetime.now().strftime('%b %d %I:%M:%S %p')}] {text}"
+        with self.lock:
+            self.lines.append(line)
+            self.pending.append(line)
+
+    def drain(self):
+        """Lines appended since the last drain (oldest first)"""
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            return lines
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.lines)
+
+    def clear(self):
+        with self.lock:
+            self.lines.clear()
+            self.pending.clear()
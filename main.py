@@ -1,33 +1,158 @@
-import customtkinter as ctk
+import sys
 import threading
+
+from startup_profile import start_profile
+
+# Before the other imports, so SOROBAN_PROFILE_STARTUP=1 can time them
+STARTUP = start_profile()
+
+import customtkinter as ctk
 from soroban_ui import SorobanUI
-from soroban_solver import SorobanSolver
 from screen_capture import ScreenCapture
-from history_manager import HistoryManager
+from history_manager import create_history_manager
+from ocr_cache import OCRCache
+from pipeline import SolvePipeline
+from solve_session import SolveSession
+from metrics import Metrics, MetricsExporter
+
+TARGET_FPS = 4.0
+OCR_WORKERS = 2
+# .db uses the SQLite store (importing solved_history.csv once); .csv keeps the plain file
+HISTORY_FILE = "solved_history.db"
+# History entries shown at startup and per "Load Older History" click
+HISTORY_PAGE_SIZE = 20
+# Stage timing; METRICS_FILE (.json or Prometheus text) and METRICS_PORT
+# (http://127.0.0.1:<port>/metrics) publish it outside the app
+METRICS_ENABLED = True
+METRICS_FILE = None
+METRICS_PORT = None
+# OCR every frame at several thresholds in parallel and vote (slower, more robust)
+OCR_ENSEMBLE = False
+# Frames that must agree on a problem before it is solved (1 = solve the first reading),
+# or solve at once when the OCR confidence reaches COMMIT_CONFIDENCE (None = never)
+CONFIRM_FRAMES = 2
+COMMIT_CONFIDENCE = None
+# Capture on an asyncio loop; device checks follow `adb track-devices` instead of polling
+ASYNC_CAPTURE = False
+# Type each answer into the device (adb shell input); INPUT_DRY_RUN only logs the commands
+AUTO_INPUT = False
+INPUT_DRY_RUN = False
+INPUT_SUBMIT_KEY = None  # e.g. "KEYCODE_ENTER" if the app needs it
+# How often the Tk thread checks whether background initialization has finished
+INIT_POLL_MS = 50
 
 class SorobanSolverApp(ctk.CTk):
     def __init__(self):
+        STARTUP.mark("imports")
         super().__init__()
         self.title("Fast Soroban Solver")
 
-        # Initialize components
-        self.ui = SorobanUI(self)
-        self.solver = SorobanSolver()
-        self.screen_capture = ScreenCapture()
-        self.history_manager = HistoryManager("solved_history.csv")
-        
+        # Only what the window needs is built here; the OCR stack (numpy,
+        # Tesseract bindings), capture and history load in _initialize on a
+        # background thread while the window is already usable
+        self.metrics = Metrics(enabled=METRICS_ENABLED)
+        self.ui = SorobanUI(self, metrics=self.metrics)
+        self.metrics_exporter = MetricsExporter(self.metrics, path=METRICS_FILE, port=METRICS_PORT)
+        self.ocr_cache = OCRCache(path="ocr_cache.json")
+        self.answer_input = None
+        if AUTO_INPUT or INPUT_DRY_RUN:
+            from answer_input import AnswerInput
+            self.answer_input = AnswerInput(submit_key=INPUT_SUBMIT_KEY, dry_run=INPUT_DRY_RUN,
+                                            metrics=self.metrics, on_sent=self._on_answer_typed)
+        self.solver = None
+        self.screen_capture = None
+        self.history_manager = None
+        self.session = None
+        self.pipeline = None
+        self.initialized = threading.Event()
+        self.init_error = None
+        self.first_history_page = ([], None, False)
+        self.history_total = 0
+        self.known_answers = 0
+
         # State management
-        self.last_problem = None
-        self.solved_count = 0
         self.solving_active = False
-        self.solve_job = None
-        self.processing = False
+        self.start_requested = False
+        self.history_shown = 0
+        # Id of the oldest history entry shown; older pages load from there
+        self.history_before = None
 
         # Setup UI callbacks
         self._setup_callbacks()
-        
-        # Load history
+        self.metrics_exporter.start()
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.init_thread = threading.Thread(target=self._initialize, name="startup", daemon=True)
+        self.init_thread.start()
+        self.after_idle(lambda: STARTUP.mark("window"))
+        self.after(INIT_POLL_MS, self._finish_startup)
+
+    def _initialize(self):
+        """Background thread: history, OCR engine, capture and the solve pipeline"""
+        try:
+            self.history_manager = create_history_manager(HISTORY_FILE)
+            self.history_total = self.history_manager.count()
+            self.first_history_page = self.history_manager.load_page(HISTORY_PAGE_SIZE)
+            STARTUP.mark("history")
+
+            from soroban_solver import SorobanSolver
+            self.ocr_cache.load()
+            solver = SorobanSolver(ocr_cache=self.ocr_cache, metrics=self.metrics)
+            if OCR_ENSEMBLE:
+                from ensemble_ocr import EnsembleOCR
+                solver.ensemble = EnsembleOCR()
+            STARTUP.mark("ocr")
+
+            # The preview can show the whole screen, so raw frames are decoded in full
+            if ASYNC_CAPTURE:
+                from async_capture import AsyncScreenCapture
+                self.screen_capture = AsyncScreenCapture(capture_format="raw", metrics=self.metrics, band_fraction=None)
+            else:
+                self.screen_capture = ScreenCapture(capture_format="raw", metrics=self.metrics, band_fraction=None)
+            session = SolveSession(self.screen_capture, solver, self.history_manager,
+                                   on_solved=self._handle_successful_solve, on_log=self._log,
+                                   metrics=self.metrics, confirm_frames=CONFIRM_FRAMES,
+                                   commit_confidence=COMMIT_CONFIDENCE, answer_input=self.answer_input)
+            self.known_answers = session.load_history_answers()
+            self.pipeline = SolvePipeline(session.capture_frame, session.recognize_frame,
+                                          session.solve_frame, target_fps=TARGET_FPS,
+                                          ocr_workers=OCR_WORKERS, on_error=self._on_pipeline_error)
+            self.solver = solver
+            self.session = session
+        except Exception as e:
+            self.init_error = e
+        finally:
+            self.initialized.set()
+
+    def _finish_startup(self):
+        """Tk thread: show history and start solving once _initialize is done"""
+        if not self.initialized.is_set():
+            self.after(INIT_POLL_MS, self._finish_startup)
+            return
+        if self.init_error is not None:
+            self.ui.append_log(f"Startup failed: {self.init_error}")
+            return
         self._load_history()
+        self.ui.append_log(f"OCR engine: {self.solver.ocr_backend.name}")
+        STARTUP.mark("ready")
+        self._report_startup()
+        if self.start_requested:
+            self.start_requested = False
+            self._start_solving()
+
+    def _report_startup(self):
+        """Log the startup milestones; with SOROBAN_PROFILE_STARTUP also the import times"""
+        STARTUP.stop_import_timing()
+        self.ui.append_log(STARTUP.summary())
+        if STARTUP.imports is None:
+            return
+        for line in STARTUP.imports.report_lines():
+            print(line, file=sys.stderr)
+        for line in STARTUP.report_lines():
+            print(line, file=sys.stderr)
+        if STARTUP.exit_when_ready:
+            self.after_idle(self.on_close)
 
     def _setup_callbacks(self):
         self.bind('<Control-d>', lambda e: self.toggle_division_mode())
@@ -35,15 +160,26 @@ class SorobanSolverApp(ctk.CTk):
         """Setup UI event callbacks"""
         self.ui.set_toggle_callback(self.toggle_solving)
         self.ui.set_reset_callback(self.reset)
+        self.ui.set_older_history_callback(self.load_older_history)
         self.ui.set_threshold_callback(self.on_threshold_change)
-        
+        self.ui.set_auto_threshold_callback(self.on_auto_threshold_change)
+        self.ui.set_division_mode_callback(self._refresh_ocr_settings)
+
         # Keyboard shortcuts
         self.bind('<space>', lambda e: self.toggle_solving())
         self.bind('<Control-l>', lambda e: self.reset())
 
     def on_threshold_change(self, value):
+        self._refresh_ocr_settings()
         self.ui.append_log(f"OCR threshold set to {int(value)}")
 
+    def on_auto_threshold_change(self):
+        self._refresh_ocr_settings()
+        if self.solver is not None:
+            self.solver.auto_threshold.reset()
+        state = "on" if self.ui.get_auto_threshold() else "off"
+        self.ui.append_log(f"Automatic OCR threshold {state}")
+
     def toggle_solving(self):
         if self.solving_active:
             self._stop_solving()
@@ -59,74 +195,56 @@ class SorobanSolverApp(ctk.CTk):
             self.ui.division_mode_switch.select()
         else:
             self.ui.division_mode_switch.deselect()
+        self._refresh_ocr_settings()
         self.ui.append_log(f"Division mode toggled to {not current_state}")
 
+    def _refresh_ocr_settings(self):
+        """Snapshot threshold and division mode so worker threads never touch Tk"""
+        if self.session is None:
+            return
+        threshold = 'auto' if self.ui.get_auto_threshold() else int(self.ui.get_threshold())
+        self.session.ocr_settings = (threshold, bool(self.ui.get_division_mode()))
+
     def _start_solving(self):
-        """Start the solving loop"""
+        """Start the capture/OCR/solve pipeline"""
+        if self.session is None:
+            if self.init_error is None:
+                self.start_requested = True
+                self.ui.append_log("Loading the OCR engine; solving starts when it is ready.")
+            return
+        self._refresh_ocr_settings()
         self.solving_active = True
         self.ui.set_toggle_button_text("Stop Solving")
-        self.ui.append_log("Solving started.")
-        self._live_solve_loop()
+        self.ui.append_log(f"Solving started ({TARGET_FPS:g} FPS target, {OCR_WORKERS} OCR workers).")
+        self.pipeline.start()
+        self._refresh_stats()
 
     def _stop_solving(self):
-        """Stop the solving loop"""
-        if self.solve_job:
-            self.after_cancel(self.solve_job)
-            self.solve_job = None
+        """Stop the solving pipeline"""
+        self.pipeline.stop()
         self.solving_active = False
         self.ui.set_toggle_button_text("Start Solving")
         self.ui.append_log("Solving stopped.")
+        pipeline_stats = self.pipeline.snapshot()
+        self.ui.append_log("Pipeline: " + ", ".join(f"{key} {value}" for key, value in pipeline_stats.items()))
+        for line in self.session.stats_lines():
+            self.ui.append_log(line)
 
-    def _live_solve_loop(self):
-        """Main solving loop"""
-        if not self.solving_active:
-            return
-
-        if self.processing:
-            self.solve_job = self.after(1000, self._live_solve_loop)
+    def _refresh_stats(self):
+        """Update the stats panel once a second while solving"""
+        if not self.metrics.enabled:
             return
+        self.ui.update_stats(self.metrics.summary_lines())
+        if self.solving_active:
+            self.after(1000, self._refresh_stats)
 
-        def task():
-            try:
-                self.processing = True
-                self._process_single_frame()
-            except Exception as e:
-                error_message = f"Error: {e}"
-                self.after(0, lambda: self.ui.append_log(error_message))
-            finally:
-                self.processing = False
-
-        threading.Thread(target=task, daemon=True).start()
-        self.solve_job = self.after(1000, self._live_solve_loop)
-
-    def _process_single_frame(self):
-        """Process a single frame from the screen"""
-        # Check if a device is connected
-        if not self.screen_capture.is_device_connected():
-            self.ui.append_log("No Android device found. Please connect a device.")
-            return
+    def _log(self, message):
+        """Thread-safe log append"""
+        self.ui.append_log(message)
 
-        # Capture screen
-        img = self.screen_capture.capture_android_screen()
-        if img is None:
-            self.ui.append_log("No image captured, retrying...")
-            return
-        
-        # Extract problem
-        threshold = int(self.ui.get_threshold())
-        operation, numbers, raw_text, boxes = self.solver.extract_problem_from_soroban(img, threshold, division_mode=bool(self.ui.get_division_mode()))
-        # Validate and solve
-        if operation and numbers:
-            if not self.solver.is_valid_equation_window(raw_text):
-                return
-            
-            current_problem = f"{operation}_{numbers}"
-            if current_problem != self.last_problem:
-                result = self.solver.calculate_result(operation, numbers)
-                if result is not None:
-                    self._handle_successful_solve(img, boxes, raw_text, result, current_problem)
-        else:
-            self.ui.append_log(f"Skipped: {raw_text} (not recognized as equation)")
+    def _on_pipeline_error(self, stage, error):
+        self.metrics.incr(f"error_{stage}")
+        self._log(f"Error ({stage}): {error}")
 
     def _extract_numeric_values(self, operation, numbers):
         """Extract numeric values for validation"""
@@ -135,40 +253,81 @@ class SorobanSolverApp(ctk.CTk):
             return [float(n) for n in re.findall(r'\d+\.?\d*', str(numbers))]
         return numbers
 
-    def _handle_successful_solve(self, img, boxes, raw_text, result, current_problem):
-        """Handle a successful solve"""
-        self.solved_count += 1
-        self.last_problem = current_problem
-        
-        # Update UI
-        self.after(0, lambda: self.ui.update_display(img, boxes, raw_text, result))
-        self.after(0, lambda: self.ui.append_log(f"[{self.solved_count}] {raw_text} = {result}"))
-        
-        # Save to history
-        self.history_manager.save_history(raw_text, result)
-        
+    def _handle_successful_solve(self, img, boxes, raw_text, result, solved_count):
+        """Handle a successful solve (history is already saved by the session)"""
+        # Update UI (rendered off the Tk thread, shown at a capped rate)
+        self.ui.update_display(img, boxes, raw_text, result, self.solver.equation_box(img))
+        self.ui.append_log(f"[{solved_count}] {raw_text} = {result}")
+
         # Console output
-        print(f"[{self.solved_count}] Solved: {raw_text} = {result}")
+        print(f"[{solved_count}] Solved: {raw_text} = {result}")
+
+    def _on_answer_typed(self, answer, command, latency):
+        prefix = "Would type" if INPUT_DRY_RUN else "Typed"
+        timing = f" ({latency * 1000:.0f} ms after capture)" if latency is not None else ""
+        self._log(f"{prefix} {answer}: {command}{timing}")
 
     def reset(self):
         """Reset the application state"""
         if self.solving_active:
             self.toggle_solving()
         
-        self.last_problem = None
-        self.solved_count = 0
+        self.start_requested = False
+        if self.session is not None:
+            self.session.reset()
+        self.metrics.reset()
         self.ui.reset_display()
+        # The cleared log no longer shows any history: page again from the newest entry
+        self.history_shown = 0
+        self.history_before = None
+        self.ui.set_older_history_enabled(self.history_manager is not None and self.history_manager.count() > 0)
         self.ui.append_log("Reset complete.")
 
+    def on_close(self):
+        """Stop solving and release the adb session before closing the window"""
+        if self.solving_active:
+            self._stop_solving()
+        # Background initialization may still be opening the resources released below
+        self.init_thread.join()
+        if self.screen_capture is not None:
+            self.screen_capture.close()
+        if self.answer_input is not None:
+            self.answer_input.close()
+        if self.history_manager is not None:
+            self.history_manager.close()
+        self.ui.close()
+        self.metrics_exporter.stop()
+        if self.solver is not None:
+            self.ocr_cache.save()
+            self.solver.ocr_backend.close()
+            if self.solver.ensemble is not None:
+                self.solver.ensemble.close()
+        self.destroy()
+
     def _load_history(self):
-        """Load solving history"""
-        history_entries = self.history_manager.load_history()
-        for problem, result in history_entries:
-            self.ui.append_log(f"History: {problem} = {result}")
-        
-        if history_entries:
-            self.ui.append_log(f"Loaded history ({len(history_entries)} entries)")
+        """Show the history page and answer index prepared by _initialize"""
+        self._show_history_page(self.first_history_page)
+        if self.history_total:
+            self.ui.append_log(f"Loaded history (showing {self.history_shown} of {self.history_total} entries)")
+        if self.known_answers:
+            self.ui.append_log(f"Answer index: {self.known_answers} known problems")
 
+    def load_older_history(self):
+        """Show the next page of older history entries"""
+        if self.history_manager is None:
+            return
+        if not self._show_history_page():
+            self.ui.append_log("No older history.")
+
+    def _show_history_page(self, page=None):
+        if page is None:
+            page = self.history_manager.load_page(HISTORY_PAGE_SIZE, before=self.history_before)
+        entries, self.history_before, more = page
+        for problem, result in entries:
+            self.ui.append_log(f"History: {problem} = {result}")
+        self.history_shown += len(entries)
+        self.ui.set_older_history_enabled(more)
+        return len(entries)
 
 if __name__ == "__main__":
     app = SorobanSolverApp()
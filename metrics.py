@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from collections import deque
+
+# Stage names used across capture, OCR and solving
+STAGES = ('device_check', 'capture', 'decode', 'crop_binarize', 'ocr', 'parse',
+          'validate', 'stabilize', 'solve', 'input', 'capture_to_input', 'preview_render', 'ui_update',
+          'history_write')
+
+
+class _NullTimer:
+    """Shared no-op context manager returned when metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Metrics:
+    """Per-stage timers with rolling percentiles, plus event counters.
+
+    `with metrics.stage('ocr'): ...` times a block. When disabled, `stage`
+    returns a shared no-op context manager and `incr` returns immediately.
+    """
+
+    def __init__(self, enabled=True, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}
+        self.totals = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+                self.totals[name] = 0
+            samples.append(seconds)
+            self.totals[name] += 1
+
+    def incr(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Rolling p50/p95/p99 (ms) per stage and counter totals"""
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+        stages = {}
+        for name, ordered in samples.items():
+            if ordered:
+                stages[name] = {
+                    'count': totals[name],
+                    'p50_ms': _percentile(ordered, 0.50) * 1000,
+                    'p95_ms': _percentile(ordered, 0.95) * 1000,
+                    'p99_ms': _percentile(ordered, 0.99) * 1000,
+                }
+        return {'uptime_s': time.time() - self.started, 'stages': stages, 'counters': counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = ['# TYPE soroban_stage_seconds summary']
+        for name, stats in snapshot['stages'].items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'soroban_stage_seconds{{stage="{name}",quantile="{quantile}"}} '
+                             f'{stats[key] / 1000:.6f}')
+            lines.append(f'soroban_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append('# TYPE soroban_events_total counter')
+        for name, value in snapshot['counters'].items():
+            lines.append(f'soroban_events_total{{event="{name}"}} {value}')
+        lines.append(f'soroban_uptime_seconds {snapshot["uptime_s"]:.1f}')
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self):
+        """Short human-readable table for the UI stats panel"""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<14}{'p50':>8}{'p95':>8}{'p99':>8}{'n':>7}"]
+        for name in list(STAGES) + sorted(set(snapshot['stages']) - set(STAGES)):
+            stats = snapshot['stages'].get(name)
+            if stats:
+                lines.append(f"{name:<14}{stats['p50_ms']:>8.1f}{stats['p95_ms']:>8.1f}"
+                             f"{stats['p99_ms']:>8.1f}{stats['count']:>7}")
+        if snapshot['counters']:
+            lines.append("  ".join(f"{name}={value}" for name, value in sorted(snapshot['counters'].items())))
+        return lines
+
+
+# Shared disabled instance for components created without metrics
+NULL_METRICS = Metrics(enabled=False)
+
+
+class MetricsExporter:
+    """Publishes a Metrics snapshot to a file and/or a localhost HTTP endpoint.
+
+    Files ending in .json get JSON, anything else Prometheus text. The HTTP
+    server answers /metrics (Prometheus) and /metrics.json.
+    """
+
+    def __init__(self, metrics, path=None, port=None, interval=2.0):
+        self.metrics = metrics
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self):
+        if self.path:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._write_loop, name="metrics-file", daemon=True)
+            self.thread.start()
+        if self.port is not None:
+            # http.server (and the email package behind it) only loads when serving
+            from http.server import ThreadingHTTPServer
+            self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self._handler())
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(self.interval)
+            self.thread = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.path:
+            self.write()
+
+    def write(self):
+        body = self.metrics.to_json() if self.path.endswith('.json') else self.metrics.to_prometheus()
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(body)
+        except Exception as e:
+            print(f"Failed to write metrics: {e}")
+
+    def _write_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics.json':
+                    body, content_type = metrics.to_json(), 'application/json'
+                elif self.path == '/metrics':
+                    body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
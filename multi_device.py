@@ -0,0 +1,275 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import parse_threshold
+from history_manager import create_history_manager
+from metrics import Metrics, MetricsExporter
+from ocr_backends import create_ocr_backend
+from pipeline import SolvePipeline
+from screen_capture import ScreenCapture, list_devices
+from soroban_solver import SorobanSolver
+from solve_session import SolveSession
+
+DEFAULT_SETTINGS = {
+    'threshold': 100,
+    'division_mode': False,
+    'capture_format': 'raw',
+    'ocr_backend': 'auto',
+    'target_fps': 4.0,
+    'ocr_workers': 1,
+    'arithmetic': 'float',
+    'detect_roi': True,
+    'ensemble_thresholds': None,
+    'verify_answers': False,
+    'confirm_frames': 2,
+    'commit_confidence': None,
+    'async_capture': False,
+    'auto_input': False,
+    'input_dry_run': False,
+    'input_submit_key': None,
+    'metrics': False,
+    # Per device: the serial is added to the file name and the device index to the port
+    'metrics_file': None,
+    'metrics_port': None,
+}
+
+
+def device_worker(serial, index, history_path, settings, events, stop_event):
+    """SolveSession + SolvePipeline for one device; runs in its own pool process.
+
+    The worker owns the device's history file. Everything else is reported
+    to the parent through `events` as plain dicts.
+    """
+    def emit(event_type, **fields):
+        events.put(dict(fields, serial=serial, type=event_type, time=time.time()))
+
+    metrics_file = settings['metrics_file'] and device_filename(settings['metrics_file'], serial)
+    metrics_port = settings['metrics_port'] + index if settings['metrics_port'] is not None else None
+    metrics = Metrics(enabled=settings['metrics'] or bool(metrics_file) or metrics_port is not None)
+    exporter = MetricsExporter(metrics, path=metrics_file, port=metrics_port)
+    ensemble = None
+    if settings['ensemble_thresholds']:
+        from ensemble_ocr import EnsembleOCR
+        ensemble = EnsembleOCR(settings['ensemble_thresholds'])
+    solver = SorobanSolver(ocr_backend=create_ocr_backend(settings['ocr_backend']), metrics=metrics,
+                           arithmetic=settings['arithmetic'], detect_roi=settings['detect_roi'], ensemble=ensemble)
+    if settings['async_capture']:
+        from async_capture import AsyncScreenCapture
+        capture = AsyncScreenCapture(capture_format=settings['capture_format'], serial=serial, metrics=metrics,
+                                     on_device=lambda device, state: emit('device', state=state))
+    else:
+        capture = ScreenCapture(serial=serial, capture_format=settings['capture_format'], metrics=metrics)
+    answer_input = None
+    if settings['auto_input'] or settings['input_dry_run']:
+        from answer_input import AnswerInput
+        answer_input = AnswerInput(
+            serial=serial, submit_key=settings['input_submit_key'], dry_run=settings['input_dry_run'],
+            metrics=metrics, on_sent=lambda answer, command, latency: emit(
+                'input', answer=answer, command=command, dry_run=settings['input_dry_run'],
+                latency_ms=round(latency * 1000, 1) if latency is not None else None))
+    session = SolveSession(capture, solver, create_history_manager(history_path),
+                           on_solved=lambda img, boxes, raw_text, result, count: emit(
+                               'solved', raw_text=raw_text, result=result, solved_count=count),
+                           on_log=lambda message: emit('log', message=message),
+                           metrics=metrics, verify_answers=settings['verify_answers'],
+                           confirm_frames=settings['confirm_frames'],
+                           commit_confidence=settings['commit_confidence'], answer_input=answer_input)
+    session.ocr_settings = (settings['threshold'], settings['division_mode'])
+    known_answers = session.load_history_answers()
+    pipeline = SolvePipeline(session.capture_frame, session.recognize_frame, session.solve_frame,
+                             target_fps=settings['target_fps'], ocr_workers=settings['ocr_workers'],
+                             on_error=lambda stage, error: emit('error', stage=stage, message=str(error)))
+    emit('log', message=f"Worker started (pid {os.getpid()}, OCR engine: {solver.ocr_backend.name}, "
+                        f"{known_answers} known answers)")
+
+    exporter.start()
+    pipeline.start()
+    try:
+        stop_event.wait()
+    finally:
+        pipeline.stop()
+        exporter.stop()
+        for line in session.stats_lines():
+            emit('stats', message=line)
+        if metrics.enabled:
+            emit('metrics', **metrics.snapshot())
+        capture.close()
+        if answer_input is not None:
+            answer_input.close()
+        session.history_manager.close()
+        solver.ocr_backend.close()
+        if ensemble is not None:
+            ensemble.close()
+        emit('log', message="Worker stopped")
+
+
+def device_filename(path, serial):
+    """`path` with the serial added before the extension; serials like 'host:5555' are made filename-safe"""
+    root, extension = os.path.splitext(path)
+    safe_serial = re.sub(r'[^\w.-]', '_', serial)
+    return f"{root}_{safe_serial}{extension}"
+
+
+def history_filename(history_dir, serial, history_format='db'):
+    """Per-device history file"""
+    return device_filename(os.path.join(history_dir, f"solved_history.{history_format}"), serial)
+
+
+def describe_event(event):
+    """One log line for a worker event"""
+    if event['type'] == 'solved':
+        return f"[{event['solved_count']}] {event['raw_text']} = {event['result']}"
+    if event['type'] == 'error':
+        return f"Error ({event['stage']}): {event['message']}"
+    if event['type'] == 'input':
+        return f"{'Would type' if event['dry_run'] else 'Typed'} {event['answer']}: {event['command']}"
+    if event['type'] == 'device':
+        return f"Device {event['state']}"
+    if event['type'] == 'metrics':
+        return "Metrics: " + ", ".join(f"{key} {value}" for key, value in event['counters'].items())
+    return event['message']
+
+
+class DeviceState:
+    """Aggregated state for one device, kept in the parent process"""
+
+    def __init__(self, serial, history_path, log_size=200):
+        self.serial = serial
+        self.history_path = history_path
+        self.last_problem = None
+        self.solved_count = 0
+        self.error_count = 0
+        self.log = deque(maxlen=log_size)
+
+
+class MultiDeviceSolver:
+    """Runs one SolveSession worker per adb device on a process pool"""
+
+    def __init__(self, serials=None, history_dir=".", history_format='db', **settings):
+        self.serials = list(serials) if serials else list_devices()
+        self.history_dir = history_dir
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self.devices = {serial: DeviceState(serial, history_filename(history_dir, serial, history_format))
+                        for serial in self.serials}
+        self.manager = None
+        self.executor = None
+        self.futures = {}
+        self.events = None
+        self.stop_event = None
+
+    def start(self):
+        if not self.serials:
+            raise RuntimeError("No Android devices found")
+        self.manager = multiprocessing.Manager()
+        self.events = self.manager.Queue()
+        self.stop_event = self.manager.Event()
+        self.executor = ProcessPoolExecutor(max_workers=len(self.serials))
+        self.futures = {serial: self.executor.submit(device_worker, serial, index,
+                                                     self.devices[serial].history_path, self.settings,
+                                                     self.events, self.stop_event)
+                        for index, serial in enumerate(self.serials)}
+
+    def poll(self, timeout=0.5):
+        """Apply the next worker event to device state; returns it, or None if there was none"""
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            self._check_workers()
+            return None
+
+        state = self.devices[event['serial']]
+        if event['type'] == 'solved':
+            state.last_problem = event['raw_text']
+            state.solved_count = event['solved_count']
+        elif event['type'] == 'error':
+            state.error_count += 1
+        state.log.append(describe_event(event))
+        return event
+
+    def _check_workers(self):
+        """Surface workers that died instead of silently losing a device"""
+        for serial, future in self.futures.items():
+            if future.done() and future.exception() is not None:
+                state = self.devices[serial]
+                message = f"Worker crashed: {future.exception()}"
+                if not state.log or state.log[-1] != message:
+                    state.error_count += 1
+                    state.log.append(message)
+                    print(f"[{serial}] {message}")
+
+    def stop(self):
+        """Stop every worker; returns their final events (session stats, metrics)"""
+        final_events = []
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        # Drain the final worker messages before the manager goes away
+        if self.events is not None:
+            while True:
+                event = self.poll(timeout=0)
+                if event is not None:
+                    final_events.append(event)
+                elif self.events.empty():
+                    break
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
+        return final_events
+
+    def summary(self):
+        return {serial: {'solved': state.solved_count, 'errors': state.error_count,
+                         'last_problem': state.last_problem}
+                for serial, state in self.devices.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve on several adb devices at once")
+    parser.add_argument('--serial', action='append', help="device serial (repeatable); default: all devices")
+    parser.add_argument('--threshold', type=parse_threshold, default=DEFAULT_SETTINGS['threshold'],
+                        help="brightness cutoff, 'auto' or 'adaptive' (default: 100)")
+    parser.add_argument('--division', action='store_true', help="division mode")
+    parser.add_argument('--fps', type=float, default=DEFAULT_SETTINGS['target_fps'])
+    parser.add_argument('--ocr-backend', default=DEFAULT_SETTINGS['ocr_backend'])
+    parser.add_argument('--capture-format', choices=('png', 'raw'), default=DEFAULT_SETTINGS['capture_format'])
+    parser.add_argument('--history-dir', default=".")
+    parser.add_argument('--history-format', choices=('db', 'csv'), default='db')
+    parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+
+    solver = MultiDeviceSolver(args.serial, args.history_dir, args.history_format, threshold=args.threshold,
+                               division_mode=args.division, target_fps=args.fps,
+                               ocr_backend=args.ocr_backend, capture_format=args.capture_format)
+    if not solver.serials:
+        print("No Android devices found. Please connect a device.")
+        return 1
+
+    print(f"Solving on {len(solver.serials)} device(s): {', '.join(solver.serials)}")
+    solver.start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            event = solver.poll()
+            if event is not None:
+                print(f"[{event['serial']}] {describe_event(event)}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for event in solver.stop():
+            print(f"[{event['serial']}] {describe_event(event)}")
+
+    for serial, stats in solver.summary().items():
+        print(f"[{serial}] solved {stats['solved']}, errors {stats['errors']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import threading
+
+# Characters that can appear on the equation line (plus the '<' back button)
+EQUATION_WHITELIST = "0123456789+-*/x:.()=<"
+
+
+class OCRBackend:
+    """Interface for OCR engines used by SorobanSolver.
+
+    `image_to_data` returns the same dict layout as
+    `pytesseract.image_to_data(..., output_type=Output.DICT)`, restricted to
+    the keys the solver uses: text, left, top, width, height and conf.
+    With `restrict=False` a character whitelist is not applied, so words
+    (menus, result screens) come back as words instead of being forced
+    into digits and operators.
+    """
+    name = "base"
+    # Whether `restrict` changes anything
+    has_whitelist = False
+
+    def image_to_data(self, image, restrict=True) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the `tesseract` binary once per call through pytesseract"""
+    name = "pytesseract"
+
+    def __init__(self, config='--oem 3 --psm 7', whitelist=None):
+        import pytesseract  # imported on first use: it pulls in numpy and friends
+        self._pytesseract = pytesseract
+        self.unrestricted_config = config
+        self.config = config
+        self.has_whitelist = bool(whitelist)
+        if whitelist:
+            self.config += f" -c tessedit_char_whitelist={whitelist}"
+
+    def image_to_data(self, image, restrict=True) -> dict:
+        pytesseract = self._pytesseract
+        config = self.config if restrict else self.unrestricted_config
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        data['conf'] = [float(c) for c in data['conf']]
+        return data
+
+
+class TesserocrBackend(OCRBackend):
+    """Keeps Tesseract API instances (and their language model) warm in process.
+
+    PyTessBaseAPI is not thread-safe, so each calling thread gets its own
+    instance on first use and OCR workers run in parallel.
+    """
+    name = "tesserocr"
+
+    def __init__(self, whitelist=EQUATION_WHITELIST, lang='eng'):
+        import tesserocr  # optional dependency; ImportError lets callers fall back
+        self._tesserocr = tesserocr
+        self.whitelist = whitelist
+        self.has_whitelist = bool(whitelist)
+        self.lang = lang
+        self.local = threading.local()
+        self.apis = []
+        self.lock = threading.Lock()
+        # Start one engine now so a broken Tesseract install fails here, not mid-run
+        self._api()
+
+    def _api(self, restrict=True):
+        api = getattr(self.local, 'api', None)
+        if api is None:
+            tesserocr = self._tesserocr
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=tesserocr.PSM.SINGLE_LINE,
+                                          oem=tesserocr.OEM.DEFAULT)
+            self.local.api = api
+            self.local.whitelist = ""
+            with self.lock:
+                self.apis.append(api)
+        whitelist = self.whitelist if restrict and self.whitelist else ""
+        if whitelist != self.local.whitelist:
+            api.SetVariable("tessedit_char_whitelist", whitelist)
+            self.local.whitelist = whitelist
+        return api
+
+    def image_to_data(self, image, restrict=True) -> dict:
+        level = self._tesserocr.RIL.WORD
+        data = {'text': [], 'left': [], 'top': [], 'width': [], 'height': [], 'conf': []}
+        if image.mode == '1':
+            image = image.convert('L')
+        api = self._api(restrict)
+        api.SetImage(image)
+        api.Recognize()
+        for word in self._tesserocr.iterate_level(api.GetIterator(), level):
+            text = word.GetUTF8Text(level)
+            box = word.BoundingBox(level)
+            if text is None or box is None:
+                continue
+            x1, y1, x2, y2 = box
+            data['text'].append(text)
+            data['left'].append(x1)
+            data['top'].append(y1)
+            data['width'].append(x2 - x1)
+            data['height'].append(y2 - y1)
+            data['conf'].append(float(word.Confidence(level)))
+        return data
+
+    def close(self):
+        with self.lock:
+            for api in self.apis:
+                api.End()
+            self.apis.clear()
+
+
+OCR_BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+
+def create_ocr_backend(name="auto", **kwargs) -> OCRBackend:
+    """Build an OCR backend by name; 'auto' prefers the warm in-process engine"""
+    if name == "template":
+        from glyph_recognizer import TemplateBackend  # needs numpy and calibrated templates
+        return TemplateBackend(**kwargs)
+    if name != "auto":
+        if name not in OCR_BACKENDS:
+            raise ValueError(f"Unknown OCR backend: {name}")
+        return OCR_BACKENDS[name](**kwargs)
+
+    try:
+        return TesserocrBackend(**kwargs)
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"In-process OCR unavailable ({e}), falling back to pytesseract")
+    return PytesseractBackend()
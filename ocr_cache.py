@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class OCRCache:
+    """Bounded LRU cache of OCR results keyed by the binarized equation band.
+
+    Values are the `(operation, numbers, text, boxes)` tuples returned by
+    `SorobanSolver.extract_problem_from_soroban`. When `path` is given the
+    cache can be saved to and restored from a JSON file between runs.
+    """
+
+    def __init__(self, maxsize=512, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(binary_image, threshold, division_mode, engine=""):
+        """Hash of the thresholded pixels plus the settings and engine that affect parsing"""
+        digest = hashlib.blake2b(binary_image.tobytes(), digest_size=16)
+        digest.update(f"{binary_image.mode}:{binary_image.size}".encode())
+        return f"{digest.hexdigest()}:{threshold}:{int(bool(division_mode))}:{engine}"
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def load(self) -> bool:
+        """Restore entries from `path`, oldest first"""
+        if not self.path or not os.path.isfile(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            with self.lock:
+                for key, (operation, numbers, text, boxes) in saved:
+                    # JSON turns the division operands into a list; the problem key needs the tuple back
+                    if isinstance(numbers, list):
+                        numbers = tuple(numbers)
+                    self.entries[key] = (operation, numbers, text, [tuple(box) for box in boxes])
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            return True
+        except Exception as e:
+            print(f"Failed to load OCR cache: {e}")
+            return False
+
+    def save(self) -> bool:
+        """Write entries to `path` in LRU order"""
+        if not self.path:
+            return False
+        try:
+            with self.lock:
+                snapshot = list(self.entries.items())
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"Failed to save OCR cache: {e}")
+            return False
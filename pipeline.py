@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+
+# Captured in place of a frame whose equation band did not change since the
+# previous one: it re-confirms that frame without another OCR pass
+REPEATED_FRAME = object()
+
+
+class LatestQueue:
+    """Bounded queue where a new item evicts the oldest one when full.
+
+    Stale frames are worthless to the solver, so producers never block:
+    the most recent `maxsize` items always win.
+    """
+
+    def __init__(self, maxsize=1):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item, evict=True):
+        """Add `item`; when full, drop the oldest item, or `item` itself without `evict`.
+
+        Returns False if `item` was dropped.
+        """
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                if not evict:
+                    return False
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Next item, or None once closed or after `timeout` seconds"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            return self.items.popleft() if self.items else None
+
+    def full(self):
+        with self.condition:
+            return len(self.items) >= self.maxsize
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class SolvePipeline:
+    """Capture -> OCR -> solve stages running concurrently.
+
+    - one capture thread calls `capture()` at up to `target_fps`;
+    - `ocr_workers` threads call `recognize(frame)`; frames overlap when the
+      OCR backend releases the GIL and runs calls in parallel (tesserocr
+      keeps one API per thread, pytesseract runs a process per call);
+    - one dispatcher thread calls `solve(result)` in frame order, dropping
+      results that arrive after a newer frame was already dispatched.
+
+    `capture()` may return REPEATED_FRAME for a frame identical to the one
+    before it. A repeat shares that frame's sequence number, never evicts a
+    real frame or result from the queues, and is only solved directly after
+    the frame it repeats: arriving ahead of that frame's (slower) OCR result
+    it is dropped, so the real reading is never discarded as stale.
+
+    Stages return None to drop an item. When every OCR worker is busy and
+    the frame queue is full, capture skips ticks instead of grabbing frames
+    that would be thrown away (backpressure).
+    """
+
+    def __init__(self, capture, recognize, solve, target_fps=4.0, ocr_workers=2,
+                 queue_size=1, on_error=None):
+        self.capture = capture
+        self.recognize = recognize
+        self.solve = solve
+        self.target_fps = target_fps
+        self.ocr_workers = ocr_workers
+        self.on_error = on_error or (lambda stage, error: print(f"{stage} error: {error}"))
+
+        self.frames = LatestQueue(queue_size)
+        self.results = LatestQueue(max(queue_size, ocr_workers))
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.stopping = []
+        self.busy_workers = 0
+        self.busy_lock = threading.Lock()
+        self.last_dispatched = -1
+        self.stats = {'captured': 0, 'recognized': 0, 'dispatched': 0, 'throttled': 0, 'stale': 0}
+
+    def start(self):
+        """Start a run, first waiting for threads of the previous run still inside a stage"""
+        for thread in self.stopping:
+            thread.join()
+        self.stopping = []
+        # A fresh event per run: the previous run's threads keep seeing theirs set
+        self.stop_event = threading.Event()
+        self.last_dispatched = -1
+        run = (self.stop_event, self.frames, self.results)
+        self.threads = [threading.Thread(target=self._capture_loop, args=run, name="capture", daemon=True),
+                        threading.Thread(target=self._dispatch_loop, args=run, name="dispatch", daemon=True)]
+        self.threads += [threading.Thread(target=self._ocr_loop, args=run, name=f"ocr-{i}", daemon=True)
+                         for i in range(self.ocr_workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        """Signal this run to stop and wait up to `timeout` seconds for its threads"""
+        self.stop_event.set()
+        self.frames.close()
+        self.results.close()
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        # Busy in capture or OCR past the timeout; they exit after that stage
+        self.stopping += [thread for thread in self.threads if thread.is_alive()]
+        self.threads = []
+        # Fresh queues so the pipeline can be restarted
+        self.frames = LatestQueue(self.frames.maxsize)
+        self.results = LatestQueue(self.results.maxsize)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads + self.stopping)
+
+    def snapshot(self):
+        """Counters for logging, including frames dropped by the latest-wins queues"""
+        return dict(self.stats, dropped=self.frames.dropped + self.results.dropped)
+
+    def _capture_loop(self, stop_event, frames, results):
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        sequence = 0
+        next_tick = time.monotonic()
+        while not stop_event.is_set():
+            delay = next_tick - time.monotonic()
+            if delay > 0 and stop_event.wait(delay):
+                break
+            next_tick = max(next_tick + interval, time.monotonic())
+
+            with self.busy_lock:
+                saturated = self.busy_workers >= self.ocr_workers
+            if saturated and frames.full():
+                self.stats['throttled'] += 1
+                continue
+
+            try:
+                frame = self.capture()
+            except Exception as e:
+                self.on_error("capture", e)
+                continue
+            if frame is None:
+                continue
+            self.stats['captured'] += 1
+            if frame is REPEATED_FRAME:
+                # Nothing to repeat before the first real frame of this run
+                if not sequence or not frames.put((sequence - 1, frame), evict=False):
+                    self.stats['stale'] += 1
+                continue
+            frames.put((sequence, frame))
+            sequence += 1
+
+    def _ocr_loop(self, stop_event, frames, results):
+        # Each run's threads only use that run's event and queues, so a restart never receives stale items
+        while not stop_event.is_set():
+            item = frames.get(timeout=0.5)
+            if item is None:
+                continue
+            sequence, frame = item
+            with self.busy_lock:
+                self.busy_workers += 1
+            try:
+                result = self.recognize(frame)
+            except Exception as e:
+                self.on_error("ocr", e)
+                result = None
+            finally:
+                with self.busy_lock:
+                    self.busy_workers -= 1
+            if result is None:
+                continue
+            self.stats['recognized'] += 1
+            if not results.put((sequence, result), evict=result is not REPEATED_FRAME):
+                self.stats['stale'] += 1
+
+    def _dispatch_loop(self, stop_event, frames, results):
+        while not stop_event.is_set():
+            item = results.get(timeout=0.5)
+            if item is None:
+                continue
+            self._dispatch(*item)
+
+    def _dispatch(self, sequence, result):
+        """Solve `result` unless a newer frame was already dispatched"""
+        if result is REPEATED_FRAME:
+            # Only meaningful right after the frame it repeats
+            stale = sequence != self.last_dispatched
+        else:
+            stale = sequence < self.last_dispatched
+        if stale:
+            self.stats['stale'] += 1
+            return
+        self.last_dispatched = sequence
+        try:
+            self.solve(result)
+            self.stats['dispatched'] += 1
+        except Exception as e:
+            self.on_error("solve", e)
@@ -0,0 +1,108 @@
+import numpy as np
+from PIL import Image
+
+
+def grayscale(image) -> np.ndarray:
+    """uint8 luma array of a PIL image.
+
+    PIL's C luma conversion is several times faster than the equivalent
+    integer matmul in NumPy, so only the thresholding runs in NumPy.
+    """
+    return np.asarray(image if image.mode == 'L' else image.convert('L'))
+
+
+def otsu_threshold(histogram) -> int:
+    """Threshold that maximizes between-class variance of a 256-bin histogram"""
+    histogram = histogram.astype(np.float64)
+    total = histogram.sum()
+    if total == 0:
+        return 127
+    levels = np.arange(256)
+    weight_bg = np.cumsum(histogram)
+    weight_fg = total - weight_bg
+    cumulative_mean = np.cumsum(histogram * levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = cumulative_mean / weight_bg
+        mean_fg = (cumulative_mean[-1] - cumulative_mean) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.nanargmax(np.nan_to_num(variance, nan=-1.0)))
+
+
+def adaptive_binarize(gray, block_size=31, offset=30) -> np.ndarray:
+    """Threshold each pixel against the mean of its block_size neighbourhood"""
+    radius = block_size // 2
+    padded = np.pad(gray.astype(np.int64), radius + 1, mode='edge')
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    height, width = gray.shape
+    window = block_size
+    sums = (integral[window:window + height, window:window + width]
+            - integral[:height, window:window + width]
+            - integral[window:window + height, :width]
+            + integral[:height, :width])
+    local_mean = sums / (window * window)
+    return gray > local_mean + offset
+
+
+class AutoThreshold:
+    """Per-frame Otsu threshold that is held while the background is stable.
+
+    Keeping the threshold fixed between similar frames means identical
+    screens binarize to identical bytes, which keeps the OCR cache warm.
+    """
+
+    def __init__(self, tolerance=8):
+        self.tolerance = tolerance
+        self.background = None
+        self.threshold = None
+
+    def select(self, histogram) -> int:
+        background = int(histogram.argmax())
+        if self.threshold is None or abs(background - self.background) > self.tolerance:
+            self.background = background
+            self.threshold = otsu_threshold(histogram)
+        return self.threshold
+
+    def reset(self):
+        self.background = None
+        self.threshold = None
+
+
+def binarize(image, threshold=100, auto=None):
+    """Grayscale and threshold `image` in one NumPy pass.
+
+    `threshold` is a brightness cutoff, 'auto' (Otsu, held by `auto` when
+    given) or 'adaptive' (local mean). Returns the binary image ('L', 0/255)
+    and the cutoff that was used ('adaptive' for the local method).
+    """
+    gray_image = image if image.mode == 'L' else image.convert('L')
+    gray = np.asarray(gray_image)
+    if threshold == 'adaptive':
+        mask = adaptive_binarize(gray)
+    else:
+        if threshold == 'auto':
+            # Every 4th pixel in each direction is plenty for a global cutoff
+            histogram = np.bincount(gray[::4, ::4].ravel(), minlength=256)
+            threshold = auto.select(histogram) if auto is not None else otsu_threshold(histogram)
+        mask = gray > threshold
+    return Image.fromarray(mask.view(np.uint8) * np.uint8(255)), threshold
+
+
+def profile_runs(profile, max_gap=0):
+    """(start, end) index pairs of non-zero runs, bridging gaps up to max_gap"""
+    active = np.flatnonzero(profile)
+    if active.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(active) > max_gap + 1)
+    starts = np.concatenate(([active[0]], active[breaks + 1]))
+    ends = np.concatenate((active[breaks], [active[-1]]))
+    return list(zip(starts.tolist(), (ends + 1).tolist()))
+
+
+def find_text_line(mask):
+    """Row span of the line with the most ink (the equation)"""
+    profile = mask.sum(axis=1)
+    # Ignore rows crossed only by thin vertical rules or specks
+    lines = profile_runs(profile > profile.max() * 0.05, max_gap=2)
+    if not lines:
+        return None
+    return max(lines, key=lambda span: mask[span[0]:span[1]].sum())
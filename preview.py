@@ -0,0 +1,86 @@
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+from metrics import NULL_METRICS
+from pipeline import LatestQueue
+
+
+def render_preview(image, boxes, size, band_box=None):
+    """Downscale first, then draw the (scaled) OCR boxes on the small copy.
+
+    With `band_box` only that region is previewed; `size` is then the
+    bounding size and the band keeps its aspect ratio.
+    """
+    if band_box is not None:
+        image = image.crop(band_box)
+        offset_x, offset_y = band_box[0], band_box[1]
+        scale = min(size[0] / image.width, size[1] / image.height)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    else:
+        offset_x = offset_y = 0
+    scale_x, scale_y = size[0] / image.width, size[1] / image.height
+
+    # Nearest-neighbour to twice the target, then a 2x2 box average: close to
+    # a filtered resize at a fraction of the cost on full-resolution frames
+    if image.width >= size[0] * 2 and image.height >= size[1] * 2:
+        preview = image.resize((size[0] * 2, size[1] * 2), Image.NEAREST).convert("RGB").reduce(2)
+    else:
+        preview = image.convert("RGB").resize(size, Image.BILINEAR)
+    draw = ImageDraw.Draw(preview)
+    for x1, y1, x2, y2 in boxes:
+        draw.rectangle(((x1 - offset_x) * scale_x, (y1 - offset_y) * scale_y,
+                        (x2 - offset_x) * scale_x, (y2 - offset_y) * scale_y), outline="red", width=2)
+    return preview
+
+
+class PreviewRenderer:
+    """Renders solve previews on a background thread, newest frame wins.
+
+    `submit` never blocks the solver; the Tk side calls `take` on a timer
+    to pick up the latest finished preview. At most `max_fps` previews are
+    rendered per second.
+    """
+
+    def __init__(self, size, max_fps=10.0, metrics=None):
+        self.size = size
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.metrics = metrics or NULL_METRICS
+        # Preview only the equation band instead of the whole screen
+        self.band_only = False
+        self.requests = LatestQueue(1)
+        self.lock = threading.Lock()
+        self.ready = None
+        self.thread = threading.Thread(target=self._render_loop, name="preview", daemon=True)
+        self.thread.start()
+
+    def submit(self, image, boxes, band_box, *info):
+        """Queue a frame; `info` is handed back unchanged with the rendered image"""
+        self.requests.put((image, boxes, band_box, info))
+
+    def take(self):
+        """(preview, *info) of the newest rendered frame, or None"""
+        with self.lock:
+            ready, self.ready = self.ready, None
+        return ready
+
+    def clear(self):
+        with self.lock:
+            self.ready = None
+
+    def close(self):
+        self.requests.close()
+
+    def _render_loop(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            started = time.monotonic()
+            image, boxes, band_box, info = request
+            with self.metrics.stage('preview_render'):
+                preview = render_preview(image, boxes, self.size, band_box if self.band_only else None)
+            with self.lock:
+                self.ready = (preview,) + info
+            time.sleep(max(0.0, self.min_interval - (time.monotonic() - started)))
@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+
+from preprocessing import find_text_line, profile_runs
+
+# Column gap (relative to line height) still counted as part of the equation;
+# the back button sits much further from the first digit than this
+CLUSTER_GAP_RATIO = 1.5
+# Padding around the detected equation, relative to line height
+MARGIN_RATIO = 0.5
+# Ink this close (px) to the ROI border means the equation outgrew it
+EDGE_PIXELS = 2
+
+
+class EquationRoi:
+    """Locates the equation inside the top band once per frame size.
+
+    Detection binarizes the search band (top `search_fraction` of the
+    screen), takes the inkiest text line from the row profile and the
+    inkiest cluster of columns within it. The padded box is cached per
+    (width, height), so each resolution and orientation gets its own entry.
+    Later frames only OCR the cached box, and `validate` checks the already
+    binarized crop for free: no ink, or ink touching the border, triggers
+    detection again.
+
+    A box is `confirmed` once a reading of it was an equation; only then is
+    it OCR'd with the digits/operators whitelist. Until then, and after any
+    reading that is not an equation, the solver OCRs without the whitelist,
+    so menu and result screens are read as words and rejected.
+    """
+
+    def __init__(self, search_fraction=0.25):
+        self.search_fraction = search_fraction
+        # (width, height) -> (box, ink_is_bright)
+        self.regions = {}
+        # Sizes whose cached box last read as an equation
+        self.confirmed = set()
+        self.lock = threading.Lock()
+        self.detections = 0
+
+    def search_box(self, size):
+        width, height = size
+        return (0, 0, width, max(1, int(height * self.search_fraction)))
+
+    def box(self, size):
+        """Cached equation box for this frame size, or the whole search band"""
+        with self.lock:
+            region = self.regions.get(size)
+        return region[0] if region else self.search_box(size)
+
+    def is_confirmed(self, size):
+        with self.lock:
+            return size in self.confirmed
+
+    def confirm(self, size, box, is_equation):
+        """Record whether the reading of `box` was an equation (ignored unless it is the cached box)"""
+        with self.lock:
+            region = self.regions.get(size)
+            if region is None or region[0] != box:
+                return
+            if is_equation:
+                self.confirmed.add(size)
+            else:
+                self.confirmed.discard(size)
+
+    def validate(self, size, box, binary_crop):
+        """True if `box` is the cached ROI and its binarized crop still fits the equation"""
+        with self.lock:
+            region = self.regions.get(size)
+        if region is None or region[0] != box:
+            return False
+        mask = (np.asarray(binary_crop) > 127) == region[1]
+        if not mask.any():
+            return False
+        edge = EDGE_PIXELS
+        return not (mask[:edge].any() or mask[-edge:].any() or mask[:, :edge].any() or mask[:, -edge:].any())
+
+    def detect(self, size, binary_band, band_box):
+        """Find the equation in the binarized search band; caches and returns its box (or None)"""
+        pixels = np.asarray(binary_band) > 127
+        ink_is_bright = bool(pixels.mean() < 0.5)
+        mask = pixels if ink_is_bright else ~pixels
+
+        line = find_text_line(mask)
+        if line is None:
+            return None
+        top, bottom = line
+        line_height = bottom - top
+        clusters = profile_runs(mask[top:bottom].sum(axis=0), max_gap=int(line_height * CLUSTER_GAP_RATIO))
+        if not clusters:
+            return None
+        left, right = max(clusters, key=lambda span: mask[top:bottom, span[0]:span[1]].sum())
+
+        margin = max(EDGE_PIXELS + 1, int(line_height * MARGIN_RATIO))
+        band_x, band_y, band_right, band_bottom = band_box
+        box = (max(band_x, band_x + left - margin), max(band_y, band_y + top - margin),
+               min(band_right, band_x + right + margin), min(band_bottom, band_y + bottom + margin))
+
+        with self.lock:
+            previous = self.regions.get(size)
+            # Grow-only while the equation stays on the same line, so longer
+            # problems do not keep triggering detection
+            if previous is not None and previous[1] == ink_is_bright:
+                old = previous[0]
+                if old[1] < box[3] and box[1] < old[3]:
+                    box = (min(old[0], box[0]), min(old[1], box[1]), max(old[2], box[2]), max(old[3], box[3]))
+            self.regions[size] = (box, ink_is_bright)
+            self.confirmed.discard(size)
+            self.detections += 1
+        return box
+
+    def reset(self):
+        with self.lock:
+            self.regions.clear()
+            self.confirmed.clear()
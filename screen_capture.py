@@ -1,17 +1,295 @@
 import subprocess
 import io
+import threading
+import time
 from PIL import Image
+from metrics import NULL_METRICS
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# `screencap` raw pixel formats -> (PIL mode, raw decoder mode, bytes per pixel)
+RAW_FORMATS = {
+    1: ('RGBA', 'RGBA', 4),    # RGBA_8888
+    2: ('RGBX', 'RGBX', 4),    # RGBX_8888
+    3: ('RGB', 'RGB', 3),      # RGB_888
+    4: ('RGB', 'BGR;16', 2),   # RGB_565
+    5: ('RGBA', 'BGRA', 4),    # BGRA_8888
+}
+# Modes Image.frombuffer can map without copying
+ZERO_COPY_MODES = ('RGBA', 'RGBX')
+# Top part of the screen the solver reads (its default equation band and ROI search band)
+EQUATION_BAND_FRACTION = 0.25
+
+
+def adb_command(serial, *args):
+    """adb argv, targeting `serial` when given (otherwise the default device)"""
+    return ["adb", "-s", serial, *args] if serial else ["adb", *args]
+
+
+def list_devices():
+    """Serials of devices that adb reports in the `device` (ready) state"""
+    try:
+        process = subprocess.Popen(
+            ["adb", "devices"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, _ = process.communicate()
+    except FileNotFoundError:
+        print("Error: ADB not found. Please ensure ADB is installed and in your system's PATH.")
+        return []
+    serials = []
+    for line in stdout.decode().strip().split('\n')[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == 'device':
+            serials.append(parts[0])
+    return serials
+
+
+def parse_raw_header(data):
+    """Return (width, height, format) from a raw `screencap` header"""
+    width = int.from_bytes(data[0:4], 'little')
+    height = int.from_bytes(data[4:8], 'little')
+    pixel_format = int.from_bytes(data[8:12], 'little')
+    if pixel_format not in RAW_FORMATS:
+        raise ValueError(f"Unsupported screencap pixel format: {pixel_format}")
+    return width, height, pixel_format
+
+
+def raw_frame_size(width, height, pixel_format):
+    return width * height * RAW_FORMATS[pixel_format][2]
+
+
+def detect_raw_header_size(data):
+    """Android 8+ appends a colour-space word to the 12-byte header"""
+    width, height, pixel_format = parse_raw_header(data)
+    header_size = len(data) - raw_frame_size(width, height, pixel_format)
+    if header_size not in (12, 16):
+        raise ValueError(f"Unexpected raw screencap size ({len(data)} bytes for {width}x{height})")
+    return header_size
+
+
+def band_rows(height, fraction=EQUATION_BAND_FRACTION):
+    """Rows of a `height`-row screen that hold the equation band"""
+    return max(1, int(height * fraction))
+
+
+def screen_size(image):
+    """Full screen size of a captured frame, also when only its top rows were decoded"""
+    return image.info.get('screen_size', image.size)
+
+
+def decode_raw_screencap(data, header_size=None, rows=None):
+    """Wrap raw `screencap` output as a PIL Image.
+
+    RGBA/RGBX frames share memory with `data`. `rows` limits decoding to the
+    top rows (e.g. the equation band), so nothing below it is ever converted.
+    """
+    if header_size is None:
+        header_size = detect_raw_header_size(data)
+    return decode_raw_pixels(data, memoryview(data)[header_size:], rows)
+
+
+def decode_raw_pixels(header, pixels, rows=None):
+    """Like decode_raw_screencap, with the header and pixel buffer read separately.
+
+    A frame cut down to `rows` keeps the full screen size in
+    `image.info['screen_size']` (see screen_size).
+    """
+    width, screen_height, pixel_format = parse_raw_header(header)
+    mode, raw_mode, bytes_per_pixel = RAW_FORMATS[pixel_format]
+    height = min(screen_height, rows) if rows is not None else screen_height
+
+    # ZERO_COPY_MODES are mapped onto the buffer; other formats are converted
+    # straight from it, so the pixels are never copied as bytes first
+    pixels = memoryview(pixels)[:width * height * bytes_per_pixel]
+    image = Image.frombuffer(mode, (width, height), pixels, 'raw', raw_mode, 0, 1)
+    if height != screen_height:
+        image.info['screen_size'] = (width, screen_height)
+    return image
+
+
+class AdbShellSession:
+    """Long-lived `adb exec-out sh` process that commands are streamed into"""
+
+    def __init__(self, serial=None, read_timeout=5.0):
+        self.serial = serial
+        self.read_timeout = read_timeout
+        self.process = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Spawn the shell process; returns True when it is running"""
+        self.close()
+        try:
+            self.process = subprocess.Popen(
+                adb_command(self.serial, "exec-out", "sh"),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            return True
+        except FileNotFoundError:
+            print("Error: ADB not found. Please ensure ADB is installed and in your system's PATH.")
+        except Exception as e:
+            print(f"Error starting ADB session: {e}")
+        self.process = None
+        return False
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def send(self, command):
+        """Write a single shell command line to the session"""
+        self.process.stdin.write(command.encode() + b'\n')
+        self.process.stdin.flush()
+
+    def read_exact(self, size):
+        """Read exactly `size` bytes, killing the session if the device stalls"""
+        watchdog = threading.Timer(self.read_timeout, self._kill)
+        watchdog.start()
+        try:
+            data = self.process.stdout.read(size)
+        finally:
+            watchdog.cancel()
+        if data is None or len(data) != size:
+            raise EOFError("ADB session closed while reading frame")
+        return data
+
+    def read_into(self, buffer):
+        """Fill the writable `buffer` from the stream, killing the session if the device stalls"""
+        watchdog = threading.Timer(self.read_timeout, self._kill)
+        watchdog.start()
+        filled = 0
+        try:
+            while filled < len(buffer):
+                count = self.process.stdout.readinto(buffer[filled:])
+                if not count:
+                    break
+                filled += count
+        finally:
+            watchdog.cancel()
+        if filled != len(buffer):
+            raise EOFError("ADB session closed while reading frame")
+
+    def read_raw(self, header_size):
+        """Read one raw `screencap` frame (header + pixels) into a single buffer.
+
+        The buffer is allocated once at the frame's size and the pixels are
+        read straight into it; it is not reused, as decoded images share it.
+        """
+        header = self.read_exact(header_size)
+        width, height, pixel_format = parse_raw_header(header)
+        data = bytearray(header_size + raw_frame_size(width, height, pixel_format))
+        data[:header_size] = header
+        self.read_into(memoryview(data)[header_size:])
+        return data
+
+    def read_png(self):
+        """Read one PNG from the stream by walking its chunks up to IEND"""
+        signature = self.read_exact(8)
+        if signature != PNG_SIGNATURE:
+            raise ValueError("Unexpected data in ADB stream (not a PNG)")
+        buffer = bytearray(signature)
+        while True:
+            chunk_header = self.read_exact(8)
+            length = int.from_bytes(chunk_header[:4], 'big')
+            buffer += chunk_header
+            buffer += self.read_exact(length + 4)  # data + CRC
+            if chunk_header[4:] == b'IEND':
+                return bytes(buffer)
+
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        self._kill()
+        try:
+            self.process.wait(timeout=1)
+        except Exception:
+            pass
+        self.process = None
+
 
 class ScreenCapture:
-    def __init__(self):
-        pass
+    def __init__(self, persistent=True, max_failures=3, retry_after=10.0, health_ttl=2.0,
+                 capture_format='png', serial=None, metrics=None, band_fraction=EQUATION_BAND_FRACTION):
+        # adb serial of the target device; None uses adb's default device
+        self.serial = serial
+
+        # 'png' asks the device for `screencap -p`; 'raw' skips PNG encode/decode
+        # and wraps the framebuffer bytes directly
+        if capture_format not in ('png', 'raw'):
+            raise ValueError(f"Unknown capture format: {capture_format}")
+        self.capture_format = capture_format
+        self.raw_header_size = None
+        # Raw frames are only decoded down to this top fraction of the screen
+        # (the equation band); None decodes the whole screen, e.g. for a preview
+        self.band_fraction = band_fraction
+        self.metrics = metrics or NULL_METRICS
+
+        # Persistent session settings: after `max_failures` consecutive errors we
+        # fall back to one-shot `adb exec-out screencap` for `retry_after` seconds
+        self.persistent = persistent
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+        self.health_ttl = health_ttl
+
+        self.session = None
+        self.consecutive_failures = 0
+        self.persistent_disabled_until = 0.0
+        self.frames_captured = 0
+        self.last_frame_time = None
+        self.last_error = None
 
     def capture_android_screen(self):
         """Capture screen from adb and convert to PIL Image"""
+        if self._persistent_available():
+            image = self._capture_persistent()
+            if image is not None:
+                return image
+        return self._capture_oneshot()
+
+    def _persistent_available(self):
+        return self.persistent and time.monotonic() >= self.persistent_disabled_until
+
+    def _capture_persistent(self):
+        """Request a frame over the long-lived adb shell"""
+        if self.capture_format == 'raw' and self.raw_header_size is None:
+            # The header layout is learned from the first one-shot frame
+            return None
+        try:
+            if self.session is None:
+                self.session = AdbShellSession(self.serial)
+            with self.session.lock:
+                if not self.session.is_alive() and not self.session.start():
+                    raise RuntimeError("could not start ADB session")
+                if self.capture_format == 'raw':
+                    self.session.send("screencap")
+                    data = self.session.read_raw(self.raw_header_size)
+                else:
+                    self.session.send("screencap -p")
+                    data = self.session.read_png()
+            image = self._decode(data)
+            self._record_success()
+            return image
+        except Exception as e:
+            self._record_failure(e)
+            if self.session is not None:
+                self.session.close()
+            return None
+
+    def _capture_oneshot(self):
+        """Spawn a dedicated `adb exec-out screencap` for a single frame"""
+        raw = self.capture_format == 'raw'
         try:
             # Use adb to capture the screen and pipe the output
             process = subprocess.Popen(
-                ["adb", "exec-out", "screencap -p"],
+                adb_command(self.serial, "exec-out", "screencap" if raw else "screencap -p"),
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE
             )
             stdout, stderr = process.communicate()
@@ -21,7 +299,11 @@ class ScreenCapture:
                 return None
 
             # Convert the screencap data to a PIL Image
-            image = Image.open(io.BytesIO(stdout))
+            if raw:
+                self.raw_header_size = detect_raw_header_size(stdout)
+            image = self._decode(stdout)
+            self.frames_captured += 1
+            self.last_frame_time = time.monotonic()
             return image
 
         except FileNotFoundError:
@@ -31,8 +313,61 @@ class ScreenCapture:
             print(f"Error capturing screen: {e}")
             return None
 
+    def _decode(self, data):
+        """screencap bytes -> PIL Image (PNG is decoded eagerly so it is timed here)"""
+        with self.metrics.stage('decode'):
+            if self.capture_format == 'raw':
+                rows = None
+                if self.band_fraction is not None:
+                    rows = band_rows(parse_raw_header(data)[1], self.band_fraction)
+                return decode_raw_screencap(data, self.raw_header_size, rows)
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            return image
+
+    def _record_success(self):
+        self.consecutive_failures = 0
+        self.frames_captured += 1
+        self.last_frame_time = time.monotonic()
+
+    def _record_failure(self, error):
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if self.consecutive_failures >= self.max_failures:
+            print(f"ADB session unhealthy ({error}), using one-shot capture for {self.retry_after:.0f}s")
+            self.persistent_disabled_until = time.monotonic() + self.retry_after
+            self.consecutive_failures = 0
+
+    def is_session_healthy(self):
+        """True if the persistent session delivered a frame within `health_ttl` seconds"""
+        return (self.session is not None and self.session.is_alive()
+                and self.last_frame_time is not None
+                and time.monotonic() - self.last_frame_time < self.health_ttl)
+
+    def health(self):
+        """Connection health snapshot for logging and diagnostics"""
+        return {
+            'session_alive': self.session is not None and self.session.is_alive(),
+            'persistent_enabled': self._persistent_available(),
+            'frames_captured': self.frames_captured,
+            'consecutive_failures': self.consecutive_failures,
+            'last_frame_age': (time.monotonic() - self.last_frame_time
+                               if self.last_frame_time is not None else None),
+            'last_error': self.last_error,
+        }
+
+    def close(self):
+        """Terminate the persistent adb session, if any"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
     def is_device_connected(self):
         """Check if an Android device is connected via ADB"""
+        # A live session that just delivered a frame proves the device is there
+        if self.is_session_healthy():
+            return True
+
         try:
             process = subprocess.Popen(
                 ["adb", "devices"],
@@ -46,6 +381,8 @@ class ScreenCapture:
 
             # Check if any devices are listed (excluding the header line)
             devices = stdout.decode().strip().split('\n')[1:]
+            if self.serial:
+                return any(line.split()[:2] == [self.serial, 'device'] for line in devices)
             return len(devices) > 0
 
         except FileNotFoundError:
@@ -0,0 +1,232 @@
+import time
+
+from answer_index import AnswerIndex, results_agree
+from frame_change import FrameChangeDetector
+from metrics import NULL_METRICS
+from pipeline import REPEATED_FRAME
+from stabilizer import ProblemStabilizer
+
+
+class SolveSession:
+    """GUI-free capture -> OCR -> solve stages shared by the Tk app and headless mode.
+
+    The three stage methods are what `SolvePipeline` runs on its threads.
+    Results leave through callbacks: `on_solved(img, boxes, raw_text, result,
+    solved_count)` for new answers and `on_log(message)` for status lines.
+
+    Expressions already in `answer_index` (see `load_history_answers`) are
+    looked up as soon as their text is read and answered from it without
+    evaluating them. With `verify_answers` the result is still computed and
+    a disagreement is flagged and resolved in favour of the fresh result.
+
+    A problem is only solved once `confirm_frames` frames read it the same
+    way (or one reading reaches `commit_confidence`), so screens caught
+    mid-transition do not produce wrong answers; see ProblemStabilizer.
+    `confirm_frames=1` solves every new reading at once.
+
+    With an `answer_input` (see answer_input.AnswerInput) every new answer
+    is typed into the device before it is recorded and shown.
+    """
+
+    def __init__(self, screen_capture, solver, history_manager, on_solved=None, on_log=None,
+                 metrics=None, verify_answers=False, confirm_frames=2, commit_confidence=None,
+                 answer_input=None):
+        self.screen_capture = screen_capture
+        self.solver = solver
+        self.history_manager = history_manager
+        self.on_solved = on_solved or (lambda *args: None)
+        self.on_log = on_log or print
+        self.frame_detector = FrameChangeDetector()
+        self.metrics = metrics or NULL_METRICS
+        self.answer_index = AnswerIndex()
+        self.verify_answers = verify_answers
+        self.stabilizer = ProblemStabilizer(min_agree=confirm_frames, min_confidence=commit_confidence)
+        self.answer_input = answer_input
+
+        self.last_problem = None
+        # Newest problem reading still waiting for confirmation (solve thread only)
+        self.pending_reading = None
+        # Last problem whose solve failed; it is retried but only logged once
+        self.failed_problem = None
+        self.solved_count = 0
+        # (threshold, division_mode) used for the next captured frame
+        self.ocr_settings = (100, False)
+
+    def load_history_answers(self, entries=None):
+        """Fill the answer index from expression-mode history; returns the number of known problems"""
+        if entries is None:
+            entries = self.history_manager.known_answers()
+        return self.answer_index.load(entries)
+
+    def process_single_frame(self):
+        """Process a single frame from the screen, running every stage in turn.
+
+        An explicit one-off solve, so the answer is not held back for confirmation.
+        """
+        frame = self.capture_frame()
+        if frame is not None:
+            self.solve_frame(self.recognize_frame(frame), stabilize=False)
+
+    def capture_frame(self):
+        """Capture stage: grab a frame, skipping it if the equation band is unchanged"""
+        # Check if a device is connected
+        with self.metrics.stage('device_check'):
+            connected = self.screen_capture.is_device_connected()
+        if not connected:
+            self.metrics.incr('no_device')
+            self.on_log("No Android device found. Please connect a device.")
+            return None
+
+        # Capture screen
+        captured_at = time.monotonic()
+        with self.metrics.stage('capture'):
+            img = self.screen_capture.capture_android_screen()
+        if img is None:
+            self.metrics.incr('capture_failed')
+            self.on_log("No image captured, retrying...")
+            return None
+
+        # Skip OCR when the equation band has not changed since the last frame
+        threshold, division_mode = self.ocr_settings
+        if self.frame_detector.is_unchanged(img, self.solver.equation_box(img), threshold, division_mode):
+            self.metrics.incr('frame_unchanged')
+            # Still worth a trip to the solve stage: it confirms the pending problem
+            return REPEATED_FRAME if self.stabilizer.pending() else None
+        return img, threshold, division_mode, captured_at
+
+    def recognize_frame(self, frame):
+        """OCR stage: extract the problem from a captured frame"""
+        if frame is REPEATED_FRAME:
+            return frame
+        img, threshold, division_mode, captured_at = frame
+        operation, numbers, raw_text, boxes, confidence = self.solver.read_problem(img, threshold, division_mode)
+        # Division mode reads '+' as '/', so only plain expressions are indexed
+        known = self.answer_index.get(raw_text) if operation == 'expression' else None
+        return img, operation, numbers, raw_text, boxes, confidence, captured_at, known
+
+    def solve_frame(self, recognized, stabilize=True):
+        """Solve stage: validate, confirm, deduplicate and solve (runs on one thread only)"""
+        if recognized is REPEATED_FRAME:
+            if self.pending_reading is not None:
+                self._commit(self.pending_reading, self.stabilizer.repeat())
+            return
+        img, operation, numbers, raw_text, boxes, confidence, captured_at, known = recognized
+        if operation and numbers:
+            with self.metrics.stage('validate'):
+                valid = self.solver.is_valid_equation_window(raw_text)
+            if not valid:
+                self.metrics.incr('invalid_window')
+                self.stabilizer.observe(None)
+                return
+
+            current_problem = f"{operation}_{numbers}"
+            if current_problem == self.last_problem:
+                self.metrics.incr('duplicate')
+                self.stabilizer.observe(current_problem)
+                return
+            if self.pending_reading is not None and self.pending_reading[5] == current_problem:
+                # Latency counts from the first frame that showed the problem
+                captured_at = self.pending_reading[6]
+            self.pending_reading = (img, operation, numbers, raw_text, boxes, current_problem, captured_at, known)
+            waited = self.stabilizer.observe(current_problem, confidence, force=not stabilize)
+            self._commit(self.pending_reading, waited)
+        else:
+            self.stabilizer.observe(None)
+            self.metrics.incr('not_equation')
+            self.on_log(f"Skipped: {raw_text} (not recognized as equation)")
+
+    def _commit(self, reading, waited):
+        """Solve a reading once the stabilizer confirmed it (`waited` is not None)"""
+        if waited is None:
+            self.metrics.incr('unconfirmed')
+            return
+        self.pending_reading = None
+        if self.metrics.enabled:
+            self.metrics.record('stabilize', waited)
+        img, operation, numbers, raw_text, boxes, current_problem, captured_at, known = reading
+        with self.metrics.stage('solve'):
+            result = self._solve(operation, numbers, raw_text, known)
+        if result is not None:
+            self.failed_problem = None
+            self._handle_successful_solve(img, boxes, raw_text, result, current_problem, captured_at, operation)
+            return
+        self.metrics.incr('solve_failed')
+        # Not done with this problem: read the screen again instead of skipping it as unchanged
+        self.stabilizer.release(current_problem)
+        self.frame_detector.reset()
+        if self.solver.last_error is not None and current_problem != self.failed_problem:
+            self.on_log(f"Could not solve {raw_text}: {self.solver.last_error.message}")
+        self.failed_problem = current_problem
+
+    def _solve(self, operation, numbers, raw_text, stored=None):
+        """Answer with `stored` (looked up at OCR time) when known, otherwise (or to verify) calculate"""
+        if operation != 'expression':
+            return self.solver.calculate_result(operation, numbers)
+
+        self.answer_index.count(stored)
+        if stored is not None:
+            self.metrics.incr('answer_hit')
+            if not self.verify_answers:
+                return stored
+        else:
+            self.metrics.incr('answer_miss')
+
+        result = self.solver.calculate_result(operation, numbers)
+        if result is None:
+            return stored
+        if stored is not None and not results_agree(stored, result):
+            self.answer_index.flag_mismatch()
+            self.metrics.incr('answer_mismatch')
+            self.on_log(f"History answer {stored} for {raw_text} differs from computed {result}; using {result}")
+        self.answer_index.record(raw_text, result)
+        return result
+
+    def _handle_successful_solve(self, img, boxes, raw_text, result, current_problem, captured_at=None,
+                                 operation='expression'):
+        """Type the new answer (if enabled), record it and hand it to the front end"""
+        self.solved_count += 1
+        self.last_problem = current_problem
+        self.metrics.incr('solved')
+        if self.answer_input is not None:
+            self.answer_input.send(result, captured_at)
+        with self.metrics.stage('history_write'):
+            self.history_manager.save_history(raw_text, result, operation)
+        self.on_solved(img, boxes, raw_text, result, self.solved_count)
+
+    def reset(self):
+        self.last_problem = None
+        self.pending_reading = None
+        self.failed_problem = None
+        self.solved_count = 0
+        self.frame_detector.reset()
+        self.stabilizer.reset()
+        self.answer_index.reset_stats()
+        self.solver.auto_threshold.reset()
+        if self.solver.roi is not None:
+            self.solver.roi.reset()
+
+    def stats_lines(self):
+        """Human-readable counters for the end of a solving run"""
+        stats = self.frame_detector.stats()
+        lines = [f"Unchanged frames skipped: {stats['hits']}/{stats['hits'] + stats['misses']} "
+                 f"({stats['hit_rate']:.0%})"]
+        if self.solver.ocr_cache is not None:
+            cache_stats = self.solver.ocr_cache.stats()
+            lines.append(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                         f"{cache_stats['size']} entries")
+        answer_stats = self.answer_index.stats()
+        lines.append(f"History answers: {answer_stats['hits']} hits, {answer_stats['misses']} misses "
+                     f"({answer_stats['hit_rate']:.0%}), {answer_stats['mismatches']} mismatches, "
+                     f"{answer_stats['size']} known")
+        stabilizer_stats = self.stabilizer.stats()
+        lines.append(f"Confirmation: {stabilizer_stats['commits']} problems committed, "
+                     f"{stabilizer_stats['rejected']} transient readings dropped, "
+                     f"wait {stabilizer_stats['mean_wait'] * 1000:.0f} ms mean / "
+                     f"{stabilizer_stats['max_wait'] * 1000:.0f} ms max")
+        if self.answer_input is not None:
+            input_stats = self.answer_input.stats()
+            lines.append(f"Answers typed: {input_stats['sent']} ({input_stats['failed']} failed"
+                         f"{', dry run' if input_stats['dry_run'] else ''}), capture-to-input "
+                         f"{input_stats['mean_latency'] * 1000:.0f} ms mean / "
+                         f"{input_stats['max_latency'] * 1000:.0f} ms max")
+        return lines
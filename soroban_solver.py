@@ -1,158 +1,194 @@
-import pytesseract
-import re
+from fractions import Fraction
+from equation_parser import clean_ocr_text, is_equation_text, is_well_formed_expression, parse_equation
+from expression_eval import ExpressionError, ExpressionEvaluator
+from ocr_backends import create_ocr_backend
+from metrics import NULL_METRICS
+from preprocessing import AutoThreshold, binarize
+from roi import EquationRoi
+from screen_capture import screen_size
 
 
 class SorobanSolver:
-    def __init__(self):
-        pass
+    def __init__(self, ocr_cache=None, ocr_backend=None, metrics=None, arithmetic='float',
+                 detect_roi=True, ensemble=None):
+        # Optional OCRCache; repeat screens skip Tesseract entirely
+        self.ocr_cache = ocr_cache
+        # Any ocr_backends.OCRBackend; defaults to the fastest one installed
+        self.ocr_backend = ocr_backend if ocr_backend is not None else create_ocr_backend()
+        # Otsu cutoff held across frames while the background stays the same
+        self.auto_threshold = AutoThreshold()
+        self.metrics = metrics or NULL_METRICS
+        # Safe `+ - * / ( )` evaluator: 'float', or exact 'fraction' / 'decimal'
+        self.evaluator = ExpressionEvaluator(arithmetic)
+        # ExpressionError from the last failed calculate_result, if any
+        self.last_error = None
+        # Tight equation box cached per resolution; None OCRs the whole top quarter
+        self.roi = EquationRoi() if detect_roi else None
+        # Optional ensemble_ocr.EnsembleOCR: several thresholds per frame, voted
+        self.ensemble = ensemble
+
+    def equation_box(self, image):
+        """Region of the screen that holds the equation"""
+        if self.roi is not None:
+            return self.roi.box(screen_size(image))
+        width, height = screen_size(image)
+        return (0, 0, width, height // 4)
 
     def extract_problem_from_soroban(self, image, threshold=100, division_mode=False):
-        """Extract mathematical problem from soroban app screen"""
-        width, height = image.size
-        cropped = image.crop((0, 0, width, height // 4))
-
-        # Convert to grayscale and binarize with dynamic threshold
-        gray = cropped.convert('L').point(lambda x: 255 if x > threshold else 0, '1')
-
+        """Extract mathematical problem from soroban app screen.
+
+        `threshold` is a brightness cutoff, 'auto' or 'adaptive' (see preprocessing.binarize).
+        """
+        return self.read_problem(image, threshold, division_mode)[:4]
+
+    def read_problem(self, image, threshold=100, division_mode=False):
+        """Like extract_problem_from_soroban, plus the mean OCR word confidence (0-100).
+
+        The confidence is None when the engine gives none or the reading came from the OCR cache.
+        """
+        with self.metrics.stage('crop_binarize'):
+            size = screen_size(image)
+            box = self.equation_box(image)
+            cropped = image.crop(box)
+
+            # Convert to grayscale and binarize in one vectorized pass
+            gray, threshold = binarize(cropped, threshold, self.auto_threshold)
+            # The digits/operators whitelist would turn menu words into numbers, so it
+            # is only used on an equation box that already read as an equation
+            restrict = False
+            if self.roi is not None:
+                if self.roi.validate(size, box, gray):
+                    restrict = self.ocr_backend.has_whitelist and self.roi.is_confirmed(size)
+                else:
+                    box, gray = self._locate_equation(image, box, gray, threshold)
+
+        engine = self.ocr_backend.name + ("+ensemble" if self.ensemble is not None else "")
+        if not restrict:
+            engine += "+words"
+        cache_key = None
+        if self.ocr_cache is not None:
+            cache_key = self.ocr_cache.make_key(gray, threshold, division_mode, engine)
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.incr('ocr_cache_hit')
+                operation, numbers, text, boxes = cached
+                self._confirm_roi(size, box, text)
+                return operation, numbers, text, list(boxes), None
+
+        operation, numbers, text, boxes, confidence = self._recognize(image, box, gray, threshold,
+                                                                      division_mode, restrict)
+        if restrict and not is_well_formed_expression(text):
+            # The whitelist forces any text into digits and operators; read it again without
+            self.metrics.incr('whitelist_reread')
+            operation, numbers, text, boxes, confidence = self._recognize(image, box, gray, threshold,
+                                                                          division_mode, False)
+
+        if cache_key is not None:
+            self.ocr_cache.put(cache_key, (operation, numbers, text, boxes))
+        self._confirm_roi(size, box, text)
+
+        return operation, numbers, text, boxes, confidence
+
+    def _recognize(self, image, box, gray, threshold, division_mode, restrict):
+        """OCR and parse the binarized equation box: (operation, numbers, text, boxes, confidence)"""
+        if self.ensemble is not None:
+            return self._ensemble_read(image, box, gray, threshold, division_mode, restrict)
         # Get OCR data
-        data = pytesseract.image_to_data(gray, config='--oem 3 --psm 7', output_type=pytesseract.Output.DICT)
-
-        # Filter out back button
-        filtered_data = {
-            'text': [],
-            'left': [],
-            'top': [],
-            'width': [],
-            'height': []
-        }
-        width, height = image.size
-        back_button_x_threshold = width / 5  # Adjust as needed
-        for i, text in enumerate(data['text']):
-            x = data['left'][i]
-            if text != '<' or x > back_button_x_threshold:
-                filtered_data['text'].append(text)
-                filtered_data['left'].append(data['left'][i])
-                filtered_data['top'].append(data['top'][i])
-                filtered_data['width'].append(data['width'][i])
-                filtered_data['height'].append(data['height'][i])
-        data = filtered_data
+        with self.metrics.stage('ocr'):
+            data = self.ocr_backend.image_to_data(gray, restrict)
+
+        with self.metrics.stage('parse'):
+            return self._read_ocr_data(data, image.size[0], division_mode, offset=box[:2])
+
+    def _confirm_roi(self, size, box, text):
+        if self.roi is not None:
+            self.roi.confirm(size, box, is_equation_text(text))
+
+    def _ensemble_read(self, image, box, gray, threshold, division_mode, restrict=True):
+        """OCR the equation box at several thresholds and parse the voted text"""
+        with self.metrics.stage('ocr'):
+            text, boxes, confidence, early_exit = self.ensemble.recognize(
+                lambda data: self._ocr_words(data, image.size[0], box[:2]),
+                image.crop(box), threshold, gray, self.ocr_backend, restrict)
+        self.metrics.incr('ensemble_early_exit' if early_exit else 'ensemble_vote')
+        with self.metrics.stage('parse'):
+            operation, numbers = self._parse_mathematical_expression(text, division_mode)
+        return operation, numbers, text, boxes, confidence
+
+    def _locate_equation(self, image, box, gray, threshold):
+        """(Re)detect the equation ROI; returns its box and binarized crop"""
+        self.metrics.incr('roi_detect')
+        size = screen_size(image)
+        search_box = self.roi.search_box(size)
+        if box != search_box:
+            gray, _ = binarize(image.crop(search_box), threshold)
+        roi_box = self.roi.detect(size, gray, search_box)
+        if roi_box is None:
+            return search_box, gray
+        return roi_box, gray.crop((roi_box[0] - search_box[0], roi_box[1] - search_box[1],
+                                   roi_box[2] - search_box[0], roi_box[3] - search_box[1]))
+
+    def _read_ocr_data(self, data, image_width, division_mode, offset=(0, 0)):
+        """Turn OCR word data into (operation, numbers, text, boxes, confidence).
+
+        `offset` is the crop's top-left corner; boxes come back in full-image coordinates.
+        """
+        words, boxes, confidences = self._ocr_words(data, image_width, offset)
 
         # Clean OCR text: Remove common OCR confusions
-        cleaned_words = []
-        for w in data['text']:
-            if w.strip():
-                w = (w.replace('O', '0')
-                       .replace('o', '0')
-                       .replace('l', '1')
-                       .replace('I', '1')
-                       .replace('÷', '/')
-                       .replace(':', '/')
-                       .replace('x', '*')
-                       .replace('×', '*')
-                       .replace('−', '-')
-                       .replace('–', '-')
-                       .replace('|', '1')
-                       .replace('“', '"')
-                       .replace('”', '"'))
-                cleaned_words.append(w)
-        text = " ".join(cleaned_words)
-
-        # Get bounding boxes for detected text
-        boxes = []
-        for i, word in enumerate(data['text']):
-            if word.strip():
-                x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                boxes.append((x, y, x + w, y + h))
-
-        # Clean up boxes that are zero size
-        boxes = [box for box in boxes if (box[2] - box[0]) > 0 and (box[3] - box[1]) > 0 ]
+        text = clean_ocr_text(words)
 
         # Parse mathematical expression
         operation, numbers = self._parse_mathematical_expression(text, division_mode)
-        
-        return operation, numbers, text.strip(), boxes
+
+        return operation, numbers, text.strip(), boxes, self._mean_confidence(confidences)
+
+    @staticmethod
+    def _mean_confidence(confidences):
+        """Mean of the reported word confidences; Tesseract uses -1 for 'none'"""
+        known = [confidence for confidence in confidences if confidence >= 0]
+        return sum(known) / len(known) if known else None
+
+    def _ocr_words(self, data, image_width, offset=(0, 0)):
+        """Non-blank words (minus the back button), their boxes and confidences"""
+        back_button_x_threshold = image_width / 5  # Adjust as needed
+        offset_x, offset_y = offset
+        confidences = data.get('conf') or [-1.0] * len(data['text'])
+        words = []
+        boxes = []
+        word_confidences = []
+        for text, x, y, w, h, conf in zip(data['text'], data['left'], data['top'], data['width'],
+                                          data['height'], confidences):
+            x += offset_x
+            y += offset_y
+            # Filter out back button
+            if (text == '<' and x <= back_button_x_threshold) or not text.strip():
+                continue
+            words.append(text)
+            word_confidences.append(float(conf))
+            # Skip boxes that are zero size
+            if w > 0 and h > 0:
+                boxes.append((x, y, x + w, y + h))
+        return words, boxes, word_confidences
 
     def _parse_mathematical_expression(self, text, division_mode=False):
         """Parse mathematical expression from OCR text"""
-        cleaned = text.replace('×', '*').replace('x', '*').replace('−', '-').replace('÷', '/')
-
-        # If division mode is enabled, force division
-        if division_mode:
-            binary_ops = [
-                (r'(\d+\.?\d*)\s*[/÷:]\s*(\d+\.?\d*)', 'division'),
-                (r'(\d+\.?\d*)\s*[+\+]\s*(\d+\.?\d*)', 'division'),  # Treat plus as division
-                (r'(\d+\.?\d*)\s*[*×x]\s*(\d+\.?\d*)', 'division'),
-                (r'(\d+\.?\d*)\s*[-−]\s*(\d+\.?\d*)', 'division'),  # subtraction pattern for minus signs
-            ]
-            for pattern, op_type in binary_ops:
-                match = re.search(pattern, cleaned)
-                if match:
-                    nums = [float(match.group(1)), float(match.group(2))]
-                    return op_type, nums
-
-        # Try parsing full expression first
-        expr = "".join(re.findall(r'[\d\.\+\-\*/\(\)]', cleaned))
-        if expr and re.fullmatch(r'[\d\.\+\-\*/\(\) ]+', expr):
-            return 'expression', expr
-
-        # If full expression fails, fallback to binary operator matching
-        binary_ops = [
-            (r'(\d+\.?\d*)\s*[/÷:]\s*(\d+\.?\d*)', 'division'),
-            (r'(\d+\.?\d*)\s*[\+\+]\s*(\d+\.?\d*)', 'addition'),  # only plus sign for addition
-            (r'(\d+\.?\d*)\s*[*×x]\s*(\d+\.?\d*)', 'multiplication'),
-            (r'(\d+\.?\d*)\s*[-−]\s*(\d+\.?\d*)', 'subtraction'),  # subtraction pattern for minus signs
-        ]
-        for pattern, op_type in binary_ops:
-            match = re.search(pattern, cleaned)
-            if match:
-                nums = [float(match.group(1)), float(match.group(2))]
-                return op_type, nums
-
-        return None, None
+        operation, numbers, _ = parse_equation(text, division_mode)
+        if operation == 'division':
+            return operation, list(numbers)
+        return operation, numbers
 
     def is_valid_equation_window(self, raw_text):
         """Enhanced validation to check if we're looking at a valid equation window"""
         print("Raw text: ", raw_text)
-        
-        # Check 2: Text should be mostly mathematical
-        math_chars = sum(1 for c in raw_text if c.isdigit() or c in '+-*/=().')
-        total_chars = len(raw_text.replace(' ', ''))
-        if total_chars > 0:
-            math_ratio = math_chars / total_chars
-            if math_ratio < 0.6:  # At least 60% should be math-related
-                return False
-        
-        # Check 3: Look for common non-equation indicators
-        if self._contains_non_equation_text(raw_text):
-            return False
-        
-        
-        if not re.search(r'[+\-×x*/÷]', raw_text):
-            return False
-                
-        return True
-
-    def _contains_non_equation_text(self, raw_text):
-        """Check if text contains non-equation indicators"""
-        invalid_patterns = [
-            r'challenge', r'level', r'score', r'time', r'menu', 
-            r'start', r'pause', r'resume', r'home', r'settings'
-        ]
-        text_lower = raw_text.lower()
-        for pattern in invalid_patterns:
-            if re.search(pattern, text_lower):
-                return True
-        return False
+        return is_equation_text(raw_text)
 
     def calculate_result(self, operation, numbers):
         """Calculate the result of the mathematical operation"""
+        self.last_error = None
         try:
             if operation == 'expression':
-                result = eval(numbers, {"__builtins__": None}, {})
-                # Round floats sensibly
-                if isinstance(result, float) and not result.is_integer():
-                    return round(result, 4)
-                return int(result) if isinstance(result, float) and result.is_integer() else result
+                return self._present_result(self.evaluator.evaluate(numbers))
 
             elif operation == 'division':
                 result = numbers[0] / numbers[1]
@@ -170,8 +206,31 @@ class SorobanSolver:
             
             elif operation == 'multiplication':
                 return numbers[0] * numbers[1]
-                
+
+        except ExpressionError as e:
+            self.last_error = e
+            print(f"Calculation error: {e}")
+            return None
         except Exception as e:
             print(f"Calculation error: {e}")
             return None
         return None
+
+    @staticmethod
+    def _present_result(value):
+        """Whole numbers as int, anything else rounded to 4 places as float"""
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float):
+            whole = value.is_integer()
+        elif isinstance(value, Fraction):
+            whole = value.denominator == 1
+        else:  # Decimal
+            whole = value == value.to_integral_value()
+        return int(value) if whole else round(float(value), 4)
+
+if __name__ == "__main__":
+    # `python -m soroban_solver run --headless`
+    import sys
+    from headless import main
+    sys.exit(main())
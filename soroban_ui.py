@@ -1,12 +1,25 @@
 import customtkinter as ctk
-from PIL import Image, ImageDraw
+from PIL import Image
 from customtkinter import CTkImage
-from datetime import datetime
+from log_buffer import LogBuffer
+from preview import PreviewRenderer
+
+# Lines kept in the log box, and how often queued lines are rendered
+LOG_MAX_LINES = 500
+LOG_FLUSH_MS = 100
+# Preview size and the most previews shown per second
+PREVIEW_SIZE = (520, 320)
+PREVIEW_FPS = 10
 
 class SorobanUI:
-    def __init__(self, parent):
+    def __init__(self, parent, metrics=None):
         self.parent = parent
+        self.log = LogBuffer(LOG_MAX_LINES)
+        self.log_line_count = 0
+        self.preview = PreviewRenderer(PREVIEW_SIZE, PREVIEW_FPS, metrics)
         self._create_widgets()
+        self.parent.after(LOG_FLUSH_MS, self._flush_log)
+        self.parent.after(int(1000 / PREVIEW_FPS), self._refresh_preview)
         
     def _create_widgets(self):
         """Create all UI widgets"""
@@ -14,6 +27,7 @@ class SorobanUI:
         self._create_problem_display()
         self._create_control_buttons()
         self._create_config_controls()
+        self._create_stats_display()
         self._create_log_display()
         
     def _create_image_display(self):
@@ -30,11 +44,10 @@ class SorobanUI:
         self.image_label = ctk.CTkLabel(img_container, text="")
         self.image_label.pack(expand=True)
         
-        # Pre-allocate blank image
-        blank_img = Image.new("RGBA", (600, 300), (255, 255, 255, 0))
-        blank_tk_img = CTkImage(light_image=blank_img, size=(600, 300))
-        self.image_label.configure(image=blank_tk_img)
-        self.image_label.image = blank_tk_img
+        # Pre-allocate the preview image; new frames are swapped into it
+        self.blank_image = Image.new("RGBA", PREVIEW_SIZE, (255, 255, 255, 0))
+        self.preview_image = CTkImage(light_image=self.blank_image, size=PREVIEW_SIZE)
+        self.image_label.configure(image=self.preview_image)
 
         self.top_frame = top_frame
 
@@ -60,6 +73,9 @@ class SorobanUI:
         self.clear_button = ctk.CTkButton(btn_frame, text="Clear Log & Reset")
         self.clear_button.grid(row=0, column=1, padx=5)
 
+        self.older_history_button = ctk.CTkButton(btn_frame, text="Load Older History")
+        self.older_history_button.grid(row=0, column=2, padx=5)
+
     def _create_config_controls(self):
         """Create configuration controls"""
         config_frame = ctk.CTkFrame(self.parent)
@@ -73,8 +89,19 @@ class SorobanUI:
                                             number_of_steps=15)
         self.threshold_slider.set(100)
         self.threshold_slider.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.auto_threshold_switch = ctk.CTkSwitch(config_frame, text="Auto")
+        self.auto_threshold_switch.pack(side="left", padx=(0, 10))
         self.division_mode_switch = ctk.CTkSwitch(config_frame, text="Division Mode")
         self.division_mode_switch.pack(side="left", padx=(0, 10))
+        self.band_only_switch = ctk.CTkSwitch(config_frame, text="Band Preview",
+                                              command=self._on_band_only_change)
+        self.band_only_switch.pack(side="left", padx=(0, 10))
+
+    def _create_stats_display(self):
+        """Create the per-stage timing panel"""
+        self.stats_label = ctk.CTkLabel(self.parent, text="", font=("Courier", 11),
+                                        justify="left", anchor="w")
+        self.stats_label.pack(pady=(5, 0), padx=10, fill="x")
 
     def _create_log_display(self):
         """Create log display area"""
@@ -92,8 +119,20 @@ class SorobanUI:
     def set_reset_callback(self, callback):
         self.clear_button.configure(command=callback)
         
+    def set_older_history_callback(self, callback):
+        self.older_history_button.configure(command=callback)
+
+    def set_older_history_enabled(self, enabled):
+        self.older_history_button.configure(state="normal" if enabled else "disabled")
+
     def set_threshold_callback(self, callback):
         self.threshold_slider.configure(command=callback)
+
+    def set_auto_threshold_callback(self, callback):
+        self.auto_threshold_switch.configure(command=callback)
+
+    def set_division_mode_callback(self, callback):
+        self.division_mode_switch.configure(command=callback)
     def get_division_mode(self):
         return self.division_mode_switch.get()
 
@@ -101,50 +140,71 @@ class SorobanUI:
     # UI state getters
     def get_threshold(self):
         return self.threshold_slider.get()
+
+    def get_auto_threshold(self):
+        return self.auto_threshold_switch.get()
     # UI update methods
     def set_toggle_button_text(self, text):
         self.toggle_button.configure(text=text)
 
-    def update_display(self, image, boxes, raw_text, result):
-        """Update the display with new image and results"""
-        width, height = image.size
-        cropped = image.crop((0, 0, width, height // 4)).convert("RGBA")
-        
-        # Draw boxes around detected text
-        overlay = Image.new('RGBA', cropped.size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(overlay)
-        for box in boxes:
-            draw.rectangle(box, outline="red", width=2)
-        highlighted = Image.alpha_composite(cropped, overlay)
-
-        # Paste highlighted area back to full image
-        full_img = image.convert("RGBA")
-        full_img.paste(highlighted, (0, 0))
-
-        # Resize and display
-        resized = full_img.resize((500, 320))
-        tk_img = CTkImage(light_image=resized, size=(520, 320))
-        self.image_label.configure(image=tk_img)
-        self.image_label.image = tk_img
-
-        # Update text labels
-        self.problem_label.configure(text=f"Problem: {raw_text}")
-        self.result_label.configure(text=f"Answer: {result}")
+    def update_display(self, image, boxes, raw_text, result, band_box=None):
+        """Queue a solved frame for the preview (safe to call from any thread).
+
+        The preview is rendered off the Tk thread; `band_box` is the equation
+        region, used when band-only preview is on.
+        """
+        if band_box is None:
+            band_box = (0, 0, image.width, image.height // 4)
+        self.preview.submit(image, boxes, band_box, raw_text, result)
+
+    def _on_band_only_change(self):
+        self.preview.band_only = bool(self.band_only_switch.get())
+
+    def _refresh_preview(self):
+        """Show the newest rendered preview, at most PREVIEW_FPS times a second"""
+        ready = self.preview.take()
+        if ready is not None:
+            with self.preview.metrics.stage('ui_update'):
+                image, raw_text, result = ready
+                self.preview_image.configure(light_image=image, size=image.size)
+                self.problem_label.configure(text=f"Problem: {raw_text}")
+                self.result_label.configure(text=f"Answer: {result}")
+        self.parent.after(int(1000 / PREVIEW_FPS), self._refresh_preview)
+
+    def update_stats(self, lines):
+        """Show stage timings / counters in the stats panel"""
+        self.stats_label.configure(text="\n".join(lines))
 
     def reset_display(self):
         """Reset the display to initial state"""
         self.problem_label.configure(text="Problem: ")
         self.result_label.configure(text="Answer: ")
-        self.image_label.configure(image=None, text="")
-        self.image_label.image = None
+        self.preview.clear()
+        self.preview_image.configure(light_image=self.blank_image, size=PREVIEW_SIZE)
+        self.log.clear()
+        self.log_line_count = 0
         self.log_box.configure(state="normal")
         self.log_box.delete('1.0', 'end')
         self.log_box.configure(state="disabled")
 
+    def close(self):
+        self.preview.close()
+
     def append_log(self, text):
-        """Append text to the log display"""
-        timestamp = datetime.now().strftime("%b %d %I:%M:%S %p")
-        self.log_box.configure(state="normal")
-        self.log_box.insert("end", f"[{timestamp}] {text}\n")
-        self.log_box.configure(state="disabled")
-        self.log_box.see("end")
+        """Queue a line for the log display (safe to call from any thread)"""
+        self.log.append(text)
+
+    def _flush_log(self):
+        """Render queued log lines in one insert and trim the box to LOG_MAX_LINES"""
+        lines = self.log.drain()
+        if lines:
+            self.log_box.configure(state="normal")
+            self.log_box.insert("end", "\n".join(lines) + "\n")
+            self.log_line_count += len(lines)
+            excess = self.log_line_count - LOG_MAX_LINES
+            if excess > 0:
+                self.log_box.delete('1.0', f'{excess + 1}.0')
+                self.log_line_count = LOG_MAX_LINES
+            self.log_box.configure(state="disabled")
+            self.log_box.see("end")
+        self.parent.after(LOG_FLUSH_MS, self._flush_log)
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque
+
+
+class ProblemStabilizer:
+    """Commits a problem only once consecutive frames agree on it.
+
+    Every recognized frame adds its problem key (None for frames without an
+    equation) to a sliding window of the last `window` readings. A problem
+    is committed once it appears `min_agree` times in the window, or at
+    once when a reading's OCR confidence reaches `min_confidence`. A frame
+    whose equation band did not change (see `repeat`) counts as another
+    reading of the previous frame, so a settled screen is confirmed by the
+    very next capture: with the defaults an answer waits one capture
+    interval, and a screen caught mid-transition does not get committed.
+
+    The wait between a problem's first reading and its commit is returned by
+    `observe` so callers can record it. A commit that could not be solved is
+    undone with `release`.
+    """
+
+    def __init__(self, window=4, min_agree=2, min_confidence=None):
+        self.window = window
+        self.min_agree = min_agree
+        self.min_confidence = min_confidence
+        self.readings = deque(maxlen=window)
+        # Problem key -> time it first entered the window
+        self.first_seen = {}
+        self.committed = None
+        self.lock = threading.Lock()
+        self.commits = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def observe(self, key, confidence=None, now=None, force=False):
+        """Add one frame's reading; returns the seconds it waited if `key` should be committed now, else None.
+
+        `force` commits a new problem without waiting for agreement.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if len(self.readings) == self.readings.maxlen:
+                self._forget(self.readings[0])
+            self.readings.append(key)
+            if key is None or key == self.committed:
+                return None
+            self.first_seen.setdefault(key, now)
+            confident = (self.min_confidence is not None and confidence is not None
+                         and confidence >= self.min_confidence)
+            if not (force or confident) and self.readings.count(key) < self.min_agree:
+                return None
+            return self._commit(key, now)
+
+    def repeat(self, now=None):
+        """Count an unchanged frame as another reading of the last one (same return as `observe`)"""
+        with self.lock:
+            if not self.readings:
+                return None
+            key = self.readings[-1]
+        return self.observe(key, now=now)
+
+    def pending(self):
+        """True while the last reading is a problem that has not been committed yet"""
+        with self.lock:
+            return bool(self.readings) and self.readings[-1] not in (None, self.committed)
+
+    def release(self, key):
+        """Undo the commit of `key` (its solve failed), so further readings can commit it again"""
+        with self.lock:
+            if self.committed == key:
+                self.committed = None
+
+    def _commit(self, key, now):
+        # Other problems still in the window were transient readings
+        self.rejected += len(set(self.first_seen) - {key})
+        waited = now - self.first_seen.pop(key)
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.first_seen.clear()
+        self.readings.clear()
+        self.readings.append(key)
+        self.committed = key
+        self.commits += 1
+        return waited
+
+    def _forget(self, key):
+        """`key` is about to leave the window; drop it if this was its last reading"""
+        if key in self.first_seen and self.readings.count(key) == 1:
+            del self.first_seen[key]
+            self.rejected += 1
+
+    def reset(self):
+        with self.lock:
+            self.readings.clear()
+            self.first_seen.clear()
+            self.committed = None
+
+    def stats(self):
+        with self.lock:
+            return {'commits': self.commits, 'rejected': self.rejected,
+                    'mean_wait': self.total_wait / self.commits if self.commits else 0.0,
+                    'max_wait': self.max_wait}
@@ -0,0 +1,137 @@
+"""Cold-start profiling: startup milestones plus per-module import times.
+
+Set SOROBAN_PROFILE_STARTUP=1 to time every import (the same self /
+cumulative split as `python -X importtime`) and print a report once the
+app is ready; SOROBAN_PROFILE_STARTUP=exit also quits at that point, so
+the process lifetime is the cold-start time (see benchmarks/bench_startup).
+Milestones are always recorded; they cost one perf_counter() call each.
+"""
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV = "SOROBAN_PROFILE_STARTUP"
+
+
+class ImportTimer:
+    """Wraps builtins.__import__ and records the first import of every module"""
+
+    def __init__(self):
+        # (name, self seconds, cumulative seconds, nesting depth) in import order
+        self.records = []
+        # Per-thread stack of child import time, for the self/cumulative split
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.original_import = None
+
+    def install(self):
+        self.original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original_import = self.original_import
+        if level:
+            try:
+                resolved = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                resolved = name
+        else:
+            resolved = name
+        # Only the first import of a module does any work
+        if resolved in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+        if threading.current_thread() is not threading.main_thread():
+            resolved = f"{resolved} [{threading.current_thread().name}]"
+
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        with self.lock:
+            index = len(self.records)
+            self.records.append(None)
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self.records[index] = (resolved, cumulative - children, cumulative, len(stack))
+
+    def slowest(self, count=15):
+        """Records with the largest cumulative time"""
+        records = [record for record in self.records if record is not None]
+        return sorted(records, key=lambda record: record[2], reverse=True)[:count]
+
+    def report_lines(self):
+        """`python -X importtime` style: self and cumulative microseconds, indented by depth"""
+        lines = ["import time: self [us] | cumulative | imported package"]
+        for record in self.records:
+            if record is None:
+                continue
+            name, self_time, cumulative, depth = record
+            lines.append(f"import time: {self_time * 1e6:>9.0f} | {cumulative * 1e6:>10.0f} | {'  ' * depth}{name}")
+        return lines
+
+
+class StartupProfile:
+    """Named milestones measured from when this module was first imported"""
+
+    def __init__(self, import_timing=False, exit_when_ready=False):
+        self.started = time.perf_counter()
+        self.marks = []
+        self.lock = threading.Lock()
+        self.exit_when_ready = exit_when_ready
+        self.imports = None
+        if import_timing:
+            self.imports = ImportTimer()
+            self.imports.install()
+
+    def mark(self, name):
+        """Record a milestone (thread-safe); returns seconds since startup"""
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            self.marks.append((name, elapsed))
+        return elapsed
+
+    def stop_import_timing(self):
+        if self.imports is not None:
+            self.imports.uninstall()
+
+    def summary(self):
+        """One line, e.g. 'Startup: imports 160 ms, window 210 ms, ready 380 ms'"""
+        with self.lock:
+            marks = list(self.marks)
+        return "Startup: " + ", ".join(f"{name} {elapsed * 1000:.0f} ms" for name, elapsed in marks)
+
+    def report_lines(self, slowest=15):
+        lines = [self.summary()]
+        if self.imports is not None:
+            lines.append("Slowest imports (cumulative ms):")
+            lines += [f"  {cumulative * 1000:7.1f}  {name}" for name, _, cumulative, _ in self.imports.slowest(slowest)]
+        return lines
+
+
+_profile = None
+
+
+def start_profile():
+    """The process-wide StartupProfile, configured from SOROBAN_PROFILE_STARTUP on first call.
+
+    Call it before any heavy import so import timing sees them.
+    """
+    global _profile
+    if _profile is None:
+        setting = os.environ.get(PROFILE_ENV, "")
+        _profile = StartupProfile(import_timing=bool(setting), exit_when_ready=setting == "exit")
+    return _profile
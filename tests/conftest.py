@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+FAKE_ADB_DIR = os.path.join(REPO_ROOT, "tools", "fake_adb")
+
+
+@pytest.fixture
+def fake_adb(monkeypatch):
+    """Put tools/fake_adb first on PATH with one simulated device; returns the env to adjust"""
+    monkeypatch.setenv("PATH", FAKE_ADB_DIR + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("FAKE_ADB_SERIALS", "FAKE0001")
+    for name in ("FAKE_ADB_SERIALS_FILE", "FAKE_ADB_FRAMES", "FAKE_ADB_INPUT_LOG", "FAKE_ADB_SESSION_LIMIT"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
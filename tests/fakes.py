@@ -0,0 +1,70 @@
+"""Device-free stand-ins for the capture, OCR and history pieces of SolveSession"""
+import time
+
+from PIL import Image
+
+from equation_parser import parse_equation
+from ocr_backends import OCRBackend
+from soroban_solver import SorobanSolver
+
+
+def screen(shade):
+    """A solid frame; every shade is a different screen to the frame-change detector"""
+    return Image.new('L', (64, 64), shade)
+
+
+class NoOCR(OCRBackend):
+    name = "none"
+
+    def image_to_data(self, image, restrict=True):
+        raise AssertionError("ScreenSolver reads screens without OCR")
+
+
+class ScreenSolver(SorobanSolver):
+    """SorobanSolver whose OCR reads `texts[shade]` off a solid frame, taking `ocr_delay` seconds"""
+
+    def __init__(self, texts, ocr_delay=0.0):
+        super().__init__(ocr_backend=NoOCR(), detect_roi=False)
+        self.texts = texts
+        self.ocr_delay = ocr_delay
+
+    def read_problem(self, image, threshold=100, division_mode=False):
+        if self.ocr_delay:
+            time.sleep(self.ocr_delay)
+        text = self.texts[image.getpixel((0, 0))]
+        operation, numbers, _ = parse_equation(text, division_mode)
+        return operation, numbers, text, [], None
+
+
+class ScriptedCapture:
+    """ScreenCapture stand-in: `frames` in order, or whatever `timeline` shows at the current time"""
+
+    def __init__(self, frames=(), timeline=None):
+        self.frames = list(frames)
+        # [(seconds from start, image)], each shown until the next one
+        self.timeline = timeline
+        self.started = time.monotonic()
+
+    def is_device_connected(self):
+        return True
+
+    def capture_android_screen(self):
+        if self.timeline is None:
+            return self.frames.pop(0) if self.frames else None
+        elapsed = time.monotonic() - self.started
+        return [image for start, image in self.timeline if start <= elapsed][-1]
+
+    def close(self):
+        pass
+
+
+class MemoryHistory:
+    def __init__(self):
+        self.saved = []
+
+    def save_history(self, problem, result, mode=None):
+        self.saved.append((problem, result, mode))
+        return True
+
+    def known_answers(self):
+        return [(problem, result) for problem, result, mode in self.saved if mode == 'expression']
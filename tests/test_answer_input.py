@@ -0,0 +1,53 @@
+import time
+
+from answer_input import DONE_MARKER, AnswerInput, input_commands
+from metrics import Metrics
+
+
+def test_input_commands():
+    assert input_commands(104) == "input text 104"
+    assert input_commands(-5, 'KEYCODE_ENTER') == ("input keyevent KEYCODE_MINUS; input text 5; "
+                                                   "input keyevent KEYCODE_ENTER")
+    assert input_commands(2.5) == "input text 2.5"
+
+
+def test_dry_run_reports_without_starting_adb():
+    sent = []
+    answer_input = AnswerInput(submit_key='KEYCODE_ENTER', dry_run=True,
+                               on_sent=lambda answer, command, latency: sent.append((answer, command, latency)))
+    assert answer_input.send(42, captured_at=time.monotonic() - 0.05)
+    assert sent[0][:2] == (42, "input text 42; input keyevent KEYCODE_ENTER")
+    assert sent[0][2] >= 0.05
+    assert answer_input.session.process is None
+    stats = answer_input.stats()
+    assert stats['sent'] == 1 and stats['failed'] == 0 and stats['dry_run']
+
+
+def test_answers_are_typed_over_the_fake_adb_shell(fake_adb, tmp_path):
+    log = tmp_path / "input.log"
+    fake_adb.setenv("FAKE_ADB_INPUT_LOG", str(log))
+    metrics = Metrics(enabled=True)
+    answer_input = AnswerInput(serial="FAKE0001", submit_key='KEYCODE_ENTER', metrics=metrics)
+    try:
+        assert answer_input.send(104, captured_at=time.monotonic())
+        assert answer_input.send(-7)
+    finally:
+        answer_input.close()
+
+    marker = DONE_MARKER.decode()
+    assert log.read_text().splitlines() == [
+        "FAKE0001 input text 104", "FAKE0001 input keyevent KEYCODE_ENTER", f"FAKE0001 echo {marker}",
+        "FAKE0001 input keyevent KEYCODE_MINUS", "FAKE0001 input text 7", "FAKE0001 input keyevent KEYCODE_ENTER",
+        f"FAKE0001 echo {marker}",
+    ]
+    assert answer_input.stats()['sent'] == 2
+    assert metrics.snapshot()['stages']['capture_to_input']['count'] == 1
+
+
+def test_unknown_device_counts_a_failure(fake_adb):
+    answer_input = AnswerInput(serial="MISSING")
+    try:
+        assert not answer_input.send(1)
+    finally:
+        answer_input.close()
+    assert answer_input.stats()['failed'] == 1
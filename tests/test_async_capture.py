@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from async_capture import AsyncCaptureService, Backoff
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def test_backoff_doubles_up_to_the_limit_and_resets():
+    backoff = Backoff(base=0.5, limit=4.0)
+    assert [backoff.next_delay() for _ in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+    backoff.reset()
+    assert backoff.next_delay() == 0.5
+
+
+def test_failing_device_is_retried_after_the_backoff(fake_adb):
+    clock = FakeClock()
+
+    async def scenario():
+        service = AsyncCaptureService('raw', min_backoff=0.5, max_backoff=4.0, clock=clock)
+        await service.start()
+        try:
+            # Not plugged in: every attempt fails and the delay doubles
+            assert await service.capture("GONE") is None
+            channel = service.channels["GONE"]
+            assert channel.backoff.failures == 1 and channel.retry_at == clock.now + 0.5
+
+            # Inside the delay no attempt is made
+            clock.now += 0.4
+            assert await service.capture("GONE") is None
+            assert channel.backoff.failures == 1
+
+            clock.now += 0.1
+            assert await service.capture("GONE") is None
+            assert channel.backoff.failures == 2 and channel.retry_at == clock.now + 1.0
+            assert "not found" in service.health("GONE")['last_error']
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_dropped_session_backs_off_then_recovers(fake_adb):
+    fake_adb.setenv("FAKE_ADB_SESSION_LIMIT", "1")
+    clock = FakeClock()
+
+    async def scenario():
+        service = AsyncCaptureService('raw', min_backoff=0.5, clock=clock)
+        await service.start()
+        try:
+            assert await service.capture("FAKE0001") is not None  # one-shot, learns the header
+            assert await service.capture("FAKE0001") is not None  # persistent session
+            assert await service.capture("FAKE0001") is None      # session dropped
+            assert service.health("FAKE0001")['consecutive_failures'] == 1
+            assert await service.capture("FAKE0001") is None      # backing off
+            clock.now += 0.5
+            image = await service.capture("FAKE0001")              # fresh session
+            assert image is not None
+            health = service.health("FAKE0001")
+            assert health['consecutive_failures'] == 0 and health['frames_captured'] == 3
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_hot_plugged_devices_are_streamed_and_dropped(fake_adb, tmp_path):
+    serials_file = tmp_path / "serials"
+    serials_file.write_text("FAKEA")
+    fake_adb.setenv("FAKE_ADB_SERIALS_FILE", str(serials_file))
+    changes, frames = [], []
+
+    async def scenario():
+        service = AsyncCaptureService('raw', on_device=lambda serial, state: changes.append((serial, state)))
+        await service.start()
+        assert service.monitor.online() == ["FAKEA"]
+        service.stream(20, lambda serial, image: frames.append(serial))
+        try:
+            serials_file.write_text("FAKEA,FAKEB")
+            await wait_for(lambda: "FAKEB" in frames)
+            assert ("FAKEB", "device") in changes and "FAKEB" in service.streams
+
+            serials_file.write_text("FAKEA")
+            await wait_for(lambda: ("FAKEB", None) in changes)
+            assert "FAKEB" not in service.streams and "FAKEB" not in service.channels
+            assert not service.connected("FAKEB") and service.connected("FAKEA")
+        finally:
+            shells = [channel.shell for channel in service.channels.values()]
+            await service.close()
+        return service, shells
+
+    service, shells = asyncio.run(scenario())
+    assert "FAKEA" in frames
+    # Shutdown cancels the monitor and streams and closes every device session
+    assert service.monitor_task.done() and not service.streams and not service.channels
+    assert shells and not any(shell.is_alive() for shell in shells)
@@ -0,0 +1,37 @@
+from equation_parser import clean_ocr_text, is_equation_text, is_well_formed_expression, parse_equation
+
+
+def test_clean_ocr_text_joins_words_and_fixes_look_alikes():
+    assert clean_ocr_text(["l2", " ", "x", "O.5", ""]) == "12 * 0.5"
+    assert clean_ocr_text(["8", "÷", "4", "="]) == "8 / 4 ="
+
+
+def test_is_equation_text():
+    assert is_equation_text("48 + 34 =")
+    assert is_equation_text("6 × 7")
+    assert not is_equation_text("LEVEL 3 - 1")
+    assert not is_equation_text("12 34")
+    assert not is_equation_text("abc + de")
+
+
+def test_parse_expression():
+    assert parse_equation("(3 + 4) × 2 =") == ('expression', "(3+4)*2", True)
+    assert parse_equation("Score") == (None, None, False)
+
+
+def test_parse_division_mode_prefers_the_division():
+    assert parse_equation("12 + 84 / 4", division_mode=True) == ('division', (84.0, 4.0), True)
+    assert parse_equation("9 ÷ 3", division_mode=True) == ('division', (9.0, 3.0), True)
+    # Without an operator between two numbers there is no division to pick
+    assert parse_equation("42", division_mode=True) == ('expression', "42", False)
+
+
+def test_well_formed_expression_rejects_text_forced_into_digits():
+    assert is_well_formed_expression("48 + 34 + 22")
+    assert is_well_formed_expression("(3 + 4) * 2 =")
+    assert is_well_formed_expression("12.5 / 5")
+    # What a whitelisted read of 'LEVEL 3 - START' can look like: still passes the word check
+    assert is_equation_text("1 3 - 1")
+    assert not is_well_formed_expression("1 3 - 1")
+    assert not is_well_formed_expression("48 + + 3")
+    assert not is_well_formed_expression("")
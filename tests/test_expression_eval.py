@@ -0,0 +1,45 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from expression_eval import ExpressionError, ExpressionEvaluator
+
+
+def test_precedence_parentheses_and_unary_minus():
+    evaluator = ExpressionEvaluator()
+    assert evaluator.evaluate("2 + 3 * 4") == 14
+    assert evaluator.evaluate("(2 + 3) * 4") == 20
+    assert evaluator.evaluate("-3 * -2") == 6
+    assert evaluator.evaluate("10 - 4 - 3") == 3
+    assert evaluator.evaluate("7 / 2") == 3.5
+    assert evaluator.evaluate(".5 + 5.") == 5.5
+
+
+def test_arithmetic_modes():
+    assert ExpressionEvaluator('fraction').evaluate("1 / 3 + 1 / 6") == Fraction(1, 2)
+    assert ExpressionEvaluator('decimal').evaluate("0.1 + 0.2") == Decimal('0.3')
+    with pytest.raises(ValueError):
+        ExpressionEvaluator('complex')
+
+
+@pytest.mark.parametrize('expression', ["", "2 +", "(1 + 2", "1 + 2)", "2(3)", "2 ^ 3", "1 / 0", "__import__('os')"])
+def test_bad_input_raises_expression_error(expression):
+    with pytest.raises(ExpressionError):
+        ExpressionEvaluator().evaluate(expression)
+
+
+@pytest.mark.parametrize('expression, position', [("1  +  a", 6), ("  12 +  * 3", 8), ("2 *  ", 3), ("12 + a", 5)])
+def test_error_position_points_into_the_text_as_read(expression, position):
+    with pytest.raises(ExpressionError) as error:
+        ExpressionEvaluator().evaluate(expression)
+    assert error.value.position == position
+    assert error.value.expression == expression
+    assert f"at position {position} in '{expression}'" in str(error.value)
+
+
+def test_results_are_memoized_by_normalized_expression():
+    evaluator = ExpressionEvaluator()
+    evaluator.evaluate("1 + 2")
+    evaluator.evaluate("1+2")
+    assert evaluator.cache_info().hits == 1
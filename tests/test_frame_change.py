@@ -0,0 +1,42 @@
+from PIL import Image
+
+from frame_change import FrameChangeDetector
+
+BOX = (0, 0, 100, 20)
+
+
+def test_unchanged_band_is_a_hit():
+    detector = FrameChangeDetector()
+    image = Image.new('RGB', (100, 40), 'white')
+    assert not detector.is_unchanged(image, BOX)
+    assert detector.is_unchanged(image, BOX)
+    # Noise below the quantization step does not count as a change
+    assert detector.is_unchanged(Image.new('RGB', (100, 40), (250, 250, 250)), BOX)
+    assert detector.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3}
+
+
+def test_changes_inside_the_band_or_settings_are_misses():
+    detector = FrameChangeDetector()
+    image = Image.new('RGB', (100, 40), 'white')
+    detector.is_unchanged(image, BOX)
+    changed = image.copy()
+    changed.paste((0, 0, 0), (10, 5, 60, 15))
+    assert not detector.is_unchanged(changed, BOX)
+    assert not detector.is_unchanged(changed, BOX, 'division')
+
+
+def test_changes_outside_the_band_are_ignored():
+    detector = FrameChangeDetector()
+    image = Image.new('RGB', (100, 40), 'white')
+    detector.is_unchanged(image, BOX)
+    changed = image.copy()
+    changed.paste((0, 0, 0), (0, 25, 100, 40))
+    assert detector.is_unchanged(changed, BOX)
+
+
+def test_reset_forgets_the_last_frame():
+    detector = FrameChangeDetector()
+    image = Image.new('RGB', (100, 40), 'white')
+    detector.is_unchanged(image, BOX)
+    detector.reset()
+    assert not detector.is_unchanged(image, BOX)
@@ -0,0 +1,105 @@
+import csv
+import sqlite3
+
+import pytest
+
+import history_manager
+from history_manager import create_history_manager
+
+
+@pytest.fixture(params=["history.csv", "history.db"])
+def history(request, tmp_path):
+    manager = create_history_manager(str(tmp_path / request.param))
+    yield manager
+    manager.close()
+
+
+def save(history, numbers):
+    for number in numbers:
+        history.save_history(f"{number} + 0", number)
+
+
+def test_pages_stay_put_while_new_solves_are_saved(history):
+    save(history, range(30))
+    entries, before, more = history.load_page(20)
+    assert [result for _, result in entries] == [str(n) for n in range(10, 30)]
+    assert more
+
+    save(history, range(100, 105))
+    entries, before, more = history.load_page(20, before=before)
+    assert [result for _, result in entries] == [str(n) for n in range(10)]
+    assert not more
+    assert history.load_page(20, before=before) == ([], before, False)
+
+
+def test_empty_history_has_no_pages(history):
+    assert history.load_page(20) == ([], None, False)
+
+
+def test_exact_page_reports_no_older_entries(history):
+    save(history, range(20))
+    entries, _, more = history.load_page(20)
+    assert len(entries) == 20
+    assert not more
+
+
+def test_sqlite_imports_csv_next_to_it(tmp_path):
+    save(create_history_manager(str(tmp_path / "history.csv")), range(3))
+    history = create_history_manager(str(tmp_path / "history.db"))
+    try:
+        assert history.count() == 3
+        assert history.lookup("2 + 0") == "2"
+        assert history.get_stats()['unique_problems'] == 3
+    finally:
+        history.close()
+
+
+def test_csv_history_is_parsed_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.csv")
+    save(create_history_manager(path), range(5))
+    reads = []
+    real_reader = csv.reader
+    monkeypatch.setattr(history_manager.csv, 'reader', lambda f: reads.append(f) or real_reader(f))
+
+    history = create_history_manager(path)
+    history.count()
+    history.load_page(2)
+    history.lookup("1 + 0")
+    history.save_history("9 + 0", 9)
+    assert history.count() == 6
+    assert history.load_page(2)[0] == [("4 + 0", "4"), ("9 + 0", "9")]
+    assert len(reads) == 1
+
+
+def test_known_answers_hold_only_expression_rows(history):
+    history.save_history("48 + 34", 82, 'expression')
+    history.save_history("48 + 34", 48 / 34, 'division')
+    history.save_history("9 + 3", 12, 'expression')
+    history.save_history("8 + 2", 4.0, 'division')
+    history.save_history("1 + 1", 2)
+    answers = dict(history.known_answers())
+    assert answers["9 + 3"] == "12"
+    # Never the quotient; rows without a mode are left out too
+    assert answers.get("48 + 34") in (None, "82")
+    assert "8 + 2" not in answers and "1 + 1" not in answers
+
+
+def test_sqlite_adds_the_mode_column_to_older_databases(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE history (id INTEGER PRIMARY KEY, problem TEXT NOT NULL, result TEXT NOT NULL,
+                              solved_at REAL NOT NULL);
+        CREATE TABLE problems (problem TEXT PRIMARY KEY, result TEXT NOT NULL,
+                               solve_count INTEGER NOT NULL) WITHOUT ROWID;
+        INSERT INTO history (problem, result, solved_at) VALUES ('1 + 1', '2', 0);
+        INSERT INTO problems VALUES ('1 + 1', '2', 1);
+    """)
+    conn.close()
+    history = create_history_manager(path)
+    try:
+        history.save_history("2 + 2", 4, 'expression')
+        assert history.known_answers() == [("2 + 2", "4")]
+        assert history.load_page(10)[0] == [("1 + 1", "2"), ("2 + 2", "4")]
+    finally:
+        history.close()
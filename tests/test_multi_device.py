@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import headless
+import multi_device
+from conftest import REPO_ROOT
+from glyph_recognizer import calibrate
+from history_manager import create_history_manager
+from multi_device import DEFAULT_SETTINGS, MultiDeviceSolver, device_filename
+
+
+def test_all_devices_passes_session_flags_to_every_worker(monkeypatch):
+    created = []
+
+    def recording_solver(**kwargs):
+        solver = MultiDeviceSolver(**kwargs)
+        created.append(solver)
+        return solver
+
+    monkeypatch.setattr(multi_device, 'MultiDeviceSolver', recording_solver)
+    args = headless.build_parser().parse_args([
+        'run', '--headless', '--all-devices', '--confirm-frames', '3', '--commit-confidence', '90',
+        '--input-dry-run', '--input-submit-key', 'KEYCODE_ENTER', '--ensemble', '--arithmetic', 'fraction',
+        '--no-roi', '--verify-answers', '--async-capture', '--metrics-port', '9100', '--workers', '3'])
+    monkeypatch.setattr(multi_device, 'list_devices', lambda: [])
+    assert headless.run_all_devices(args, headless.JsonLineWriter(io.StringIO())) == 1
+
+    settings = created[0].settings
+    assert set(settings) == set(DEFAULT_SETTINGS)
+    assert settings['confirm_frames'] == 3
+    assert settings['commit_confidence'] == 90
+    assert settings['input_dry_run'] and settings['input_submit_key'] == 'KEYCODE_ENTER'
+    assert settings['ensemble_thresholds'] == args.ensemble_thresholds
+    assert settings['arithmetic'] == 'fraction'
+    assert not settings['detect_roi'] and settings['verify_answers']
+    assert settings['async_capture']
+    assert settings['metrics_port'] == 9100
+    assert settings['ocr_workers'] == 3
+
+
+def test_device_filename_is_per_serial_and_filesystem_safe():
+    assert device_filename("out/metrics.json", "192.168.1.5:5555") == "out/metrics_192.168.1.5_5555.json"
+    assert multi_device.history_filename(".", "ABC", "csv") == "./solved_history_ABC.csv"
+
+
+def test_threshold_accepts_auto_and_adaptive(monkeypatch):
+    created = []
+    monkeypatch.setattr(multi_device, 'MultiDeviceSolver',
+                        lambda serials, *args, **settings: created.append(settings) or SimpleNamespace(serials=[]))
+    for value, expected in (('auto', 'auto'), ('adaptive', 'adaptive'), ('120', 120)):
+        assert multi_device.main(['--threshold', value, '--serial', 'X']) == 1
+        assert created[-1]['threshold'] == expected
+
+
+def test_workers_solve_each_fake_device_into_its_own_files(fake_adb, tmp_path):
+    fake_adb.setenv("FAKE_ADB_SERIALS", "FAKEA,FAKEB")
+    # The template OCR backend reads glyph_templates.npz from the working directory
+    calibrate([(os.path.join(REPO_ROOT, "screen.png"), "48 + 34 + 22")]).save(
+        str(tmp_path / "glyph_templates.npz"))
+    fake_adb.chdir(tmp_path)
+
+    solver = MultiDeviceSolver(history_dir=str(tmp_path), ocr_backend='template', target_fps=20,
+                               metrics_file=str(tmp_path / "metrics.json"))
+    assert solver.serials == ["FAKEA", "FAKEB"]
+    solver.start()
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and not all(state.solved_count for state in solver.devices.values()):
+            solver.poll()
+    finally:
+        solver.stop()
+
+    for serial in ("FAKEA", "FAKEB"):
+        assert solver.summary()[serial] == {'solved': 1, 'errors': 0, 'last_problem': "48 + 34 + 22"}
+        history = create_history_manager(solver.devices[serial].history_path)
+        try:
+            assert history.load_history() == [("48 + 34 + 22", "104")]
+        finally:
+            history.close()
+        with open(tmp_path / f"metrics_{serial}.json") as f:
+            assert json.load(f)['counters']['solved'] == 1
@@ -0,0 +1,49 @@
+from PIL import Image
+
+from ocr_cache import OCRCache
+
+BAND = Image.new('L', (40, 10), 255)
+VALUE = ('expression', "48+34", "48 + 34", [(0, 0, 10, 10)])
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = OCRCache(maxsize=2)
+    cache.put('a', VALUE)
+    cache.put('b', VALUE)
+    assert cache.get('a') == VALUE  # 'b' is now the oldest
+    cache.put('c', VALUE)
+    assert cache.get('b') is None
+    assert cache.get('a') == VALUE and cache.get('c') == VALUE
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1, 'hit_rate': 0.75}
+
+
+def test_key_covers_pixels_threshold_division_mode_and_engine():
+    key = OCRCache.make_key(BAND, 100, False, "tesserocr")
+    assert key == OCRCache.make_key(BAND.copy(), 100, False, "tesserocr")
+    other_pixels = BAND.copy()
+    other_pixels.putpixel((5, 5), 0)
+    variants = [
+        OCRCache.make_key(other_pixels, 100, False, "tesserocr"),
+        OCRCache.make_key(BAND, 'auto', False, "tesserocr"),
+        OCRCache.make_key(BAND, 100, True, "tesserocr"),
+        OCRCache.make_key(BAND, 100, False, "tesserocr+words"),
+        OCRCache.make_key(BAND.resize((10, 40)), 100, False, "tesserocr"),
+    ]
+    assert len({key, *variants}) == len(variants) + 1
+
+
+def test_entries_survive_a_save_and_reload(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = OCRCache(path=path)
+    division = ('division', (84.0, 4.0), "84 / 4", [(1, 2, 3, 4)])
+    cache.put('a', VALUE)
+    cache.put('b', division)
+    assert cache.save()
+
+    reloaded = OCRCache(maxsize=1, path=path)
+    assert reloaded.load()
+    # Trimmed to maxsize, keeping the most recently used entry
+    assert list(reloaded.entries) == ['b']
+    assert reloaded.get('b') == division
+
+    assert not OCRCache(path=str(tmp_path / "missing.json")).load()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from fakes import MemoryHistory, ScreenSolver, ScriptedCapture, screen
+from pipeline import REPEATED_FRAME, LatestQueue, SolvePipeline
+from solve_session import SolveSession
+
+X, G, B = screen(10), screen(120), screen(240)
+TEXTS = {10: "2 + 3", 120: "7 + 1", 240: "4 + 4"}
+
+
+def make_session(capture, ocr_delay=0.0):
+    solved = []
+    session = SolveSession(capture, ScreenSolver(TEXTS, ocr_delay), MemoryHistory(),
+                           on_solved=lambda img, boxes, raw_text, result, count: solved.append(raw_text),
+                           on_log=lambda message: None, confirm_frames=2)
+    return session, solved
+
+
+def test_latest_queue_keeps_newest_items():
+    queue = LatestQueue(maxsize=2)
+    for item in range(4):
+        queue.put(item)
+    assert [queue.get(0), queue.get(0)] == [2, 3]
+    assert queue.dropped == 2
+
+
+def test_latest_queue_put_without_evict_keeps_queued_items():
+    queue = LatestQueue(maxsize=1)
+    queue.put("frame")
+    assert not queue.put("repeat", evict=False)
+    assert queue.get(0) == "frame"
+
+
+def test_capture_gives_repeats_the_sequence_of_their_frame():
+    captured = iter([REPEATED_FRAME, "first", REPEATED_FRAME, "second", REPEATED_FRAME])
+    pipeline = SolvePipeline(lambda: next(captured, None), None, None, target_fps=0, queue_size=10)
+    thread = threading.Thread(target=pipeline._capture_loop,
+                              args=(pipeline.stop_event, pipeline.frames, pipeline.results))
+    thread.start()
+    deadline = time.monotonic() + 2
+    while pipeline.stats['captured'] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop_event.set()
+    thread.join()
+    items = [pipeline.frames.get(0) for _ in range(4)]
+    # The leading repeat has no frame to confirm and is dropped
+    assert items == [(0, "first"), (0, REPEATED_FRAME), (1, "second"), (1, REPEATED_FRAME)]
+
+
+def test_restart_does_not_revive_threads_of_the_stopped_run():
+    lock = threading.Lock()
+    active = [0, 0]  # current, most at once
+
+    def slow_capture():
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.3)
+        with lock:
+            active[0] -= 1
+        return "frame"
+
+    pipeline = SolvePipeline(slow_capture, lambda frame: frame, lambda result: None,
+                             target_fps=0, ocr_workers=1)
+    pipeline.start()
+    time.sleep(0.1)
+    pipeline.stop(timeout=0.01)  # returns while capture is still running
+    pipeline.start()
+    time.sleep(1.0)
+    pipeline.stop()
+    assert active[1] == 1
+
+
+def test_repeat_overtaking_slow_ocr_does_not_drop_the_newer_frame():
+    # X is confirmed; G's OCR is still running when its repeat reaches the
+    # dispatcher; B replaces G before G is seen twice
+    session, solved = make_session(ScriptedCapture())
+    pipeline = SolvePipeline(session.capture_frame, session.recognize_frame, session.solve_frame)
+
+    def recognized(image):
+        return session.recognize_frame((image, 100, False, time.monotonic()))
+
+    pipeline._dispatch(0, recognized(X))
+    pipeline._dispatch(0, REPEATED_FRAME)
+    pipeline._dispatch(1, REPEATED_FRAME)  # ahead of G's OCR result
+    pipeline._dispatch(1, recognized(G))
+    pipeline._dispatch(2, recognized(B))
+    pipeline._dispatch(2, REPEATED_FRAME)
+
+    assert solved == ["2 + 3", "4 + 4"]
+    assert pipeline.stats['stale'] == 1
+
+
+def test_transient_screen_with_slow_ocr_is_not_solved():
+    # X, then G for under two capture intervals, then B; OCR is slower than a capture interval
+    capture = ScriptedCapture(timeline=[(0.0, X), (1.0, G), (1.35, B)])
+    session, solved = make_session(capture, ocr_delay=0.3)
+    pipeline = SolvePipeline(session.capture_frame, session.recognize_frame, session.solve_frame,
+                             target_fps=4, ocr_workers=2)
+    pipeline.start()
+    time.sleep(2.5)
+    pipeline.stop()
+    assert solved == ["2 + 3", "4 + 4"]
@@ -0,0 +1,18 @@
+import numpy as np
+
+from preprocessing import find_text_line, profile_runs
+
+
+def test_profile_runs_bridges_small_gaps():
+    profile = np.array([0, 1, 1, 0, 1, 0, 0, 0, 1, 0])
+    assert profile_runs(profile) == [(1, 3), (4, 5), (8, 9)]
+    assert profile_runs(profile, max_gap=1) == [(1, 5), (8, 9)]
+    assert profile_runs(np.zeros(5)) == []
+
+
+def test_find_text_line_picks_the_inkiest_line():
+    mask = np.zeros((40, 30), dtype=bool)
+    mask[5:8, 10:12] = True
+    mask[20:30, 2:28] = True
+    assert find_text_line(mask) == (20, 30)
+    assert find_text_line(np.zeros((10, 10), dtype=bool)) is None
@@ -0,0 +1,66 @@
+import os
+
+from PIL import Image
+
+from ocr_backends import OCRBackend
+from soroban_solver import SorobanSolver
+
+SCREEN_PNG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "screen.png")
+
+
+class ScriptedBackend(OCRBackend):
+    """Returns `texts` in turn as one word each and records every `restrict` flag"""
+    name = "scripted"
+    has_whitelist = True
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.restricts = []
+
+    def image_to_data(self, image, restrict=True):
+        self.restricts.append(restrict)
+        text = self.texts.pop(0)
+        return {'text': [text], 'left': [image.width // 2], 'top': [0], 'width': [10], 'height': [10],
+                'conf': [90.0]}
+
+
+def read(solver, image):
+    return solver.read_problem(image, 100)[2]
+
+
+def test_whitelist_only_after_the_roi_read_as_an_equation():
+    image = Image.open(SCREEN_PNG).convert('RGB')
+    backend = ScriptedBackend(["48 + 34 + 22", "48 + 34 + 22", "1 3 - 1", "LEVEL 3 - START",
+                               "48 + 34 + 22", "48 + 34 + 22"])
+    solver = SorobanSolver(ocr_backend=backend)
+
+    read(solver, image)  # first frame: ROI detected, not yet confirmed
+    assert read(solver, image) == "48 + 34 + 22"  # confirmed equation box: whitelist on
+    # A menu forced into digits is not a clean expression: read again as words and rejected
+    text = read(solver, image)
+    assert text == "LEVEL 3 - START"
+    assert not solver.is_valid_equation_window(text)
+    read(solver, image)  # the box is unconfirmed again
+    read(solver, image)
+    assert backend.restricts == [False, True, True, False, False, True]
+
+
+def test_roi_detection_starts_unconfirmed():
+    image = Image.open(SCREEN_PNG).convert('RGB')
+    solver = SorobanSolver(ocr_backend=ScriptedBackend(["48 + 34 + 22"] * 2))
+    read(solver, image)
+    size = image.size
+    assert solver.roi.is_confirmed(size)
+    solver.roi.confirm(size, (0, 0, 1, 1), False)  # not the cached box: ignored
+    assert solver.roi.is_confirmed(size)
+    solver.roi.reset()
+    assert not solver.roi.is_confirmed(size)
+
+
+def test_no_whitelist_without_roi_detection():
+    image = Image.open(SCREEN_PNG).convert('RGB')
+    backend = ScriptedBackend(["48 + 34 + 22"] * 2)
+    solver = SorobanSolver(ocr_backend=backend, detect_roi=False)
+    read(solver, image)
+    read(solver, image)
+    assert backend.restricts == [False, False]
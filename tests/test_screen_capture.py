@@ -0,0 +1,138 @@
+import time
+
+import pytest
+from PIL import Image
+
+from fakes import NoOCR
+from screen_capture import (ScreenCapture, band_rows, decode_raw_screencap, detect_raw_header_size, parse_raw_header,
+                            screen_size)
+from soroban_solver import SorobanSolver
+
+
+def capture_frames(capture, count):
+    return [capture.capture_android_screen() for _ in range(count)]
+
+
+def test_persistent_session_serves_frames(fake_adb):
+    capture = ScreenCapture(capture_format='png')
+    try:
+        frames = capture_frames(capture, 3)
+        assert all(frame is not None and frame.size == (1612, 720) for frame in frames)
+        assert capture.session.is_alive()
+        assert capture.is_session_healthy()
+        assert capture.is_device_connected()
+        health = capture.health()
+        assert health['frames_captured'] == 3 and health['consecutive_failures'] == 0
+    finally:
+        capture.close()
+
+
+def test_killed_session_is_restarted(fake_adb):
+    capture = ScreenCapture(capture_format='png')
+    try:
+        capture.capture_android_screen()
+        first = capture.session.process
+        first.kill()
+        first.wait()
+        assert not capture.is_session_healthy()
+        assert capture.capture_android_screen() is not None
+        assert capture.session.process is not first and capture.session.is_alive()
+    finally:
+        capture.close()
+
+
+def test_dropped_session_falls_back_to_one_shot_and_recovers(fake_adb):
+    fake_adb.setenv("FAKE_ADB_SESSION_LIMIT", "2")
+    capture = ScreenCapture(capture_format='png', max_failures=1, retry_after=0.3)
+    try:
+        capture_frames(capture, 2)
+        # The session drops on the third request; the frame still arrives via one-shot screencap
+        assert capture.capture_android_screen() is not None
+        health = capture.health()
+        assert not health['session_alive'] and not health['persistent_enabled']
+        assert health['last_error'] and health['frames_captured'] == 3
+        # Still inside retry_after: one-shot only, no new session
+        assert capture.capture_android_screen() is not None
+        assert not capture.health()['session_alive']
+
+        time.sleep(0.35)
+        assert capture.capture_android_screen() is not None
+        health = capture.health()
+        assert health['session_alive'] and health['persistent_enabled']
+        assert capture.is_session_healthy()
+    finally:
+        capture.close()
+
+
+def test_raw_capture_learns_the_header_from_one_shot_then_streams(fake_adb):
+    capture = ScreenCapture(capture_format='raw')
+    try:
+        first = capture.capture_android_screen()
+        assert capture.raw_header_size == 16 and capture.session is None
+        second = capture.capture_android_screen()
+        assert capture.session.is_alive()
+        assert first.size == second.size and first.tobytes() == second.tobytes()
+    finally:
+        capture.close()
+
+
+def test_missing_device_is_reported(fake_adb):
+    fake_adb.setenv("FAKE_ADB_SERIALS", "")
+    capture = ScreenCapture(capture_format='png', serial="FAKE0001")
+    try:
+        assert not capture.is_device_connected()
+        assert capture.capture_android_screen() is None
+    finally:
+        capture.close()
+
+
+def raw_screencap(image, header_size=16, pixel_format=1):
+    fields = (image.width, image.height, pixel_format) + ((0,) if header_size == 16 else ())
+    return b"".join(value.to_bytes(4, 'little') for value in fields) + image.tobytes()
+
+
+@pytest.mark.parametrize('header_size', [12, 16])
+def test_raw_header_is_parsed_and_its_size_detected(header_size):
+    data = raw_screencap(Image.new('RGBA', (8, 6), (1, 2, 3, 255)), header_size)
+    assert parse_raw_header(data) == (8, 6, 1)
+    assert detect_raw_header_size(data) == header_size
+    image = decode_raw_screencap(data)
+    assert image.size == (8, 6) and image.getpixel((0, 0)) == (1, 2, 3, 255)
+
+
+def test_bad_raw_headers_are_rejected():
+    data = raw_screencap(Image.new('RGBA', (8, 6)))
+    with pytest.raises(ValueError):
+        detect_raw_header_size(data[:-1])
+    with pytest.raises(ValueError):
+        parse_raw_header((8).to_bytes(4, 'little') + (6).to_bytes(4, 'little') + (99).to_bytes(4, 'little'))
+
+
+def test_rows_decode_only_the_band_and_keep_the_screen_size():
+    source = Image.new('RGBA', (8, 40), (0, 0, 0, 255))
+    source.paste((255, 0, 0, 255), (0, 0, 8, 10))
+    image = decode_raw_screencap(raw_screencap(source), 16, rows=band_rows(40))
+    assert image.size == (8, 10)
+    assert screen_size(image) == (8, 40)
+    assert image.getcolors() == [(80, (255, 0, 0, 255))]
+    assert screen_size(decode_raw_screencap(raw_screencap(source))) == (8, 40)
+
+
+def test_raw_capture_decodes_the_equation_band_from_one_buffer(fake_adb):
+    capture = ScreenCapture(capture_format='raw')
+    try:
+        capture.capture_android_screen()
+        image = capture.capture_android_screen()
+        assert image.size == (1612, 180) and screen_size(image) == (1612, 720)
+        # The persistent session read the frame straight into one bytearray
+        capture.session.send("screencap")
+        assert isinstance(capture.session.read_raw(16), bytearray)
+    finally:
+        capture.close()
+
+
+def test_band_frames_give_the_solver_the_same_equation_box():
+    solver = SorobanSolver(ocr_backend=NoOCR(), detect_roi=False)
+    full = Image.new('RGBA', (100, 80))
+    band = decode_raw_screencap(raw_screencap(full), 16, rows=band_rows(80))
+    assert solver.equation_box(band) == solver.equation_box(full) == (0, 0, 100, 20)
@@ -0,0 +1,97 @@
+from fakes import MemoryHistory, ScreenSolver, ScriptedCapture, screen
+from solve_session import SolveSession
+
+A, B = screen(10), screen(240)
+
+
+def run(session, frames):
+    for _ in range(frames):
+        frame = session.capture_frame()
+        if frame is not None:
+            session.solve_frame(session.recognize_frame(frame))
+
+
+def make_session(frames, texts, confirm_frames=2, verify_answers=False):
+    solved, logs = [], []
+    history = MemoryHistory()
+    session = SolveSession(ScriptedCapture(frames), ScreenSolver(texts), history,
+                           on_solved=lambda img, boxes, raw_text, result, count: solved.append((raw_text, result)),
+                           on_log=logs.append, confirm_frames=confirm_frames, verify_answers=verify_answers)
+    return session, solved, logs, history
+
+
+def test_problem_is_solved_once_after_confirmation():
+    session, solved, _, history = make_session([A, A, A, A], {10: "48 + 34 + 22"})
+    run(session, 4)
+    assert solved == [("48 + 34 + 22", 104)]
+    assert history.saved == [("48 + 34 + 22", 104, 'expression')]
+
+
+def test_confirm_frames_one_solves_the_first_reading():
+    session, solved, _, _ = make_session([A, B], {10: "2 + 2", 240: "3 + 3"}, confirm_frames=1)
+    run(session, 2)
+    assert solved == [("2 + 2", 4), ("3 + 3", 6)]
+
+
+def test_failed_solve_is_retried_while_the_screen_stays():
+    session, solved, logs, _ = make_session([A] * 5, {10: "8 / 2"})
+    calculate = session.solver.calculate_result
+    attempts = []
+
+    def fail_twice(operation, numbers):
+        attempts.append(numbers)
+        return None if len(attempts) <= 2 else calculate(operation, numbers)
+
+    session.solver.calculate_result = fail_twice
+    run(session, 5)
+    assert solved == [("8 / 2", 4)]
+    assert len(attempts) == 3
+
+
+def test_failure_is_logged_once_per_problem():
+    session, solved, logs, _ = make_session([A] * 6, {10: "8 / 0"})
+    run(session, 6)
+    assert solved == []
+    assert sum(message.startswith("Could not solve") for message in logs) == 1
+
+
+def count_calculations(session):
+    calculate = session.solver.calculate_result
+    calls = []
+
+    def counting(operation, numbers):
+        calls.append(numbers)
+        return calculate(operation, numbers)
+
+    session.solver.calculate_result = counting
+    return calls
+
+
+def test_known_problem_is_answered_without_evaluating_it():
+    session, solved, _, _ = make_session([A, A], {10: "48 + 34"})
+    session.load_history_answers([("48+34", "82")])
+    calls = count_calculations(session)
+    run(session, 2)
+    assert solved == [("48 + 34", 82)]
+    assert calls == []
+    assert session.answer_index.stats()['hits'] == 1
+
+
+def test_division_mode_answers_are_not_used_for_expressions():
+    session, solved, _, history = make_session([A, A], {10: "48 + 34"})
+    # The same text solved in division mode ('+' read as '/')
+    history.save_history("48 + 34", 48 / 34, 'division')
+    assert session.load_history_answers() == 0
+    run(session, 2)
+    assert solved == [("48 + 34", 82)]
+
+
+def test_verify_answers_recomputes_and_flags_a_mismatch():
+    session, solved, logs, _ = make_session([A, A], {10: "48 + 34"}, verify_answers=True)
+    session.load_history_answers([("48 + 34", "99")])
+    calls = count_calculations(session)
+    run(session, 2)
+    assert solved == [("48 + 34", 82)]
+    assert len(calls) == 1
+    assert session.answer_index.stats()['mismatches'] == 1
+    assert any("differs from computed" in message for message in logs)
@@ -0,0 +1,56 @@
+from stabilizer import ProblemStabilizer
+
+
+def test_commits_once_readings_agree():
+    stabilizer = ProblemStabilizer(min_agree=2)
+    assert stabilizer.observe("a", now=0.0) is None
+    assert stabilizer.pending()
+    assert stabilizer.observe("a", now=0.25) == 0.25
+    assert not stabilizer.pending()
+    # Further readings of a committed problem are not committed again
+    assert stabilizer.observe("a", now=0.5) is None
+
+
+def test_transient_readings_are_dropped():
+    stabilizer = ProblemStabilizer(window=3, min_agree=2)
+    for key in ("a", "b", "c", "b"):
+        waited = stabilizer.observe(key, now=0.0)
+    assert waited == 0.0
+    assert stabilizer.committed == "b"
+    assert stabilizer.stats()['rejected'] == 2
+
+
+def test_reading_that_leaves_the_window_does_not_count():
+    stabilizer = ProblemStabilizer(window=2, min_agree=2)
+    stabilizer.observe("a")
+    stabilizer.observe(None)
+    stabilizer.observe(None)
+    assert stabilizer.observe("a") is None
+
+
+def test_confident_reading_commits_at_once():
+    stabilizer = ProblemStabilizer(min_agree=3, min_confidence=90)
+    assert stabilizer.observe("a", confidence=80) is None
+    assert stabilizer.observe("b", confidence=95) is not None
+
+
+def test_force_and_repeat():
+    stabilizer = ProblemStabilizer(min_agree=2)
+    assert stabilizer.observe("a", force=True) is not None
+    stabilizer.observe("b")
+    assert stabilizer.repeat() is not None
+    assert stabilizer.committed == "b"
+
+
+def test_released_problem_can_be_committed_again():
+    stabilizer = ProblemStabilizer(min_agree=2)
+    stabilizer.observe("a")
+    stabilizer.observe("a")
+    stabilizer.release("a")
+    assert stabilizer.pending()
+    assert stabilizer.observe("a") is not None
+    # Releasing a problem that is no longer the committed one changes nothing
+    stabilizer.observe("b")
+    stabilizer.observe("b")
+    stabilizer.release("a")
+    assert stabilizer.committed == "b"